@@ -71,6 +71,7 @@ cfg['plot_engine'] = 'qkit.gui.qviewkit.main' # default: qviewkit
 #cfg['load_info_service'] = True # default: True
 #cfg['info_port'] = 5600  # this is the port we can listen on messages (signals) told by qkit
 #cfg['info_host'] = 'localhost'  # this is the host we can listen on messages  
+#cfg['info_data_interval'] = 0.5  # minimum time (s) between 'dataset-grown' messages of a data file
 
 ##
 ## Load QKIT remote interface service (ris), 
@@ -102,6 +103,7 @@ cfg['stdout_log_level'] = 'WARNING'
 ## Make png files at the end of the measurement
 ##
 #cfg['save_png'] = True
+#cfg['plot_export_processes'] = 2  # number of processes rendering the png files in the background
 
 ##
 ## QT related options
@@ -5,7 +5,7 @@ import qkit
 import zmq
 from qkit.core.lib.com.signals import SIGNALS
 # reverse the SIGNAL
-RSIGNALS = dict((v,k) for k,v in SIGNALS.iteritems())
+RSIGNALS = dict((v,k) for k,v in SIGNALS.items())
 
 
 
@@ -26,7 +26,6 @@ class info_client(object):
         self.start_poll()
         
     def start_client(self,port,host):
-        print port, host
         self.context = zmq.Context()
         self.socket = self.context.socket(zmq.SUB)
 
@@ -38,7 +37,7 @@ class info_client(object):
         
     def listen_to(self,topic):
         "hook up to topic (defined in signals.py)"
-        if SIGNALS.has_key(topic):
+        if topic in SIGNALS:
                 sig = SIGNALS.get(topic)
                 self.socket.setsockopt(zmq.SUBSCRIBE, str(sig).encode())
     def listen_to_all(self):
@@ -47,7 +46,7 @@ class info_client(object):
             
     def get_message(self,readable_topic = False):
         "wait until a message is available and return it"
-        tid,message =self.socket.recv().split(":",1)
+        tid,message =self.socket.recv_string().split(":",1)
         if readable_topic:
             return RSIGNALS.get(int(tid)), message
         else:
@@ -46,9 +46,9 @@ class info_service(object):
         
     def dist(self,topic, message = ""):
         "distribute a message"
-        if SIGNALS.has_key(topic):
+        if topic in SIGNALS:
             sig = SIGNALS.get(topic)
-            self.socket.send("%d:%s" % (sig, message))
+            self.socket.send_string("%d:%s" % (sig, message))
         else:
             print("please specify a correct topic, specs are in SIGNALS.py")
 
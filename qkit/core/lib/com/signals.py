@@ -12,6 +12,7 @@ SIGNALS = {
 'measurement-idle': 22,
 'new-data-point':   23,
 'new-data-block':   24,
+'dataset-grown':    25, # json: {"file": h5 filepath, "datasets": {ds_url: shape}}
 
 'removed':          30, 		# self.get_name()
 'parameter-added':  32,	# name
@@ -93,6 +93,11 @@ class Keithley(Instrument):
         self._smu_command = {0: 'i', 1: 'v'}
         self._IV_units = {0: 'A', 1: 'V'}
         self._avg_types = ['moving average', 'repeat average', 'median']
+        self._binary_transfer = False  # read sweep data as binary REAL32 blocks
+        self._chunk_size = 10000  # readings per binary block
+        self._deferred_errors = False  # skip "operation complete" poll and error check in _write and _ask
+        self._program = False  # sweep program (list of bias values) is uploaded instead of a single linear sweep
+        self._program_nops = []  # number of points of each sweep of the sweep program
         # dict of defaults values: defaults[<sweep_mode>][<channel>][<parameter>][<value>]
         self._defaults = {0: [{'measurement_mode': 0,  # bias channel
                                'bias_mode':  1,
@@ -335,6 +340,7 @@ class Keithley(Instrument):
     def _write(self, cmd):
         """
         Sends a visa command <cmd>, waits until "operation complete" and raises eventual errors of the Device.
+        If deferred errors are set, only the command is sent (see set_deferred_errors).
         
         Parameters
         ----------
@@ -346,6 +352,8 @@ class Keithley(Instrument):
         None
         """
         self._visainstrument.write(cmd)
+        if self._deferred_errors:
+            return
         while not bool(int(self._visainstrument.query('*OPC?'))):
             time.sleep(1e-6)
         self._raise_error()
@@ -354,6 +362,7 @@ class Keithley(Instrument):
     def _ask(self, cmd):
         """
         Sends a visa command <cmd>, waits until "operation complete", raises eventual errors of the Device and returns the read answer <ans>.
+        If deferred errors are set, only the query is done (see set_deferred_errors).
         
         Parameters
         ----------
@@ -366,6 +375,8 @@ class Keithley(Instrument):
             Answer that is returned at query after the sent <cmd>.
         """
         ans = self._visainstrument.query('print({:s})'.format(cmd)).strip()
+        if self._deferred_errors:
+            return ans
         while not bool(int(self._visainstrument.query('*OPC?'))):
             time.sleep(1e-6)
         self._raise_error()
@@ -1491,8 +1502,13 @@ class Keithley(Instrument):
         # Corresponding Command: smuX.trigger.count = triggerCount
         # Corresponding Command: smuX.trigger.arm.count = triggerArmCount
         try:
-            self._write('format.data = format.ASCII')
-            self._write('format.asciiprecision = 6')
+            self._program = False
+            if self._binary_transfer:
+                self._write('format.data = format.REAL32')
+                self._write('format.byteorder = format.LITTLEENDIAN')
+            else:
+                self._write('format.data = format.ASCII')
+                self._write('format.asciiprecision = 6')
             self._start, self._stop, self._step = np.array(sweep[:3], dtype=float)
             if not self._sweep_mode:  # 0 (VV-mode)
                 channel_bias, channel_sense = self._sweep_channels
@@ -1556,7 +1572,10 @@ class Keithley(Instrument):
                 readingbuffer_bias = 'smu{:s}.nvbuffer1'.format(chr(96+channel_bias)) if self._readingbuffer_bias is None else self._readingbuffer_bias
                 readingbuffer_sense = 'smu{:s}.nvbuffer1'.format(chr(96+channel_sense)) if self._readingbuffer_sense is None else self._readingbuffer_sense
                 # sweep channel_bias and measure channel_sense
-                cmd = 'for i = {:f}, {:f}, {:f} do'.format(self._start, self._stop+self._step_signed/2., self._step_signed)
+                if self._program:
+                    cmd = 'for _, i in ipairs(qkit_program) do'
+                else:
+                    cmd = 'for i = {:f}, {:f}, {:f} do'.format(self._start, self._stop+self._step_signed/2., self._step_signed)
                 cmd += '\tsmu{:s}.source.levelv = i'.format(chr(96+channel_bias))
                 cmd += '\tsmu{:s}.measure.v({:s})'.format(chr(96+channel_bias), readingbuffer_bias)
                 cmd += '\tsmu{:s}.measure.v({:s})'.format(chr(96+channel_sense), readingbuffer_sense)
@@ -1568,8 +1587,20 @@ class Keithley(Instrument):
                 readingbuffer_sense = 'smu{:s}.nvbuffer2'.format(chr(96+channel)) if self._readingbuffer_sense is None else self._readingbuffer_sense
                 # sweep and measure channel
                 self._visainstrument.write('smu{:s}.trigger.initiate()'.format(chr(96+channel)))
+                if self._binary_transfer:
+                    # read the buffers in chunks while the sweep is running
+                    data = self._read_buffers_binary(readingbuffer_bias, readingbuffer_sense, self._nop, running=True)
+                    if self._deferred_errors:
+                        self._raise_error()
+                    return data
                 self._visainstrument.write('waitcomplete()')
             self._wait_for_stb()
+            if self._binary_transfer:
+                nop = int(float(self._visainstrument.query('print({:s}.n)'.format(readingbuffer_sense))))
+                data = self._read_buffers_binary(readingbuffer_bias, readingbuffer_sense, nop)
+                if self._deferred_errors:
+                    self._raise_error()
+                return data
             time.sleep(0.1)
             # read data
             self._visainstrument.write('*CLS')
@@ -1577,11 +1608,226 @@ class Keithley(Instrument):
             self._visainstrument.write('printbuffer(1, {:s}.n, {:s}, {:s})'.format(readingbuffer_bias, readingbuffer_bias, readingbuffer_sense))
             self._wait_for_stb()
             data = np.fromstring(string=self._visainstrument.read(), dtype=float, count=-1, sep=',')
+            if self._deferred_errors:
+                self._raise_error()
             return data[0::2], data[1::2]
         except Exception as e:
             logging.error('{!s}: Cannot take sweep data of channel {:s}'.format(__name__, self._sweep_channels))
             raise type(e)('{!s}: Cannot take sweep data of channel {:s}\n{!s}'.format(__name__, self._sweep_channels, e))
     
+    def set_sweep_program(self, sweeps):
+        """
+        Sets a sweep program of several sweeps <sweeps>. All bias values are uploaded as one list to the instrument, so that the sweeps run hardware-timed one after another without round trips in between.
+        
+        Parameters
+        ----------
+        sweeps: list of array_likes of floats
+            Sweeps containing start, stop and step size (e.g. get_sweeps() of qkit.measure.transport.transport.sweep class). Sleep values are ignored.
+        
+        Returns
+        -------
+        None
+        """
+        # Corresponding Command: smuX.trigger.source.listY(sweepList)
+        # Corresponding Command: smuX.trigger.count = triggerCount
+        self.set_sweep_parameters(sweep=sweeps[0])
+        try:
+            values = []
+            for sweep in sweeps:
+                start, stop, step = np.array(sweep[:3], dtype=float)
+                values.append(np.linspace(start, stop, int(np.abs((stop-start)/step)+1)))
+            self._program_nops = [len(val) for val in values]
+            values = np.concatenate(values)
+            # upload list in blocks, since the length of a command line is limited
+            self._visainstrument.write('qkit_program = {}')
+            for k in range(0, len(values), 500):
+                self._visainstrument.write('for _, val in ipairs({{{:s}}}) do table.insert(qkit_program, val) end'.format(', '.join(map(repr, map(float, values[k:k+500])))))
+            if self._sweep_mode in [1, 2]:  # 1 (IV-mode) | 2 (VI-mode)
+                channel, = self._sweep_channels
+                self._nop = len(values)
+                self._write('smu{:s}.trigger.source.list{:s}(qkit_program)'.format(chr(96+channel), self._smu_command[self.get_bias_mode(channel=channel)]))
+                self._write('smu{:s}.trigger.count = {:d}'.format(chr(96+channel), self._nop))
+            self._program = True
+        except Exception as e:
+            logging.error('{!s}: Cannot set sweep program of channel {!s} to {!s}'.format(__name__, self._sweep_channels, sweeps))
+            raise type(e)('{!s}: Cannot set sweep program of channel {!s} to {!s}\n{!s}'.format(__name__, self._sweep_channels, sweeps, e))
+        return
+    
+    def get_program_data(self):
+        """
+        Runs the sweep program set by set_sweep_program and gets trace data of bias <bias_values> and sense <sense_values> of all sweeps in one read.
+        
+        Parameters
+        ----------
+        None
+        
+        Returns
+        -------
+        data: list of tuples of numpy.array(float)
+            Measured bias and sense values of each sweep.
+        """
+        bias_values, sense_values = self.get_tracedata()
+        indices = np.cumsum(self._program_nops)[:-1]
+        return list(zip(np.split(bias_values, indices), np.split(sense_values, indices)))
+    
+    def take_IV_program(self, sweeps):
+        """
+        Takes IV curves of all sweeps <sweeps> as one hardware-timed sweep program in set sweep mode.
+        
+        Parameters
+        ----------
+        sweeps: list of array_likes of floats
+            Sweeps containing start, stop and step size (e.g. get_sweeps() of qkit.measure.transport.transport.sweep class). Sleep values are ignored.
+        
+        Returns
+        -------
+        data: list of tuples of numpy.array(float)
+            Measured bias and sense values of each sweep.
+        """
+        self.set_sweep_program(sweeps=sweeps)
+        return self.get_program_data()
+    
+    def _read_buffers_binary(self, readingbuffer_bias, readingbuffer_sense, nop, running=False):
+        """
+        Reads <nop> bias and sense values from the reading buffers as binary REAL32 blocks of at most <self._chunk_size> readings.
+        
+        Parameters
+        ----------
+        readingbuffer_bias: str
+            Reading buffer object of the bias readings.
+        readingbuffer_sense: str
+            Reading buffer object of the sense readings.
+        nop: int
+            Number of readings.
+        running: bool
+            Sweep is still running. Every block is read as soon as the instrument has taken its readings. Default is False.
+            Raises a RuntimeError if the sweep ends before all readings are taken or no reading arrives within the VISA timeout.
+        
+        Returns
+        -------
+        bias_values: numpy.array(float)
+            Measured bias values.
+        sense_values: numpy.array(float)
+            Measured sense values.
+        """
+        # Corresponding Command: numberOfReadings = bufferVar.n
+        # Corresponding Command: sweepingRegister = status.operation.sweeping.condition
+        # Corresponding Command: printbuffer(startIndex, endIndex, bufferVar, bufferVar2)
+        bias_values, sense_values = np.empty(nop), np.empty(nop)
+        if running:
+            channel, = self._sweep_channels
+            timeout = self._visainstrument.timeout  # in ms, None for no timeout
+            n_last, t_last = 0, time.time()
+        start = 0
+        while start < nop:
+            stop = min(start+self._chunk_size, nop)
+            if running:
+                while True:
+                    n, sweeping = map(lambda x: int(float(x)), self._visainstrument.query('print({:s}.n, bit.bitand(status.operation.sweeping.condition, status.operation.sweeping.SMU{:s}))'.format(readingbuffer_sense, chr(64+channel))).split())
+                    if n >= stop:
+                        break
+                    if not sweeping:
+                        # the last readings can be stored after the sweep state was queried
+                        n = int(float(self._visainstrument.query('print({:s}.n)'.format(readingbuffer_sense))))
+                        if n >= stop:
+                            break
+                        raise RuntimeError('{!s}: Sweep of channel {:d} ended after {:d} of {:d} readings'.format(__name__, channel, n, nop))
+                    if n > n_last:
+                        n_last, t_last = n, time.time()
+                    elif timeout is not None and time.time()-t_last > timeout/1e3:
+                        raise RuntimeError('{!s}: No readings of channel {:d} within {:g}s, {:d} of {:d} readings taken'.format(__name__, channel, timeout/1e3, n, nop))
+                    time.sleep(1e-2)
+            data = self._visainstrument.query_binary_values('printbuffer({:d}, {:d}, {:s}, {:s})'.format(start+1, stop, readingbuffer_bias, readingbuffer_sense),
+                                                            datatype='f', is_big_endian=False, container=np.array, data_points=2*(stop-start))
+            bias_values[start:stop] = data[0::2]
+            sense_values[start:stop] = data[1::2]
+            start = stop
+        return bias_values, sense_values
+    
+    def set_binary_transfer(self, status=True, chunk_size=10000):
+        """
+        Sets the transfer of sweep data to binary REAL32 blocks instead of ASCII strings.
+        Sweeps in IV-mode and VI-mode are read in chunks while they are running.
+        
+        Parameters
+        ----------
+        status: bool
+            Status of binary transfer. Default is True.
+        chunk_size: int
+            Number of readings that are transferred in one block. Default is 10000.
+        
+        Returns
+        -------
+        None
+        """
+        self._binary_transfer = bool(status)
+        self._chunk_size = int(chunk_size)
+        return
+    
+    def get_binary_transfer(self):
+        """
+        Gets the status of binary transfer of sweep data.
+        
+        Parameters
+        ----------
+        None
+        
+        Returns
+        -------
+        status: bool
+            Status of binary transfer.
+        """
+        return self._binary_transfer
+    
+    def set_deferred_errors(self, status=True):
+        """
+        Sets deferred error checking. If True, commands are sent without waiting for "operation complete" and checking the error queue afterwards, which saves two round trips per command.
+        The error queue is checked once after each sweep in get_tracedata and can be checked manually with check_errors.
+        
+        Parameters
+        ----------
+        status: bool
+            Status of deferred error checking. Default is True.
+        
+        Returns
+        -------
+        None
+        """
+        self._deferred_errors = bool(status)
+        return
+    
+    def get_deferred_errors(self):
+        """
+        Gets the status of deferred error checking.
+        
+        Parameters
+        ----------
+        None
+        
+        Returns
+        -------
+        status: bool
+            Status of deferred error checking.
+        """
+        return self._deferred_errors
+    
+    def check_errors(self):
+        """
+        Waits until "operation complete" and raises errors of the instrument that occurred since the last check.
+        
+        Parameters
+        ----------
+        None
+        
+        Returns
+        -------
+        None
+        """
+        while not bool(int(self._visainstrument.query('*OPC?'))):
+            time.sleep(1e-6)
+        self._raise_error()
+        return
+    
     def take_IV(self, sweep):
         """
         Takes IV curve with sweep parameters <sweep> in set sweep mode.
@@ -88,6 +88,7 @@ class Keysight_B2900(Instrument):
         self._IV_modes = {0: 'curr', 1: 'volt', 2: 'res'}
         self._IV_units = {0: 'A', 1: 'V', 2: 'Ohm'}
         self._sense_mode = {i+1: 0 for i in range(self._channels)}
+        self._program_nops = []  # number of points of each sweep of the sweep program
         # dict of defaults values: defaults[<sweep_mode>][<channel>][<parameter>][<value>]
         self._defaults = {0: [{'measurement_mode': 0,
                                'bias_mode': 1,
@@ -1798,6 +1799,99 @@ class Keysight_B2900(Instrument):
         self.set_sweep_parameters(sweep=sweep)
         return self.get_tracedata()
 
+    def check_sweep_program(self, sweeps):
+        """
+        Checks if the sweeps <sweeps> can be taken as sweep program in the current sweep mode, without communicating with the instrument. This allows to reject a sweep program before a measurement starts.
+
+        Parameters
+        ----------
+        sweeps: list of array_likes of floats
+            Sweeps containing start, stop and step size (e.g. get_sweeps() of qkit.measure.transport.transport.sweep class).
+
+        Returns
+        -------
+        None
+        """
+        if not self._sweep_mode:  # 0 (VV-mode)
+            raise NotImplementedError('{!s}: Sweep programs in VV-mode (two channel sweep) not yet implemented.'.format(__name__))
+        nop = sum(int(round(np.abs((float(sweep[1])-float(sweep[0]))/float(sweep[2]))+1)) for sweep in sweeps)
+        if nop > 2500:
+            logging.error('{!s}: Cannot set sweep program with {:d} points, source lists are limited to 2500 points'.format(__name__, nop))
+            raise ValueError('{!s}: Cannot set sweep program with {:d} points, source lists are limited to 2500 points'.format(__name__, nop))
+        return
+
+    def set_sweep_program(self, sweeps):
+        """
+        Sets a sweep program of several sweeps <sweeps>. All bias values are uploaded as one source list to the instrument, so that the sweeps run hardware-timed one after another without round trips in between.
+
+        Parameters
+        ----------
+        sweeps: list of array_likes of floats
+            Sweeps containing start, stop and step size (e.g. get_sweeps() of qkit.measure.transport.transport.sweep class). Sleep values are ignored.
+
+        Returns
+        -------
+        None
+        """
+        # Corresponding Command: [:SOURce[c]]:<CURRent|VOLTage>:MODE mode
+        # Corresponding Command: [:SOURce[c]]:LIST:<CURRent|VOLTage> list
+        # Corresponding Command: :TRIGger[c]<:ACQuire|:TRANsient|[:ALL]>:SOURce[:SIGNal] source
+        # Corresponding Command: :TRIGger<:ACQuire|:TRANsient|[:ALL]>:COUNt
+        self.check_sweep_program(sweeps=sweeps)
+        channel_bias, channel_sense = self._sweep_channels*2  # 1 (IV-mode) | 2 (VI-mode)
+        values = []
+        for sweep in sweeps:
+            start, stop, step = np.array(sweep[:3], dtype=float)
+            values.append(np.linspace(start, stop, int(round(np.abs((stop-start)/step)+1))))
+        try:
+            logging.debug('{!s}: Set sweep program of channel {!s} to {!s}'.format(__name__, self._sweep_channels, sweeps))
+            self._program_nops = [len(val) for val in values]
+            values = np.concatenate(values)
+            self._write(':sour{:s}:{:s}:mode list'.format(self._cmd_chans[self._channels][channel_bias], self._IV_modes[self.get_bias_mode(channel_bias)]))
+            self._write(':sour{:s}:list:{:s} {:s}'.format(self._cmd_chans[self._channels][channel_bias], self._IV_modes[self.get_bias_mode(channel_bias)], ','.join(map(repr, map(float, values)))))
+            self.set_bias_value(val=values[0], channel=channel_bias)
+            self._write(':trig:acq:sour aint')
+            self._write(':trig:tran:sour aint')
+            self._write(':trig:all:count {:d}'.format(len(values)))
+        except Exception as e:
+            logging.error('{!s}: Cannot set sweep program of channel {!s} to {!s}'.format(__name__, self._sweep_channels, sweeps))
+            raise type(e)('{!s}: Cannot set sweep program of channel {!s} to {!s}\n{!s}'.format(__name__, self._sweep_channels, sweeps, e))
+        return
+
+    def get_program_data(self):
+        """
+        Runs the sweep program set by set_sweep_program and gets trace data of bias <bias_values> and sense <sense_values> of all sweeps in one read.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        data: list of tuples of numpy.array(float)
+            Measured bias and sense values of each sweep.
+        """
+        bias_values, sense_values = self.get_tracedata()
+        indices = np.cumsum(self._program_nops)[:-1]
+        return list(zip(np.split(bias_values, indices), np.split(sense_values, indices)))
+
+    def take_IV_program(self, sweeps):
+        """
+        Takes IV curves of all sweeps <sweeps> as one hardware-timed sweep program in set sweep mode.
+
+        Parameters
+        ----------
+        sweeps: list of array_likes of floats
+            Sweeps containing start, stop and step size (e.g. get_sweeps() of qkit.measure.transport.transport.sweep class). Sleep values are ignored.
+
+        Returns
+        -------
+        data: list of tuples of numpy.array(float)
+            Measured bias and sense values of each sweep.
+        """
+        self.set_sweep_program(sweeps=sweeps)
+        return self.get_program_data()
+
     def get_measurement_ccr(self):
         """
         Gets the entire measurement condition code register (ccr)
@@ -92,6 +92,9 @@ class NI_DAQ_IV(Instrument):
         self._sweep_channels = (0, 0)
         self.bias_data = None
         self.rate = None
+        self._reuse_tasks = False  # keep the sweep tasks configured between sweeps
+        self._sync_tasks = None
+        self._sync_tasks_key = None
         # reset
         if reset:
             self.reset()
@@ -634,14 +637,59 @@ class NI_DAQ_IV(Instrument):
         output_channel, input_channel = [''.join(i).strip() for i in zip(*np.array([[self._dev] * 2,
                                                                                     ['/ao', '/ai'],
                                                                                     self.get_sweep_channels()]))]
+        if self._reuse_tasks:
+            key = (output_channel, input_channel, self.rate, self._chan_config[self.get_sweep_channels()[1]])
+            if self._sync_tasks is None or self._sync_tasks_key != key:
+                if self._sync_tasks is not None:
+                    self._sync_tasks.close()
+                self._sync_tasks_key = key
+                self._sync_tasks = nidaq.SyncWriteRead(O_devchan=output_channel,  # device / bias channel
+                                                       I_devchan=input_channel,  # device / sense channel
+                                                       rate=self.rate,  # sweep rate
+                                                       config=self._chan_config[self.get_sweep_channels()[1]])  # sense channel configuration
         sense_data = nidaq.sync_write_read(O_devchan=output_channel,  # device / bias channel
                                            I_devchan=input_channel,  # device / sense channel
                                            waveform=self.bias_data,  # bias data
                                            rate=self.rate,  # sweep rate
                                            timeout=self.nop/self.rate*1.1,  # 1.1 fold of the calculated measurement time, just to be on the safe side
-                                           config=self._chan_config[self.get_sweep_channels()[1]])  # sense channel configuration
+                                           config=self._chan_config[self.get_sweep_channels()[1]],  # sense channel configuration
+                                           tasks=self._sync_tasks if self._reuse_tasks else None)
         return self.bias_data, sense_data
 
+    def set_reuse_tasks(self, status):
+        """
+        Sets whether the output and input tasks of sweeps stay configured between sweeps instead of being created and cleared for every sweep.
+        The tasks are recreated if channels, rate or channel configuration change and cleared with status False.
+
+        Parameters
+        ----------
+        status: bool
+            Status of task reuse.
+
+        Returns
+        -------
+        None
+        """
+        self._reuse_tasks = status
+        if not status and self._sync_tasks is not None:
+            self._sync_tasks.close()
+            self._sync_tasks = None
+
+    def get_reuse_tasks(self):
+        """
+        Gets whether the output and input tasks of sweeps stay configured between sweeps.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        status: bool
+            Status of task reuse.
+        """
+        return self._reuse_tasks
+
     def take_IV(self, sweep):
         """
         Takes IV curve with sweep parameters <sweep>.
@@ -674,6 +722,9 @@ class NI_DAQ_IV(Instrument):
         None
         """
         # Corresponding command: http://zone.ni.com/reference/en-XX/help/370471AM-01/daqmxcfunc/daqmxresetdevice/
+        if self._sync_tasks is not None:
+            self._sync_tasks.close()
+            self._sync_tasks = None
         nidaq.reset_device(self._dev)
 
     def set_defaults(self):
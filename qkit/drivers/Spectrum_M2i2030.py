@@ -68,6 +68,9 @@ class Spectrum_M2i2030(Instrument):
 
         # Load dll and open connection
         self._card_is_open = False
+        self._dma_buffers = []
+        self._dma_bufsize = None
+        self._dma_index = 0
         self._load_dll()
         self._open()
 
@@ -1114,27 +1117,56 @@ class Spectrum_M2i2030(Instrument):
 ### read data from card
 #######################
 
+    def _alloc_dma_buffer(self, lBufsize, alignment=4096):
+        '''
+        allocates a page-aligned ctypes buffer of lBufsize bytes.
+        The buffer is carved out of a slightly larger allocation which is kept
+        alive by the returned array.
+        '''
+        raw = (c_int8 * (lBufsize + alignment))()
+        offset = (-addressof(raw)) % alignment
+        return (c_int8 * lBufsize).from_buffer(raw, offset)
+
+    def _next_dma_buffer(self, lBufsize):
+        '''
+        returns the next one of two persistent DMA buffers and a numpy view on it.
+        The buffers are only reallocated if the requested size changes.
+        Alternating between both buffers keeps the data returned by the
+        previous readout valid while the next one is transferred.
+        '''
+        if self._dma_bufsize != lBufsize:
+            logging.debug(__name__ + ' : allocating DMA buffers of %i bytes' % lBufsize)
+            self._dma_buffers = []
+            for i in range(2):
+                buf = self._alloc_dma_buffer(lBufsize)
+                self._dma_buffers.append((buf, numpy.frombuffer(buf, numpy.int8)))
+            self._dma_bufsize = lBufsize
+            self._dma_index = 0
+        else:
+            self._dma_index = (self._dma_index + 1) % len(self._dma_buffers)
+        return self._dma_buffers[self._dma_index]
+
     def readout_raw_buffer(self, nr_of_channels=1):
         '''
-        Reads out the buffer, and returns a list with the size of the
-        buffer. Contains only data if the channel is triggered.
+        Transfers the card memory into the next persistent DMA buffer and returns it.
+        Contains only data if the channel is triggered.
 
         Input:
             None
 
         Output:
-            data (int[memsize]): The data of the buffer
+            data (numpy.int8[memsize*channels]): view on the DMA buffer,
+                valid until the next but one readout
         '''
         logging.debug(__name__ + ' : Readout raw buffer')
         lMemsize = self.get_memsize()
         lBufsize = lMemsize * nr_of_channels
 
-        a = (c_int8 * lBufsize)()
-        p_data = pointer(a)
+        buf, view = self._next_dma_buffer(lBufsize)
 
         # setup buffer
         err = self._spcm_win32.DefTransfer64(self._spcm_win32.handel, _spcm_regs.SPCM_BUF_DATA, 1,
-            0, p_data, c_int64(0), c_int64(lBufsize))
+            0, byref(buf), c_int64(0), c_int64(lBufsize))
         if (err!=0):
             logging.error(__name__ + ' : Error setting up buffer')
             self._get_error()
@@ -1148,12 +1180,11 @@ class Spectrum_M2i2030(Instrument):
             self._get_error()
             raise ValueError('Error communicating with device')
 
-        data = p_data.contents[:]
-        return data
+        return view
 
     def readout_singlechannel_singlemode_bin(self):
         '''
-        Reads out the buffer, and returns a list with the size of the
+        Reads out the buffer, and returns a view with the size of the
         buffer. Contains only data if the channel is triggered.
 
         Input:
@@ -1185,25 +1216,20 @@ class Spectrum_M2i2030(Instrument):
         offset = float(self.get_input_offset_ch0())
 
         data = self.readout_raw_buffer()
-        if data == 'timeout':
+        if isinstance(data, str):
             return data
-        data = numpy.array(data, numpy.float32)
-        data = []
-        data = 2.0 * amp * (data / 255.0) + offset
-        return data
+        return numpy.float32(2.0 * amp / 255.0) * data + numpy.float32(offset)
 
     def readout_singlechannel_multimode_bin(self):
         lMemsize = self.get_memsize()
         lSegsize = self.get_segmentsize()
 
-        lnumber_of_samples = lMemsize / lSegsize
+        lnumber_of_samples = lMemsize // lSegsize
 
         data = self.readout_raw_buffer()
-        if data == 'timeout':
+        if isinstance(data, str):
             return data
-        data = numpy.array(data, numpy.int8)
-        data = numpy.reshape(data, (lnumber_of_samples, lSegsize))
-        return data
+        return data.reshape((lnumber_of_samples, lSegsize))
 
     def readout_singlechannel_multimode_float(self):
         lMemsize = self.get_memsize()
@@ -1211,54 +1237,42 @@ class Spectrum_M2i2030(Instrument):
         amp = float(self.get_input_amp_ch0())
         offset = float(self.get_input_offset_ch0())
 
-        lnumber_of_samples = lMemsize / lSegsize
+        lnumber_of_samples = lMemsize // lSegsize
 
         data = self.readout_raw_buffer()
-        if data == 'timeout':
+        if isinstance(data, str):
             return data
-        data = numpy.array(data, numpy.float32)
-        data = numpy.reshape(data, (lnumber_of_samples, lSegsize))
-        data = 2.0 * amp * (data / 255.0) + offset
-        return data
+        data = data.reshape((lnumber_of_samples, lSegsize))
+        return numpy.float32(2.0 * amp / 255.0) * data + numpy.float32(offset)
 
     def readout_doublechannel_multimode_bin(self):
         lMemsize = self.get_memsize()
         lSegsize = self.get_segmentsize()
 
-        lnumber_of_samples = lMemsize / lSegsize
+        lnumber_of_samples = lMemsize // lSegsize
 
         data = self.readout_raw_buffer(nr_of_channels=2)
-        if data == 'timeout':
+        if isinstance(data, str):
             return data
-        data = numpy.array(data, numpy.int8)
-        data = numpy.reshape(data, (lMemsize, 2))
-        data0 = data[:,0]
-        data1 = data[:,1]
-        data0 = numpy.reshape(data0, (lnumber_of_samples, lSegsize))
-        data1 = numpy.reshape(data1, (lnumber_of_samples, lSegsize))
-        return (data0, data1)
+        data = data.reshape((lnumber_of_samples, lSegsize, 2))
+        return (data[:, :, 0], data[:, :, 1])
 
     def readout_doublechannel_multimode_float(self):
         lMemsize = self.get_memsize()
         lSegsize = self.get_segmentsize()
         amp0 = float(self.get_input_amp_ch0())
-        offset0 = float(self.get_input_offset_ch1())
-        amp1 = float(self.get_input_amp_ch0())
+        offset0 = float(self.get_input_offset_ch0())
+        amp1 = float(self.get_input_amp_ch1())
         offset1 = float(self.get_input_offset_ch1())
 
-        lnumber_of_samples = lMemsize / lSegsize
+        lnumber_of_samples = lMemsize // lSegsize
 
         data = self.readout_raw_buffer(nr_of_channels=2)
-        if data == 'timeout':
+        if isinstance(data, str):
             return data
-        data = numpy.array(data, numpy.int8)
-        data = numpy.reshape(data, (lMemsize, 2))
-        data0 = data[:,0]
-        data1 = data[:,1]
-        data0 = numpy.reshape(data0, (lnumber_of_samples, lSegsize))
-        data1 = numpy.reshape(data1, (lnumber_of_samples, lSegsize))
-        data0 = 2.0 * amp0 * (data0 / 255.0) + offset0
-        data1 = 2.0 * amp1 * (data1 / 255.0) + offset1
+        data = data.reshape((lnumber_of_samples, lSegsize, 2))
+        data0 = numpy.float32(2.0 * amp0 / 255.0) * data[:, :, 0] + numpy.float32(offset0)
+        data1 = numpy.float32(2.0 * amp1 / 255.0) * data[:, :, 1] + numpy.float32(offset1)
         return (data0, data1)
 
 
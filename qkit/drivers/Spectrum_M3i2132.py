@@ -69,6 +69,9 @@ class Spectrum_M3i2132(Instrument):
 
         # Load dll and open connection
         self._card_is_open = False
+        self._dma_buffers = []
+        self._dma_bufsize = None
+        self._dma_index = 0
         self._load_dll()
         self._open()
 
@@ -1189,58 +1192,78 @@ class Spectrum_M3i2132(Instrument):
 ### read data from card
 #######################
 
+    def _alloc_dma_buffer(self, lBufsize, alignment=4096):
+        '''
+        allocates a page-aligned ctypes buffer of lBufsize bytes.
+        The buffer is carved out of a slightly larger allocation which is kept
+        alive by the returned array.
+        '''
+        raw = (c_int8 * (lBufsize + alignment))()
+        offset = (-addressof(raw)) % alignment
+        return (c_int8 * lBufsize).from_buffer(raw, offset)
+
+    def _next_dma_buffer(self, lBufsize):
+        '''
+        returns the next one of two persistent DMA buffers and a numpy view on it.
+        The buffers are only reallocated if the requested size changes.
+        Alternating between both buffers allows the data of block N to be
+        processed while block N+1 is transferred into the other buffer.
+        '''
+        if self._dma_bufsize != lBufsize:
+            logging.debug(__name__ + ' : allocating DMA buffers of %i bytes' % lBufsize)
+            self._dma_buffers = []
+            for i in range(2):
+                buf = self._alloc_dma_buffer(lBufsize)
+                self._dma_buffers.append((buf, numpy.frombuffer(buf, numpy.int8)))
+            self._dma_bufsize = lBufsize
+            self._dma_index = 0
+        else:
+            self._dma_index = (self._dma_index + 1) % len(self._dma_buffers)
+        return self._dma_buffers[self._dma_index]
+
     def _buffer_setup(self):
-    	'''
-    	create a new data buffer
-    	(assuming the old one is now owned by another part of the program)
-    	'''
+        '''
+        hand the next persistent DMA buffer to the card.
+        Data returned by the readout functions are views on these buffers
+        and stay valid until the buffer is handed to the card again,
+        i.e. during the acquisition of the following block.
+        '''
         logging.debug(__name__ + ' : _buffer_setup')
         lMemsize = self.get_memsize()
         lBufsize = lMemsize * self._numchannels
 
-        # setup buffer
-        #if hasattr(self, '_pbuffer') and (len(self._pbuffer.contents) == lBufsize):
-        #	pass
-        	# tell the card that the buffer is now available again
-        	#err = self._spcm_win32.SetParam32(self._spcm_win32.handel, _spcm_regs.SPC_DATA_AVAIL_CARD_LEN,
-        	#	lBufsize)
-        	#if (err!=0):
-        	#	self._get_error()
-        	#	raise ValueError('Error communicating with device')
-        #else:
-        a = (c_int8 * lBufsize)()
-        p_data = pointer(a)
-
-		# tell card to use buffer
+        buf, view = self._next_dma_buffer(lBufsize)
+
+        # tell card to use buffer
         err = self._spcm_win32.DefTransfer64(self._spcm_win32.handel, _spcm_regs.SPCM_BUF_DATA, 1,
-        	0, p_data, c_int64(0), c_int64(lBufsize))
+            0, byref(buf), c_int64(0), c_int64(lBufsize))
         if (err!=0):
-        	logging.error(__name__ + ' : Error setting up buffer')
-        	self._get_error()
-        	raise ValueError('Error communicating with device')
+            logging.error(__name__ + ' : Error setting up buffer')
+            self._get_error()
+            raise ValueError('Error communicating with device')
 
         # start DMA transfers
         err = self._spcm_win32.SetParam32(self._spcm_win32.handel, _spcm_regs.SPC_M2CMD,
-        	_spcm_regs.M2CMD_DATA_STARTDMA)
+            _spcm_regs.M2CMD_DATA_STARTDMA)
         if (err!=0):
-        	logging.error(__name__ + ' : Error starting DMA transfer, error nr: %i' % err)
-        	self._get_error()
-        	raise ValueError('Error communicating with device')
+            logging.error(__name__ + ' : Error starting DMA transfer, error nr: %i' % err)
+            self._get_error()
+            raise ValueError('Error communicating with device')
 
-        # save new buffer possibly freeing old one, will break if DMA is in progress
-        self._pbuffer = p_data
+        self._pbuffer = view
 
 
     def readout_raw_buffer(self, nr_of_channels=1):
         '''
-        Reads out the buffer, and returns a list with the size of the
-        buffer. Contains only data if the channel is triggered.
+        Waits for the end of the data transfer and returns the buffer.
+        Contains only data if the channel is triggered.
 
         Input:
             None
 
         Output:
-            data (int[memsize]): The data of the buffer
+            data (numpy.int8[memsize*channels]): view on the DMA buffer,
+                valid until the buffer is reused by the next but one start
         '''
         logging.debug(__name__ + ' : Readout raw buffer')
 
@@ -1252,11 +1275,11 @@ class Spectrum_M3i2132(Instrument):
             self._get_error()
             raise ValueError('Error communicating with device')
 
-        return self._pbuffer.contents # [:]
+        return self._pbuffer
 
     def readout_singlechannel_singlemode_bin(self):
         '''
-        Reads out the buffer, and returns a list with the size of the
+        Reads out the buffer, and returns a view with the size of the
         buffer. Contains only data if the channel is triggered.
 
         Input:
@@ -1288,25 +1311,20 @@ class Spectrum_M3i2132(Instrument):
         offset = float(self.get_input_offset_ch0())
 
         data = self.readout_raw_buffer()
-        if data == 'timeout':
+        if isinstance(data, str):
             return data
-        data = numpy.array(data, numpy.float32)
-        data = []
-        data = 2.0 * amp * (data / 255.0) + offset
-        return data
+        return numpy.float32(2.0 * amp / 255.0) * data + numpy.float32(offset)
 
     def readout_singlechannel_multimode_bin(self):
         lMemsize = self.get_memsize()
         lSegsize = self.get_segmentsize()
 
-        lnumber_of_segments = lMemsize / lSegsize
+        lnumber_of_segments = lMemsize // lSegsize
 
         data = self.readout_raw_buffer()
-        if data == 'timeout':
+        if isinstance(data, str):
             return data
-        data = numpy.frombuffer(data, numpy.int8)
-        data = numpy.reshape(data, (1, lnumber_of_segments, lSegsize))
-        return data
+        return data.reshape((1, lnumber_of_segments, lSegsize))
 
     def readout_singlechannel_multimode_float(self):
         lMemsize = self.get_memsize()
@@ -1314,74 +1332,62 @@ class Spectrum_M3i2132(Instrument):
         amp = float(self.get_input_amp_ch0())
         offset = float(self.get_input_offset_ch0())
 
-        lnumber_of_segments = lMemsize / lSegsize
+        lnumber_of_segments = lMemsize // lSegsize
 
         data = self.readout_raw_buffer()
-        if data == 'timeout':
+        if isinstance(data, str):
             return data
-        data = numpy.array(data, numpy.float32)
-        data = numpy.reshape(data, (lnumber_of_segments, lSegsize))
-        data = 2.0 * amp * (data / 255.0) + offset
-        return data
+        data = data.reshape((lnumber_of_segments, lSegsize))
+        return numpy.float32(2.0 * amp / 255.0) * data + numpy.float32(offset)
 
     def readout_doublechannel_singlemode_bin(self):
         '''
-        Reads out the buffer, and returns a list with the size of the
+        Reads out the buffer, and returns a view with the size of the
         buffer. Contains only data if the channel is triggered.
 
         Input:
             None
 
         Output:
-            data (int[memsize]): The data of the buffer
+            data (int[memsize, 2]): The data of the buffer
         '''
         logging.debug(__name__ + ' : Readout binaries from buffer')
 
         lMemsize = self.get_memsize()
 
         data = self.readout_raw_buffer(nr_of_channels=2)
-        if data == 'timeout':
+        if isinstance(data, str):
             return data
-
-        data = numpy.array(data, numpy.int8)
-        data = numpy.reshape(data, (lMemsize, 2))
-        return data
+        return data[:2*lMemsize].reshape((lMemsize, 2))
 
     def readout_doublechannel_multimode_bin(self):
         lMemsize = self.get_memsize()
         lSegsize = self.get_segmentsize()
 
-        lnumber_of_segments = lMemsize / lSegsize
+        lnumber_of_segments = lMemsize // lSegsize
 
         data = self.readout_raw_buffer(nr_of_channels=2)
-        if data == 'timeout':
+        if isinstance(data, str):
             return data
-        data = numpy.frombuffer(data, numpy.int8, 2*lMemsize)
-        data = numpy.reshape(data, (lnumber_of_segments, lSegsize, 2))#(lMemsize, 2))
-        data = numpy.rollaxis(data, 2) # channel, segment, sample
-        return data
+        data = data[:2*lMemsize].reshape((lnumber_of_segments, lSegsize, 2))
+        return numpy.rollaxis(data, 2) # channel, segment, sample
 
     def readout_doublechannel_multimode_float(self):
         lMemsize = self.get_memsize()
         lSegsize = self.get_segmentsize()
         amp0 = float(self.get_input_amp_ch0())
-        offset0 = float(self.get_input_offset_ch1())
-        amp1 = float(self.get_input_amp_ch0())
+        offset0 = float(self.get_input_offset_ch0())
+        amp1 = float(self.get_input_amp_ch1())
         offset1 = float(self.get_input_offset_ch1())
 
-        lnumber_of_ssegments = lMemsize / lSegsize
+        lnumber_of_segments = lMemsize // lSegsize
 
         data = self.readout_raw_buffer(nr_of_channels=2)
-        if data == 'timeout':
+        if isinstance(data, str):
             return data
-        data = numpy.array(data, numpy.int8)
-        data = numpy.reshape(data, (lMemsize, 2))
-        data0 = data[:,0]
-        data1 = data[:,1]
-        data0 = numpy.reshape(data0, (lnumber_of_segments, lSegsize))
-        data1 = numpy.reshape(data1, (lnumber_of_segments, lSegsize))
-        data0 = 2.0 * amp0 * (data0 / 255.0) + offset0
-        data1 = 2.0 * amp1 * (data1 / 255.0) + offset1
+        data = data[:2*lMemsize].reshape((lnumber_of_segments, lSegsize, 2))
+        data0 = numpy.float32(2.0 * amp0 / 255.0) * data[:, :, 0] + numpy.float32(offset0)
+        data1 = numpy.float32(2.0 * amp1 / 255.0) * data[:, :, 1] + numpy.float32(offset1)
         return (data0, data1)
 
 
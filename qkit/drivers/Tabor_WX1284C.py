@@ -27,8 +27,9 @@ from qkit import visa
 import types
 import logging
 import numpy
-import struct
 import time
+import hashlib
+from qkit.drivers._awg_encoding import ieee_block, tabor_wfm_bytes, tabor_wfm_combined_bytes, tabor_sequence_bytes
 
 import pyvisa.constants as vc
 
@@ -99,6 +100,8 @@ class Tabor_WX1284C(Instrument):
 
         self._numchannels = numchannels
         self._choff = 0
+        # content hashes of the waveforms resident on the device, {(channel pair, segment): (length, digest)}
+        self._resident_wfms = {}
 
         if chpair == 2:
             self._choff = 2
@@ -259,6 +262,7 @@ class Tabor_WX1284C(Instrument):
             None
         '''
         logging.info(__name__ + ' : Resetting instrument')
+        self._resident_wfms = {}
         self.write('*RST')
         self.write(":INST1;:MARK:SOUR USER;:INST3;:MARK:SOUR USER")
 
@@ -408,6 +412,7 @@ class Tabor_WX1284C(Instrument):
             None
         '''
         logging.debug(__name__ + ' : Clear waveforms from channels')
+        self._resident_wfms = {}
         for idx in range(self._choff+1,self._numchannels + 1):
             self.write(':INST%i; :TRAC:DEL:ALL'%idx)
 
@@ -1044,16 +1049,19 @@ class Tabor_WX1284C(Instrument):
 
         if len(w)%16 != 0:
             raise ValueError #wfm length has to be divisible by 16
+        if m1 is None: m1 = numpy.zeros_like(w)
+        if m2 is None: m2 = numpy.zeros_like(w)
         if len(w) < 192:
-            w = numpy.append(w1, numpy.zeros(192 - len(w)))
+            w = numpy.append(w, numpy.zeros(192 - len(w)))
             m1 = numpy.append(m1, numpy.zeros(192 - len(m1)))
             m2 = numpy.append(m2, numpy.zeros(192 - len(m2)))
 
-        if(m1 == None): m1 = numpy.zeros_like(w)
-        if(m2 == None): m2 = numpy.zeros_like(w)
         if (not((len(w)==len(m1)) and ((len(m1)==len(m2))))):
             raise ValueError("error, the length of your waveform and markes does not match")
 
+        # only one channel of the pair changes, so the pair content is no longer known
+        self._resident_wfms.pop(((channel + 1) // 2, seg), None)
+
         self.write(':TRAC:DEF%i,%i' % (seg,len(w)))
 
         #Set specified channel and number of memory segment
@@ -1062,18 +1070,16 @@ class Tabor_WX1284C(Instrument):
         #set set single trace transfer mode
         self.write(':TRAC:MODE SING')
 
-        ws = ''
-        for i in range(0,len(w)):
-            ws = ws + struct.pack('<H', 8191*w[i]+8192+m1[i]*2**14+m2[i]*2**15)
-
-        self.write_raw(':TRAC#%i%i%s' %(int(numpy.log10(len(ws))+1), len(ws), ws))
+        self.write_raw(b':TRAC' + ieee_block(tabor_wfm_bytes(w, m1, m2)))
 
-    def wfm_send2(self, w1, w2, m1=None, m2=None, channel=1, seg=1):
+    def wfm_send2(self, w1, w2, m1=None, m2=None, channel=1, seg=1, only_changed=False):
         '''
         Sends two complete waveforms for channel pairs 1&2 or 3&4. All parameters need to be specified.
         Takes a waveform as generated by generate_waveform from qkit and first converts it to data usable by the AWG
         then sends it to the memory of the specified channel into the specified segment.
         Minimum waveform size is 192 points. If the two waveforms are shorter, they will be appended automatically.
+        The driver keeps a content hash of every segment it uploaded. With only_changed=True, the transfer is
+        skipped if the segment already holds the same data.
 
         See also: resend_waveform()
         Input:
@@ -1082,23 +1088,36 @@ class Tabor_WX1284C(Instrument):
             m2 (int[numpoints])  : marker2 (either 1 or 0, i.e. marker on or off)
             channel (int)        : channels are paired (1&2, 3&4) selecting either of one pair is fine
             seg (int)            : # of data segment the waveform is sent to (1 to 16000)
+            only_changed (bool)  : skip the upload if the segment content is unchanged
         Output:
-            None
+            True if the waveforms were uploaded, False if the upload was skipped
         '''
         channel +=self._choff
         if len(w1) != len(w2): raise ValueError("Waveform length is not equal.")
         if len(w1)%16 != 0: raise ValueError("Wfm length has to be divisible by 16")
+        if m1 is None : m1 = numpy.zeros_like(w1)
+        if m2 is None : m2 = numpy.zeros_like(w1)
         if len(w1) < 192:
             w1 = numpy.append(w1, numpy.zeros(192 - len(w1)))
             w2 = numpy.append(w2, numpy.zeros(192 - len(w2)))
             m1 = numpy.append(m1, numpy.zeros(192 - len(m1)))
             m2 = numpy.append(m2, numpy.zeros(192 - len(m2)))
 
-        if m1 is None : m1 = numpy.zeros_like(w1)
-        if m2 is None : m2 = numpy.zeros_like(w1)
         if (not((len(w1)==len(m1)) and ((len(m1)==len(m2))))):
             raise ValueError("error, the length of your waveform and markes does not match")
 
+        payload = tabor_wfm_combined_bytes(w1, w2, m1, m2)
+        key = ((channel + 1) // 2, seg)
+        content = (len(w1), hashlib.sha1(payload).hexdigest())
+        if only_changed and self._resident_wfms.get(key) == content:
+            logging.debug(__name__ + ' : Segment %i of channel %i unchanged, skipping upload' % (seg, channel))
+            return False
+        if self._resident_wfms.get(key, (None,))[0] != len(w1):
+            # a segment can only be redefined with a different length after deleting it. Segments which were not
+            # uploaded in this session (e.g. before a restart of the driver) have an unknown length.
+            self.write(':INST%s;:TRAC:DEL%i' % (channel, seg))
+        self._resident_wfms.pop(key, None)
+
         self.write(':TRAC:DEF%i,%i' % (seg,len(w1)))
 
         #Set specified channel and number of memory segment
@@ -1107,10 +1126,9 @@ class Tabor_WX1284C(Instrument):
         #set set combined trace transfer mode
         self.write(':TRAC:MODE COMB')
 
-        wfm = numpy.append(numpy.reshape(numpy.array(8191*w2+8192+m1*2**14+m2*2**15,dtype=numpy.dtype('<H')),(-1,16)),numpy.reshape(numpy.array(8191*w1+8192+m1*2**14+m2*2**15,dtype=numpy.dtype('<H')),(-1,16)),axis=1).flatten()
-        ws =str(buffer(wfm))
-
-        self.write_raw(':TRAC#%i%i%s' %(int(numpy.log10(len(ws))+1), len(ws), ws))
+        self.write_raw(b':TRAC' + ieee_block(payload))
+        self._resident_wfms[key] = content
+        return True
 
 
     def define_sequence(self,channel, segments=None,loops=None,jump_flags=None):
@@ -1135,18 +1153,15 @@ class Tabor_WX1284C(Instrument):
             if segments == 1 : segments = [1,1,1]
             elif segments == 2 : segments = [1,2,1,2]
             else: segments = range(1,segments+1)
-        if loops == None: loops = numpy.ones(len(segments))
-        if jump_flags == None: jump_flags = numpy.zeros(len(segments))
+        if loops is None: loops = numpy.ones(len(segments))
+        if jump_flags is None: jump_flags = numpy.zeros(len(segments))
         if not len(loops)==len(segments) or not len(jump_flags) == len(segments):
             raise ValueError("Length of segments (%i) does not match length of loops (%i) or length of jump_flags(%i)"%(len(segments),len(loops),len(jump_flags)))
         if len(segments)<3: raise ValueError("Sorry, you need at least 3 segments. Your command has %i segments"%(len(segments)))
 
         #Set specified channel
         self.write(':INST%s' % (channel))
-        ws = ''
-        for i in range(len(segments)):
-            ws = ws + struct.pack('<LHH', loops[i],segments[i],jump_flags[i])
-        self.write_raw(':SEQ#%i%i%s' %(int(numpy.log10(len(ws))+1), len(ws), ws))
+        self.write_raw(b':SEQ' + ieee_block(tabor_sequence_bytes(loops, segments, jump_flags)))
 
     def set_seq_length(self,length,chpair=1):
         self.define_sequence((2*chpair-1 if self._numchannels == 4 else chpair),length)
@@ -23,7 +23,7 @@ from qkit import visa
 import types
 import logging
 import numpy
-import struct
+from qkit.drivers._awg_encoding import tektronix_mmem_data, tektronix_wfm_decode
 import time
 #import hashlib
 
@@ -750,16 +750,7 @@ class Tektronix_AWG7062(Instrument):
             len3=int(data[i])
             len4=int(data[i+1:i+1+len3])
 
-            w=[]
-            m1=[]
-            m2=[]
-
-            for q in range(i+1+len3, i+1+len3+len4,5):
-                j=int(q)
-                c,d = struct.unpack('<fB', data[j:5+j])
-                w.append(c)
-                m2.append(int(d/2))
-                m1.append(d-2*int(d/2))
+            w, m1, m2 = tektronix_wfm_decode(data[i+1+len3:i+1+len3+len4])
 
             clock = float(data[i+1+len3+len4+5:len(data)])
 
@@ -1057,22 +1048,7 @@ class Tektronix_AWG7062(Instrument):
         self._values['files'][filename]['clock']=clock
         self._values['files'][filename]['numpoints']=len(w)
 
-        m = m1 + numpy.multiply(m2,2)
-        #ws = ''
-        #for i in range(0,len(w)):
-        #    ws = ws + struct.pack('<fB', w[i], int(m[i]))
-        ws= str.join('',[struct.pack('<fB', w[i], int(m[i])) for i in range(0,len(w))])
-
-        s1 = 'MMEM:DATA "%s",' % filename
-        s3 = 'MAGIC 1000\n'
-        s5 = ws
-        s6 = 'CLOCK %.10e\n' % clock
-
-        s4 = '#' + str(len(str(len(s5)))) + str(len(s5))
-        lenlen=str(len(str(len(s6) + len(s5) + len(s4) + len(s3))))
-        s2 = '#' + lenlen + str(len(s6) + len(s5) + len(s4) + len(s3))
-
-        mes = s1 + s2 + s3 + s4 + s5 + s6
+        mes = tektronix_mmem_data(filename, w, m1, m2, clock)
 
         if visa.qkit_visa_version == 1:
             self._visainstrument.write(mes)
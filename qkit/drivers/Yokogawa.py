@@ -89,6 +89,7 @@ class Yokogawa(Instrument):
         self._measurement_modes = {0: '2-wire', 1: '4-wire'}
         self._IV_modes = {0: 'curr', 1: 'volt'}
         self._IV_units = {0: 'A', 1: 'V'}
+        self._program = []  # sweeps of the sweep program
         # dict of defaults values: defaults[<sweep_mode>][<channel>][<parameter>][<value>]
         self._defaults = {0: [{'measurement_mode': 0,
                                'bias_mode': 1,
@@ -1638,6 +1639,90 @@ class Yokogawa(Instrument):
         self.set_sweep_parameters(sweep=sweep)
         return self.get_tracedata()
     
+    def set_sweep_program(self, sweeps):
+        """
+        Sets a sweep program of several sweeps <sweeps> that are run one after another by get_program_data, while the trace memory records all of them.
+        
+        Parameters
+        ----------
+        sweeps: list of array_likes of floats
+            Sweeps containing start, stop and step size (e.g. get_sweeps() of qkit.measure.transport.transport.sweep class). Sleep values are ignored.
+        
+        Returns
+        -------
+        None
+        """
+        self.set_sweep_parameters(sweep=sweeps[0])
+        self._program = list(sweeps)
+        return
+    
+    def get_program_data(self):
+        """
+        Runs the sweep program set by set_sweep_program and gets trace data of bias <bias_values> and sense <sense_values> of all sweeps in one read of the trace memory.
+        
+        Parameters
+        ----------
+        None
+        
+        Returns
+        -------
+        data: list of tuples of numpy.array(float)
+            Measured bias and sense values of each sweep.
+        """
+        # Corresponding Command: [:CHANnel<n>]:INITiate [DUAL]
+        # Corresponding Command: :STARt
+        # Corresponding Command: :TRACe[:STATe] 1|0|ON|OFF
+        # Corresponding Command: :TRACe:CHANnel<n>:DATA:READ? [TM|DO|DI|SF|SL|MF|ML|LC|HC|CP]
+        if not self._sweep_mode:  # 0 (VV-mode)
+            channel_bias, channel_sense = self._sweep_channels
+        elif self._sweep_mode in [1, 2]:  # 1 (IV-mode) | 2 (VI-mode)
+            channel_bias, channel_sense = self._sweep_channels*2
+        try:
+            logging.debug('{!s}: Take sweep program data of channel {:d} and {:d}'.format(__name__, channel_bias, channel_sense))
+            nops = []
+            for i, sweep in enumerate(self._program):
+                if i:
+                    self._set_sweep_start(val=float(sweep[0]), channel=channel_bias)
+                    self._set_sweep_stop(val=float(sweep[1]), channel=channel_bias)
+                    self._set_sweep_step(val=np.abs(float(sweep[2])), channel=channel_bias)
+                    self.set_bias_value(val=self._get_sweep_start(channel=channel_bias), channel=channel_bias)
+                nops.append(self._get_sweep_nop(channel=channel_bias))
+                self._write(':chan{:d}:init'.format(channel_bias))
+                self._wait_for_ready_for_sweep(channel=channel_bias)
+                if not i:
+                    self._write(':trac:stat 1')
+                    self._wait_for_OPC()
+                    time.sleep(100e-6)
+                self._write(':star')
+                self._wait_for_end_of_sweep(channel=channel_bias)
+                time.sleep(self.get_sense_delay(channel=channel_sense))
+                self._wait_for_end_of_measure(channel=channel_sense)
+            self._write(':trac:stat 0')
+            bias_values = np.fromstring(string=self._ask('trac:chan{:d}:data:read? sl'.format(channel_bias)), dtype=float, sep=',')
+            sense_values = np.fromstring(string=self._ask('trac:chan{:d}:data:read? ml'.format(channel_bias)), dtype=float, sep=',')
+            indices = np.cumsum(nops)[:-1]
+            return list(zip(np.split(bias_values, indices), np.split(sense_values, indices)))
+        except Exception as e:
+            logging.error('{!s}: Cannot take sweep program data of channel {!s} and {!s}'.format(__name__, channel_bias, channel_sense))
+            raise type(e)('{!s}: Cannot take sweep program data of channel {!s} and {!s}\n{!s}'.format(__name__, channel_bias, channel_sense, e))
+    
+    def take_IV_program(self, sweeps):
+        """
+        Takes IV curves of all sweeps <sweeps> as one sweep program in set sweep mode.
+        
+        Parameters
+        ----------
+        sweeps: list of array_likes of floats
+            Sweeps containing start, stop and step size (e.g. get_sweeps() of qkit.measure.transport.transport.sweep class). Sleep values are ignored.
+        
+        Returns
+        -------
+        data: list of tuples of numpy.array(float)
+            Measured bias and sense values of each sweep.
+        """
+        self.set_sweep_program(sweeps=sweeps)
+        return self.get_program_data()
+    
     def get_bias_ccr(self):
         """
         Gets the entire bias condition code register (ccr)
@@ -0,0 +1,137 @@
+# _awg_encoding.py
+# vectorized binary encoding of waveforms and sequence tables for the AWG drivers
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Helpers shared by the AWG drivers (Tektronix, Tabor) to build upload payloads.
+All encoders work on whole numpy arrays and return bytes, which replaces
+packing every sample with struct.pack in a python loop.
+"""
+
+import numpy
+
+# Tektronix WFM sample: little endian float32 amplitude followed by one marker byte
+TEKTRONIX_WFM_DTYPE = numpy.dtype([('w', '<f4'), ('m', 'u1')])
+# Tabor sequence table entry: loops (uint32), segment (uint16), jump flag (uint16)
+TABOR_SEQ_DTYPE = numpy.dtype([('loops', '<u4'), ('segment', '<u2'), ('jump', '<u2')])
+
+
+def _ascii(s):
+    return s.encode('ascii')
+
+
+def ieee_block_header(nbytes):
+    '''
+    returns the IEEE 488.2 definite length block header '#<n><nbytes>' for a payload of nbytes bytes
+    '''
+    length = str(int(nbytes))
+    return _ascii('#%i%s' % (len(length), length))
+
+
+def ieee_block(payload):
+    '''
+    prepends the IEEE 488.2 definite length block header to payload (bytes)
+    '''
+    return ieee_block_header(len(payload)) + payload
+
+
+def tektronix_wfm_bytes(w, m1=None, m2=None):
+    '''
+    encodes a waveform in the Tektronix WFM sample format (float32 amplitude + marker byte)
+
+    Input:
+        w (float[numpoints]) : waveform
+        m1, m2 (int[numpoints]) : markers, None for all zeros
+    Output:
+        bytes of length 5*numpoints
+    '''
+    w = numpy.asarray(w)
+    data = numpy.zeros(len(w), dtype=TEKTRONIX_WFM_DTYPE)
+    data['w'] = w
+    if m1 is not None:
+        data['m'] = numpy.asarray(m1, dtype=numpy.uint8)
+    if m2 is not None:
+        data['m'] += 2 * numpy.asarray(m2, dtype=numpy.uint8)
+    return data.tobytes()
+
+
+def tektronix_wfm_decode(payload):
+    '''
+    decodes Tektronix WFM samples into waveform and marker arrays
+
+    Output:
+        w (float[numpoints]), m1 (int[numpoints]), m2 (int[numpoints])
+    '''
+    data = numpy.frombuffer(payload, dtype=TEKTRONIX_WFM_DTYPE)
+    m = data['m'].astype(int)
+    return data['w'].astype(float), m % 2, m // 2
+
+
+def tektronix_wfm_file(w, m1, m2, clock):
+    '''
+    returns the content of a Tektronix WFM file (MAGIC 1000) as an IEEE block,
+    ready to be appended to 'MMEM:DATA "<filename>",'
+    '''
+    content = _ascii('MAGIC 1000\n') + ieee_block(tektronix_wfm_bytes(w, m1, m2)) + _ascii('CLOCK %.10e\n' % clock)
+    return ieee_block(content)
+
+
+def tektronix_mmem_data(filename, w, m1, m2, clock):
+    '''
+    returns the complete 'MMEM:DATA' command that stores a waveform as WFM file on a Tektronix AWG
+    '''
+    return _ascii('MMEM:DATA "%s",' % filename) + tektronix_wfm_file(w, m1, m2, clock)
+
+
+def tabor_wfm_words(w, m1=None, m2=None):
+    '''
+    converts a waveform in the range -1..1 and its markers to the 16 bit words of the Tabor WX1284C
+    (14 bit amplitude, marker 1 in bit 14, marker 2 in bit 15)
+    '''
+    words = 8191 * numpy.asarray(w, dtype=float) + 8192
+    if m1 is not None:
+        words += numpy.asarray(m1) * 2 ** 14
+    if m2 is not None:
+        words += numpy.asarray(m2) * 2 ** 15
+    return words.astype('<u2')
+
+
+def tabor_wfm_bytes(w, m1=None, m2=None):
+    '''
+    encodes a single waveform for the Tabor single trace transfer mode
+    '''
+    return tabor_wfm_words(w, m1, m2).tobytes()
+
+
+def tabor_wfm_combined_bytes(w1, w2, m1=None, m2=None):
+    '''
+    encodes two waveforms for the Tabor combined trace transfer mode,
+    interleaving blocks of 16 samples of the second and the first channel
+    '''
+    words1 = tabor_wfm_words(w1, m1, m2).reshape((-1, 16))
+    words2 = tabor_wfm_words(w2, m1, m2).reshape((-1, 16))
+    return numpy.hstack((words2, words1)).tobytes()
+
+
+def tabor_sequence_bytes(loops, segments, jump_flags):
+    '''
+    encodes a Tabor sequence table
+    '''
+    data = numpy.zeros(len(segments), dtype=TABOR_SEQ_DTYPE)
+    data['loops'] = loops
+    data['segment'] = segments
+    data['jump'] = jump_flags
+    return data.tobytes()
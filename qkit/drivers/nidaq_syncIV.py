@@ -415,7 +415,207 @@ def read_counter(devchan, samples=1, freq=1.0, timeout=1.0, src=""):
     else:
         return data
 
-def sync_write_read(O_devchan, I_devchan, waveform, rate=1e3, minv=-10.0, maxv=10.0, timeout=10.0, config=DAQmx_Val_Cfg_Default):
+def reduce_oversamples(readbuf, samples, oversamples):
+    """
+    Averages blocks of <oversamples> consecutive values of the read buffer <readbuf> to <samples> values.
+
+    Parameters
+    ----------
+    readbuf: np.array
+        Read data of at least samples*oversamples values. Surplus values at the end are ignored.
+    samples: int
+        Number of averaged values.
+    oversamples: int
+        Number of read values per averaged value.
+
+    Returns
+    -------
+    data: np.array
+        Averaged data.
+    """
+    return np.asarray(readbuf)[:samples*oversamples].reshape(samples, oversamples).mean(axis=1)
+
+
+class SyncWriteRead(object):
+    """
+    Analog output and synchronized analog input tasks of sync_write_read that stay configured between calls.
+    The tasks are created at the first call of write_read and only the sample clock timing is updated if the number of samples changes.
+    Use close() to clear the tasks.
+    """
+
+    def __init__(self, O_devchan, I_devchan, rate=1e3, minv=-10.0, maxv=10.0, config=DAQmx_Val_Cfg_Default, oversamples=10):
+        """
+        Parameters
+        ----------
+        O_devchan: strs
+            Device/output_channel specifier, such as 'Dev1/ao0'.
+        I_devchan: str
+            Device/input_channel specifier, such as 'Dev1/ai0'.
+        rate: float
+            Write rate in Hertz. The input is read with an <oversamples>-fold rate.
+        minv: float
+            Minimum voltage in Volts.
+        maxv: float
+            Maximum voltage in Volts.
+        config: str/int
+            Channel configuration.
+        oversamples: int
+            Number of read values that are averaged per written value.
+
+        Returns
+        -------
+        None
+        """
+        if type(config) is str:
+            if config in _config_map:
+                config = _config_map[config]
+            else:
+                raise ValueError('Unknown channel configuration {!s}'.format(config))
+        if not type(config) in (int, int32, uInt32, uInt64):
+            raise ValueError('Unknown channel configuration {!s}'.format(config))
+        self.O_devchan = O_devchan
+        self.I_devchan = I_devchan
+        self.rate = rate
+        self.minv = minv
+        self.maxv = maxv
+        self.config = config
+        self.oversamples = oversamples
+        self._AI_TaskHandle = None
+        self._AO_TaskHandle = None
+        self._samples = None
+        self._readbuf = None
+
+    def _create_tasks(self):
+        """
+        Creates the analog input task that is started by the start trigger of the analog output task.
+        """
+        # Check if the StartTrigger option is available
+        DAQmx_Val_Bit_TriggerUsageTypes_Start = 8
+        triggerAvailable = ctypes.c_int32()
+        CHK(nidaq.DAQmxGetDevAITrigUsage(self.I_devchan.encode('ascii'), ctypes.byref(triggerAvailable)))
+        if not ((int(triggerAvailable.value) & DAQmx_Val_Bit_TriggerUsageTypes_Start) == DAQmx_Val_Bit_TriggerUsageTypes_Start):
+            raise RuntimeError('Error: Input trigger for synchronization is not available on this device')
+        self._AI_TaskHandle = TaskHandle(0)
+        self._AO_TaskHandle = TaskHandle(0)
+        try:
+            # prepare Analog Input
+            CHK(nidaq.DAQmxCreateTask(b"", ctypes.byref(self._AI_TaskHandle)))
+            CHK(nidaq.DAQmxCreateAIVoltageChan(self._AI_TaskHandle,
+                                               self.I_devchan.encode('ascii'),
+                                               b"",
+                                               self.config,
+                                               float64(self.minv),
+                                               float64(self.maxv),
+                                               DAQmx_Val_Volts,
+                                               None))
+            # prepare Analog Output
+            CHK(nidaq.DAQmxCreateTask(b"", ctypes.byref(self._AO_TaskHandle)))
+            CHK(nidaq.DAQmxCreateAOVoltageChan(self._AO_TaskHandle,
+                                               self.O_devchan.encode('ascii'),
+                                               b"",
+                                               float64(self.minv),
+                                               float64(self.maxv),
+                                               DAQmx_Val_Volts,
+                                               None))
+            # register internal trigger, AI_TaskHandle starts with AO_TaskHandle
+            # /Dev1/ao/StartTrigger is the reference name to the output start trigger
+            triggerName = '/'+self.O_devchan.split('/')[0]+'/ao/StartTrigger'
+            CHK(nidaq.DAQmxCfgDigEdgeStartTrig(self._AI_TaskHandle,
+                                               triggerName.encode('ascii'),
+                                               DAQmx_Val_Rising))
+        except Exception:
+            self.close()
+            raise
+
+    def _set_samples(self, samples):
+        """
+        Sets the sample clock timing of both tasks for <samples> written values.
+        """
+        # align fix: After the trigger we read (samples+1) samples
+        AI_samples = self.oversamples * samples
+        CHK(nidaq.DAQmxCfgSampClkTiming(self._AI_TaskHandle,
+                                        b"",
+                                        float64(self.oversamples * self.rate),
+                                        DAQmx_Val_Rising,
+                                        DAQmx_Val_FiniteSamps,
+                                        uInt64(AI_samples + 1)))
+        CHK(nidaq.DAQmxCfgSampClkTiming(self._AO_TaskHandle,
+                                        b"",
+                                        float64(self.rate),
+                                        DAQmx_Val_Rising,
+                                        DAQmx_Val_FiniteSamps,
+                                        uInt64(samples)))
+        self._readbuf = np.zeros(AI_samples + 1, dtype=np.float64)
+        self._samples = samples
+
+    def write_read(self, waveform, timeout=10.0):
+        """
+        Writes values <waveform> to the output channel and reads the input channel synchronized.
+
+        Parameters
+        ----------
+        waveform: list/np.array
+            Voltage data to write to O_devchan in Volts.
+        timeout: float
+            Time to wait for completion in seconds.
+
+        Returns
+        -------
+        data: np.array
+            Sense data averaged over the oversamples.
+        """
+        sampswritten = int32()
+        sampsread = int32()
+        # cast data to np.array
+        waveform = np.array(waveform, dtype=np.float64)
+        samples = waveform.size
+        if self._AI_TaskHandle is None:
+            self._create_tasks()
+        if samples != self._samples:
+            self._set_samples(samples)
+        try:
+            CHK(nidaq.DAQmxWriteAnalogF64(self._AO_TaskHandle,
+                                          samples,
+                                          0,
+                                          float64(timeout),
+                                          DAQmx_Val_GroupByChannel,
+                                          ctypes.c_int64(waveform.ctypes.data),
+                                          ctypes.byref(sampswritten),
+                                          None))
+            # start the tasks, sampling of (samples +1) at AI_TaskHandle is started when AO_TaskHandle started
+            CHK(nidaq.DAQmxStartTask(self._AI_TaskHandle))
+            CHK(nidaq.DAQmxStartTask(self._AO_TaskHandle))
+            CHK(nidaq.DAQmxWaitUntilTaskDone(self._AI_TaskHandle,
+                                             float64(timeout)))
+            CHK(nidaq.DAQmxReadAnalogF64(self._AI_TaskHandle,
+                                         self._readbuf.size,
+                                         float64(timeout),
+                                         DAQmx_Val_GroupByChannel,
+                                         ctypes.c_int64(self._readbuf.ctypes.data),
+                                         self._readbuf.size,
+                                         ctypes.byref(sampsread),
+                                         None))
+        finally:
+            # stop the tasks, they keep their configuration for the next call
+            nidaq.DAQmxStopTask(self._AO_TaskHandle)
+            nidaq.DAQmxStopTask(self._AI_TaskHandle)
+        # average over the read samples to get the shape than put in
+        return reduce_oversamples(self._readbuf, samples, self.oversamples)
+
+    def close(self):
+        """
+        Stops and clears the tasks.
+        """
+        for task in (self._AO_TaskHandle, self._AI_TaskHandle):
+            if task is not None and task.value != 0:
+                nidaq.DAQmxStopTask(task)
+                nidaq.DAQmxClearTask(task)
+        self._AI_TaskHandle = None
+        self._AO_TaskHandle = None
+        self._samples = None
+
+
+def sync_write_read(O_devchan, I_devchan, waveform, rate=1e3, minv=-10.0, maxv=10.0, timeout=10.0, config=DAQmx_Val_Cfg_Default, tasks=None):
     """
     Writes values <waveform> to an output channel <O_devchan> and reads synchronized an input channel <I_devchan> with rate <rate>.
 
@@ -437,130 +637,65 @@ def sync_write_read(O_devchan, I_devchan, waveform, rate=1e3, minv=-10.0, maxv=1
         Time to wait for completion in seconds.
     config: str/int
         Channel configuration.
+    tasks: SyncWriteRead
+        Configured tasks that are reused instead of creating and clearing new tasks. The other parameters except waveform and timeout are ignored. Default is None.
 
     Returns
     -------
     data: np.array
         Sense data.
     """
-    if type(config) is str:
-        if config in _config_map:
-            config = _config_map[config]
-        else:
-            return None
-    if not type(config) in (int, int32, uInt32, uInt64):
+    if tasks is not None:
+        return tasks.write_read(waveform, timeout=timeout)
+    try:
+        tasks = SyncWriteRead(O_devchan, I_devchan, rate=rate, minv=minv, maxv=maxv, config=config)
+    except ValueError:
         return None
-    debug = False
-    oversamples = 10
-    sampswritten = int32()
-    sampsread = int32()
-    # cast data to np.array
-    waveform = np.array(waveform, dtype=np.float64)
-    samples = waveform.size
-    # Due to Nyquist theorem: sampling rate and samples have to be doubled for reading
-    # align fix: After the trigger we read (samples+1) samples and throw away the first
-    # (trigger sample) later
-    AI_rate = oversamples * rate
-    AI_samples = oversamples * samples
-    readbuf = np.zeros(AI_samples + 1, dtype=np.float64)
-    # Check if the StartTrigger option is available
-    DAQmx_Val_Bit_TriggerUsageTypes_Start = 8
-    triggerAvailable = ctypes.c_int32()
-    CHK(nidaq.DAQmxGetDevAITrigUsage(I_devchan.encode('ascii'), ctypes.byref(triggerAvailable)))
-    if not ((int(triggerAvailable.value) & DAQmx_Val_Bit_TriggerUsageTypes_Start) == DAQmx_Val_Bit_TriggerUsageTypes_Start):
-        raise RuntimeError('Error: Input trigger for synchronization is not available on this device')
-    # create task handles for input and output
-    AI_TaskHandle = TaskHandle(0)
-    AO_TaskHandle = TaskHandle(1)
-    # prepare Analog Input
-    CHK(nidaq.DAQmxCreateTask(str(AI_TaskHandle.value),
-                              ctypes.byref(AI_TaskHandle)))
-    CHK(nidaq.DAQmxCreateAIVoltageChan(AI_TaskHandle,
-                                       I_devchan.encode('ascii'),
-                                       b"",
-                                       config,
-                                       float64(minv),
-                                       float64(maxv),
-                                       DAQmx_Val_Volts,
-                                       None))
-    CHK(nidaq.DAQmxCfgSampClkTiming(AI_TaskHandle,
-                                    b"",
-                                    float64(AI_rate),
-                                    DAQmx_Val_Rising,
-                                    DAQmx_Val_FiniteSamps,
-                                    uInt64(AI_samples + 1)))
-    if debug:
-        print('Debug: Analog Input AI_TaskHandle prepared')
-    # prepare Analog Output
-    CHK(nidaq.DAQmxCreateTask(str(AO_TaskHandle.value),
-                              ctypes.byref(AO_TaskHandle)))
-    CHK(nidaq.DAQmxCreateAOVoltageChan(AO_TaskHandle,
-                                       O_devchan.encode('ascii'),
-                                       b"",
-                                       float64(minv),
-                                       float64(maxv),
-                                       DAQmx_Val_Volts,
-                                       None))
-    CHK(nidaq.DAQmxCfgSampClkTiming(AO_TaskHandle,
-                                    b"",
-                                    float64(rate),
-                                    DAQmx_Val_Rising,
-                                    DAQmx_Val_FiniteSamps,
-                                    uInt64(samples)))
-    if debug:
-        print('Debug: Analog Output AO_TaskHandle prepared')
-    # register internal trigger, AI_TaskHandle starts with AO_TaskHandle
-    # /Dev1/ao/StartTrigger is the reference name to the output start trigger
-    triggerName = '/'+O_devchan.split('/')[0]+'/ao/StartTrigger'
-    CHK(nidaq.DAQmxCfgDigEdgeStartTrig(AI_TaskHandle,
-                                       triggerName.encode('ascii'),
-                                       DAQmx_Val_Rising))
-    CHK(nidaq.DAQmxWriteAnalogF64(AO_TaskHandle,
-                                  samples,
-                                  0,
-                                  float64(timeout),
-                                  DAQmx_Val_GroupByChannel,
-                                  ctypes.c_int64(waveform.ctypes.data),
-                                  ctypes.byref(sampswritten),
-                                  None))
-    if debug:
-        print('Debug: read_write() Analog-Output buffer written:', waveform, sampswritten)
-    # start the tasks, sampling of (samples +1) at AI_TaskHandle is started when AO_TaskHandle started
-    CHK(nidaq.DAQmxStartTask(AI_TaskHandle))
-    CHK(nidaq.DAQmxStartTask(AO_TaskHandle))
-    CHK(nidaq.DAQmxWaitUntilTaskDone(AI_TaskHandle,
-                                     float64(timeout)))
-    CHK(nidaq.DAQmxReadAnalogF64(AI_TaskHandle,
-                                 AI_samples + 1,
-                                 float64(timeout),
-                                 DAQmx_Val_GroupByChannel,
-                                 ctypes.c_int64(readbuf.ctypes.data),
-                                 AI_samples + 1,
-                                 ctypes.byref(sampsread),
-                                 None))
-    if debug:
-        print('Debug: read_write() Analog-Input buffer read:', readbuf, readbuf.size)
-    # stop the whole thing, fixme: use try...except !
-    if AO_TaskHandle.value != 0:
-        nidaq.DAQmxStopTask(AO_TaskHandle)
-        nidaq.DAQmxClearTask(AO_TaskHandle)
-    if AI_TaskHandle.value != 0:
-        nidaq.DAQmxStopTask(AI_TaskHandle)
-        nidaq.DAQmxClearTask(AI_TaskHandle)
-    # again align fix: throw away the first sample and average over the read samples
-    # to get the shape than put in
-    returnbuf = np.zeros(samples)
-    aveis = np.arange(oversamples)
-    if debug:
-        print(len(readbuf), len(returnbuf), aveis)
-    for i in np.arange(samples):
-        for ii in aveis:
-            returnbuf[i] += readbuf[oversamples * i + ii]
-    return returnbuf / float(oversamples)
+    try:
+        return tasks.write_read(waveform, timeout=timeout)
+    finally:
+        tasks.close()
+
+
+def benchmark_reduction(samples=10000, oversamples=10, repeat=10):
+    """
+    Compares the run time of the averaging over oversamples in a python loop and reduce_oversamples for a simulated read buffer.
+
+    Parameters
+    ----------
+    samples: int
+        Number of written values.
+    oversamples: int
+        Number of read values per written value.
+    repeat: int
+        Number of repetitions.
+
+    Returns
+    -------
+    times: tuple of float
+        Mean run time of the loop and of reduce_oversamples in seconds.
+    """
+    readbuf = np.random.normal(size=oversamples * samples + 1)
+    t0 = time.time()
+    for _ in range(repeat):
+        returnbuf = np.zeros(samples)
+        for i in np.arange(samples):
+            for ii in np.arange(oversamples):
+                returnbuf[i] += readbuf[oversamples * i + ii]
+        returnbuf /= float(oversamples)
+    t_loop = (time.time() - t0) / repeat
+    t0 = time.time()
+    for _ in range(repeat):
+        data = reduce_oversamples(readbuf, samples, oversamples)
+    t_vec = (time.time() - t0) / repeat
+    if not np.allclose(returnbuf, data):
+        raise RuntimeError('reduce_oversamples differs from loop')
+    return t_loop, t_vec
 
 
 if __name__ == '__main__':
     # some tests
+    print('oversample reduction: loop {:.3g}s, vectorized {:.3g}s'.format(*benchmark_reduction()))
     buf = np.linspace(0, 5, 10)
     print(sync_write_read('Dev1/ai0', 'Dev1/ao0', buf, rate=100000))
 
@@ -122,10 +122,15 @@ class virtual_MultiplexingReadout(Instrument):
         self._adc_channel_I = 1
         self._adc_channel_Q = 0
         self._phase = 0
+        # demodulation matrices, keyed by (IF frequencies, samplerate, samples)
+        self._demod_kernels = {}
         
         # used for DDC
         self.lowpass_order = 20
         self.cut_off_freq_ratio = 0.8  # ratio of the IQ frequency up to that is transmitted
+        self.ddc_decimation = 1  # only keep every n-th sample of the down converted traces
+        self._ddc_filters = {}
+        self._ddc_phasors = {}
         # lowpass_delay = (lowpass_order / 2) / freqs
         # a lowpass of order N delays the signal by N/2 samples
 
@@ -201,6 +206,9 @@ class virtual_MultiplexingReadout(Instrument):
         """
         self.sample.readout_mw_src.set_frequency(frequency)
         self._LO = frequency
+        self._demod_kernels = {}
+        self._ddc_filters = {}
+        self._ddc_phasors = {}
 
     def do_get_LO(self):
         return self._LO
@@ -213,6 +221,9 @@ class virtual_MultiplexingReadout(Instrument):
 
     def do_set_tone_freq(self, freqs):
         self._tone_freq = np.array(freqs)
+        self._demod_kernels = {}
+        self._ddc_filters = {}
+        self._ddc_phasors = {}
 
     def do_get_tone_freq(self):
         return self._tone_freq
@@ -274,21 +285,11 @@ class virtual_MultiplexingReadout(Instrument):
         """
         Is, Qs = self._acquire_IQ()
         if ddc is None:
-            if len(Is.shape) == 2:
-                sig_amp = np.zeros((Is.shape[1], len(self._tone_freq)))
-                sig_pha = np.zeros((Is.shape[1], len(self._tone_freq)))
-                for idx in range(Is.shape[1]):
-                    sig_amp[idx, :], sig_pha[idx, :] = self.IQ_decode(Is[:, idx], Qs[:, idx])
-            else:
-                sig_amp, sig_pha = self.IQ_decode(Is, Qs)
+            # all segments are demodulated at once, sig_amp and sig_pha are (segments, tones) if segmented
+            sig_amp, sig_pha = self.IQ_decode(Is, Qs)
         else:
-            if len(Is.shape) == 2:
-                sig_amp = np.zeros((Is.shape[1],Is.shape[0], len(self._tone_freq)))
-                sig_pha = np.zeros((Is.shape[1],Is.shape[0], len(self._tone_freq)))
-                for idx in range(Is.shape[1]):
-                    sig_amp[idx,:, :], sig_pha[idx,:, :] = self.digital_down_conversion(Is[:, idx], Qs[:, idx])
-            else:
-                sig_amp, sig_pha = self.digital_down_conversion(Is, Qs)
+            # all segments are converted at once, sig_amp and sig_pha are (segments, samples, tones) if segmented
+            sig_amp, sig_pha = self.digital_down_conversion(Is, Qs)
         if timeTrace:
             return sig_amp, sig_pha, Is, Qs
         else:
@@ -330,60 +331,116 @@ class virtual_MultiplexingReadout(Instrument):
             return amplitude and phase of requested frequency components
 
             Input:
-                I, Q       - signal acquired at rate samplerate
+                I, Q       - signal acquired at rate samplerate, either (samples,)
+                             or (samples, segments) to decode all segments at once
                 freqs      - interesting frequency components
                 samplerate - rate at which I and Q were sampled
                 phase      - apply additional rotation to I+1j*Q
 
             Output:
-                two vectors: amplitude and phase of each fft point
+                two vectors: amplitude and phase of each fft point,
+                (segments, freqs) arrays for segmented input
         """
         if samplerate is None: samplerate = self.get_adc_clock()
         if freqs is None: freqs = self._tone_freq
         if phase is None: phase = self._phase
         freqs = np.array(freqs)-self._LO
 
-        sig_t = (np.array(I) + 1j*np.array(Q))*np.exp(1j*phase)
-        return self.fourieranalysis(sig_t, freqs, samplerate)
+        sig_t = np.asarray(I) + 1j*np.asarray(Q)
+        f_signal = self._demodulate(sig_t, freqs, samplerate)*np.exp(1j*phase)
+        return np.abs(f_signal).T, np.angle(f_signal).T
 
     def fourieranalysis(self, signal_t, freqs, samplerate):
         """
         useful for only a few samples and freqs because no interpolation is needed
-        :param signal_t: The complex waveform to be analyzed
+        :param signal_t: The complex waveform to be analyzed, (samples,) or (samples, segments)
         :param freqs: Float or array of Floats of frequencies
         :param samplerate:
-        :return: [amplitudes, phases], each of them being an array over len(freqs)
+        :return: [amplitudes, phases], each of them being an array over len(freqs) (and segments)
         """
-        freqs = np.atleast_1d(freqs)
-        w = np.array([np.exp(-2 * np.pi * 1j * f * np.arange(len(signal_t)) / samplerate) for f in freqs])
-        f_signal = np.sum(w * signal_t, axis=1) / len(signal_t)
+        f_signal = self._demodulate(np.asarray(signal_t), freqs, samplerate)
         sig_amp = np.abs(f_signal)
         sig_pha = np.angle(f_signal)
         return sig_amp, sig_pha
 
-    def digital_down_conversion(self, I, Q, freqs=None):
+    def _demodulate(self, signal_t, freqs, samplerate):
+        """
+        project the complex waveform(s) onto the given frequencies with a single matrix product
+        (freqs x samples) @ (samples x segments)
+        """
+        return self._demodulation_kernel(freqs, samplerate, signal_t.shape[0]).dot(signal_t)
+
+    def _demodulation_kernel(self, freqs, samplerate, samples):
+        """
+        returns the (freqs x samples) matrix exp(-2 pi i f t)/samples used by fourieranalysis.
+        the matrix is cached until the tone frequencies or the LO are changed.
+        """
+        freqs = np.atleast_1d(freqs)
+        key = (tuple(freqs.tolist()), float(samplerate), int(samples))
+        w = self._demod_kernels.get(key)
+        if w is None:
+            if len(self._demod_kernels) > 16:
+                self._demod_kernels = {}
+            w = np.exp(-2j * np.pi * np.outer(freqs, np.arange(samples)) / samplerate) / samples
+            self._demod_kernels[key] = w
+        return w
+
+    def digital_down_conversion(self, I, Q, freqs=None, decimation=None):
         """
         performs a digital down conversion to get rid of the carrier frequency.
         Useful for timetrace readout, when only envelope is needed.
-        :param I:
-        :param Q:
-        :param freqs:
-        :return:
+        All segments are mixed and filtered at once, filter coefficients and mixing phasors are cached.
+        :param I: (samples,) or (samples, segments)
+        :param Q: (samples,) or (samples, segments)
+        :param freqs: IF frequencies, defaults to the tone frequencies
+        :param decimation: keep only every n-th sample of the filtered traces, defaults to self.ddc_decimation
+        :return: amplitude and phase, (samples, freqs) or (segments, samples, freqs)
         """
         if freqs is None:
             freqs = np.array(self._tone_freq) - self._LO
+        if decimation is None:
+            decimation = self.ddc_decimation
+        freqs = np.atleast_1d(freqs)
         samplerate = self.get_adc_clock()
-        sig_amp = np.zeros((len(freqs), len(I)))
-        sig_pha = np.zeros((len(freqs), len(I)))
-        t = np.linspace(0, float(len(I)) / samplerate, len(I))
+        sig = np.asarray(I) + 1j*np.asarray(Q)
+        phasors = self._ddc_phasor(freqs, samplerate, sig.shape[0])
+        if sig.ndim == 2:
+            phasors = phasors[:, :, np.newaxis]
+        signal_down = phasors*sig  # freqs, samples(, segments)
+        signal_down_lp = np.empty(signal_down[:, ::decimation].shape, dtype=np.complex128)
         for i, f in enumerate(freqs):
+            signal_down_lp[i] = signal.sosfilt(self._ddc_filter(f, samplerate), signal_down[i], axis=0)[::decimation]
+        # transform because readout expects the data this way
+        signal_down_lp = np.moveaxis(signal_down_lp, 0, -1)
+        if signal_down_lp.ndim == 3:
+            signal_down_lp = signal_down_lp.swapaxes(0, 1)
+        return np.abs(signal_down_lp), np.angle(signal_down_lp)
+
+    def _ddc_filter(self, f, samplerate):
+        """
+        returns the second-order sections of the Butterworth lowpass used to down convert the IF frequency f
+        """
+        key = (float(f), float(samplerate), self.lowpass_order, self.cut_off_freq_ratio)
+        sos = self._ddc_filters.get(key)
+        if sos is None:
             cut_off_freq = self.cut_off_freq_ratio * np.abs(f) / (samplerate / 2)
-            b, a = signal.butter(self.lowpass_order, cut_off_freq, 'low')  # design the filter
-            signal_down = (I+1j*Q)*np.exp(1j*2*np.pi*f*t)
-            signal_down_lp = scipy.signal.lfilter(b, a, signal_down)
-            sig_amp[i, :] = np.abs(signal_down_lp)
-            sig_pha[i, :] = np.angle(signal_down_lp)
-        return sig_amp.T, sig_pha.T  # transform because readout expects the data this way
+            sos = signal.butter(self.lowpass_order, cut_off_freq, 'low', output='sos')  # design the filter
+            self._ddc_filters[key] = sos
+        return sos
+
+    def _ddc_phasor(self, freqs, samplerate, samples):
+        """
+        returns the (freqs x samples) mixing phasors exp(2 pi i f t) of the digital down conversion
+        """
+        key = (tuple(freqs.tolist()), float(samplerate), int(samples))
+        phasors = self._ddc_phasors.get(key)
+        if phasors is None:
+            if len(self._ddc_phasors) > 16:
+                self._ddc_phasors = {}
+            t = np.linspace(0, float(samples) / samplerate, samples)
+            phasors = np.exp(2j*np.pi*np.outer(freqs, t))
+            self._ddc_phasors[key] = phasors
+        return phasors
 
     # +++++ DAC (AWG) settings ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
         
@@ -9,6 +9,9 @@ usage:
 * load spec (which is the adc card driver) first on computer with adc card physically installed
 mspec = qkit.instruments.create('mspec','virtual_measure_spec',spec,samples=1)
 * set gate function afterwards or pass in the call as gate_func
+* continuous acquisition without dead time (FIFO mode, currently Spectrum_M4i2211):
+for block in mspec.stream(blocks=1000, prefetch=8):
+    hdf_ds.append(block)
 """
 
 # This program is free software; you can redistribute it and/or modify
@@ -29,6 +32,11 @@ import qkit
 from qkit.core.instrument_base import Instrument
 import numpy
 import types
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 
 # import time
@@ -76,6 +84,7 @@ class virtual_measure_spec(Instrument):
         self.add_function('get_clock')
         self.add_function('set_gate_func')
         self.add_function('acquire')
+        self.add_function('stream')
         # self.add_function('measure_1d_avg')
         # self.add_function('measure_1d')
         self.add_function('spec_start')
@@ -295,8 +304,13 @@ class virtual_measure_spec(Instrument):
             result = self._acquire_multimode()
         else:
             result = self._acquire_singlemode()
-        # apply offsets
-        if (self._offsets != None):
+        return self._apply_offsets_and_window(result)
+
+    def _apply_offsets_and_window(self, result):
+        '''
+        add the channel offsets to averaged data and truncate it to the window set by set_window
+        '''
+        if (self._offsets is not None):
             for idx in range(len(self._offsets)):
                 if (self._segments == 1):
                     # shape of result is (samples, channels)
@@ -310,6 +324,99 @@ class virtual_measure_spec(Instrument):
             result = result[self.bit_pre:self.bit_post, :, :]
         return result
 
+    def stream(self, blocks=None, buffers=16, averaged=True, prefetch=0):
+        '''
+        continuously acquire blocks of _segments*_averages triggers in FIFO mode and
+        yield them as they arrive, without dead time between blocks.
+        memory is bounded by the ring buffer of the card and the prefetch queue.
+
+        parameters:
+            blocks - number of blocks to acquire, None to stream until the generator is closed
+            buffers - number of blocks held by the ring buffer of the card
+            averaged - if True, yield averaged blocks shaped like the result of acquire,
+                otherwise yield the raw block (sample, average, channel[, segment])
+            prefetch - if > 0, the card is read out by a background thread which
+                queues up to prefetch copies of the blocks. this lets processing
+                and storage of block N overlap with the transfer of the following blocks.
+                with prefetch=0, raw blocks are views on the ring buffer and only valid
+                until the next block is requested.
+        '''
+        if not hasattr(self._dacq, 'fifo_start'):
+            raise ValueError('meas_spec: card driver does not support FIFO streaming')
+        if not self._multimode:
+            raise ValueError('meas_spec: FIFO streaming requires multimode')
+        triggers = self._segments * self._averages
+        blocksize = self._samples * triggers * self._numchannels
+        if (blocksize % 4096 != 0):
+            raise ValueError('meas_spec: samples*segments*averages*channels must be a multiple of 4096 for FIFO streaming')
+
+        def process(raw):
+            dat = raw.reshape((triggers, self._samples, self._numchannels))
+            dat = self._reorder_multimode(numpy.rollaxis(dat, 2), averaged)
+            if averaged:
+                dat = self._apply_offsets_and_window(dat)
+            return dat
+
+        loops = self._dacq.get_loops()
+        self._dacq.stop()
+        self._dacq.set_loops(0 if blocks is None else blocks * triggers)
+        if (self._gate_func): self._gate_func(False)
+        self._dacq.fifo_start(blocksize, buffers)
+        if (self._gate_func): self._gate_func(True)
+        try:
+            if prefetch > 0:
+                for dat in self._stream_prefetch(blocks, prefetch):
+                    yield process(dat)
+            else:
+                for dat in self._dacq.fifo_blocks(blocks):
+                    yield process(dat)
+        finally:
+            if (self._gate_func): self._gate_func(False)
+            self._dacq.fifo_stop()
+            self._dacq.set_loops(loops)
+
+    def _stream_prefetch(self, blocks, prefetch):
+        '''
+        read out the FIFO in a background thread and yield copies of the blocks from a bounded queue
+        '''
+        q = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            # gives up when the consumer stopped, it might not empty the queue anymore
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def reader():
+            try:
+                for dat in self._dacq.fifo_blocks(blocks):
+                    if not put(numpy.array(dat)):
+                        return
+                put(done)
+            except Exception as e:
+                put(e)
+
+        t = threading.Thread(target=reader)
+        t.daemon = True
+        t.start()
+        try:
+            while True:
+                item = q.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            t.join()
+
     def _acquire_multimode(self):
         '''
         acquire the number of traces specified by the _averages and _blocks parameters
@@ -387,6 +494,13 @@ class virtual_measure_spec(Instrument):
             dat = self._dacq.readout_doublechannel_multimode_bin()  # channel, segment, sample
         else:
             dat = self._dacq.readout_singlechannel_multimode_bin()  # channel, segment, sample
+        return self._reorder_multimode(dat, averaged)
+
+    def _reorder_multimode(self, dat, averaged):
+        '''
+        reorder a block acquired in multiple recording mode from (channel, segment, sample) to
+        (sample, average, channel[, segment]) and optionally average it
+        '''
         dat = numpy.swapaxes(dat, 0, 2)  # sample, segment, channel
         # add segments axis at the end
         if self._segments > 1:
@@ -413,10 +527,10 @@ class virtual_measure_spec(Instrument):
     def _multimode_average(self, dat):
         ''' faster-than-numpy averaging '''
         shp = dat.shape
-        sum = numpy.zeros((shp[0], shp[2]), np.int)
+        sum = numpy.zeros((shp[0], shp[2]), numpy.int32)
         for i in range(shp[1]):
             sum += dat[:, i, :]
-        return np.array(res, np.float32) / shp[1]
+        return numpy.array(sum, numpy.float32) / shp[1]
 
     def _acquire_singlemode(self):
         '''
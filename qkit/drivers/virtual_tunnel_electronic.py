@@ -1063,6 +1063,22 @@ class virtual_tunnel_electronic(Instrument):
         -------
         None
         """
+        return self._SMU.set_sweep_parameters(self._convert_sweep(sweep))
+
+    def _convert_sweep(self, sweep):
+        """
+        Converts sweep parameters <sweep> of the pseudo bias to sweep parameters of the SMU in VV-mode.
+
+        Parameters
+        ----------
+        sweep: array_likes of floats
+            Sweep range containing start, stop and step size.
+
+        Returns
+        -------
+        sweep: array_likes of floats
+            Sweep range of the SMU.
+        """
         if not self._sweep_mode:  # 0 (VV-mode)
             if not self._pseudo_bias_mode:  # 0 (current bias)
                 sweep = np.array(sweep).astype(float) / self._dAdV
@@ -1071,7 +1087,7 @@ class virtual_tunnel_electronic(Instrument):
             elif self._pseudo_bias_mode:  # 0 (voltage bias)
                 sweep = np.array(sweep).astype(float) * self._Vdiv
                 sweep[2] = np.abs(sweep[2])
-        return self._SMU.set_sweep_parameters(sweep)
+        return sweep
 
     def get_tracedata(self):
         """
@@ -1088,7 +1104,26 @@ class virtual_tunnel_electronic(Instrument):
         sense_values: numpy.array(float)
             Measured sense values.
         """
-        bias_values, sense_values = self._SMU.get_tracedata()
+        return self._convert_tracedata(*self._SMU.get_tracedata())
+
+    def _convert_tracedata(self, bias_values, sense_values):
+        """
+        Converts trace data of bias <bias_values> and sense <sense_values> of the SMU to current <I_values> and voltage <V_values> values.
+
+        Parameters
+        ----------
+        bias_values: numpy.array(float)
+            Measured bias values of the SMU.
+        sense_values: numpy.array(float)
+            Measured sense values of the SMU.
+
+        Returns
+        -------
+        I_values: numpy.array(float)
+            Current values.
+        V_values: numpy.array(float)
+            Voltage values.
+        """
         if self._sweep_mode == 0:  # IV-mode
             if not self._pseudo_bias_mode:  # 0 (current bias)
                 I_values = bias_values * self._dAdV
@@ -1123,6 +1158,70 @@ class virtual_tunnel_electronic(Instrument):
         self.set_sweep_parameters(sweep=sweep)
         return self.get_tracedata()
 
+    def check_sweep_program(self, sweeps):
+        """
+        Checks if the sweeps <sweeps> can be taken as sweep program by the SMU (see check_sweep_program of the SMU driver).
+
+        Parameters
+        ----------
+        sweeps: list of array_likes of floats
+            Sweeps containing start, stop and step size (e.g. get_sweeps() of qkit.measure.transport.transport.sweep class).
+
+        Returns
+        -------
+        None
+        """
+        if hasattr(self._SMU, 'check_sweep_program'):
+            self._SMU.check_sweep_program([self._convert_sweep(sweep) for sweep in sweeps])
+        return
+
+    def set_sweep_program(self, sweeps):
+        """
+        Sets a sweep program of several sweeps <sweeps> on the SMU, that runs all sweeps one after another (see set_sweep_program of the SMU driver).
+
+        Parameters
+        ----------
+        sweeps: list of array_likes of floats
+            Sweeps containing start, stop and step size (e.g. get_sweeps() of qkit.measure.transport.transport.sweep class). Sleep values are ignored.
+
+        Returns
+        -------
+        None
+        """
+        return self._SMU.set_sweep_program([self._convert_sweep(sweep) for sweep in sweeps])
+
+    def get_program_data(self):
+        """
+        Runs the sweep program set by set_sweep_program and gets trace data of current <I_values> and voltage <V_values> of all sweeps.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        data: list of tuples of numpy.array(float)
+            Current and voltage values of each sweep.
+        """
+        return [self._convert_tracedata(*data) for data in self._SMU.get_program_data()]
+
+    def take_IV_program(self, sweeps):
+        """
+        Takes IV curves of all sweeps <sweeps> as one sweep program of the SMU in set sweep mode.
+
+        Parameters
+        ----------
+        sweeps: list of array_likes of floats
+            Sweeps containing start, stop and step size (e.g. get_sweeps() of qkit.measure.transport.transport.sweep class). Sleep values are ignored.
+
+        Returns
+        -------
+        data: list of tuples of numpy.array(float)
+            Current and voltage values of each sweep.
+        """
+        self.set_sweep_program(sweeps=sweeps)
+        return self.get_program_data()
+
     def set_defaults(self, pseudo_bias_mode=None, SMU=True, sweep_mode=None):
         """
         Sets default settings for different pseudo bias modes <pseudo_bias_mode> and optional of the used source measure unit <SMU> of channel <channel>, too. Actual settings are:
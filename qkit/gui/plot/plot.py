@@ -1,9 +1,13 @@
 #-*- coding: utf-8 -*-
 from subprocess import Popen, PIPE
 import os
+import atexit
+import threading
+import multiprocessing
 import numpy as np
 import logging
 import json
+import h5py
 
 from numpy.core.multiarray import ndarray
 
@@ -12,7 +16,9 @@ logging.basicConfig(level=logging.INFO)
 import qkit
 from qkit.storage import store
 from qkit.storage.hdf_constants import ds_types
+from qkit.gui.qviewkit.lod import lod_factor, block_reduce_chunked, minmax_indices, decimate_minmax, decimate_minmax_chunked
 
+plot_enable = False
 try:
     if qkit.module_available("matplotlib"):
         import matplotlib.pyplot as plt
@@ -75,6 +81,11 @@ def plot(h5_filepath, datasets=[], refresh = 2, live = True, echo = False):
     cmd.append(str(refresh))
     if live:
         cmd.append('-live')
+        # listen to the 'dataset-grown' messages of this qkit instance
+        if hasattr(getattr(qkit, 'info', None), 'dist'):
+            cmd.append('-qinfo')
+            cmd.append('-ip')
+            cmd.append(str(qkit.cfg.get('info_port', 5600)))
     
     if echo:
         print("Qviewkit open cmd: "+ str(cmd))
@@ -102,6 +113,166 @@ def save_plots(h5_filepath, comment='', save_pdf=False):
     h5plot(h5_filepath, comment=comment, save_pdf=save_pdf)
 
 
+# this is for saving plots without blocking the measurement
+_export_pool = None
+
+
+def _export_worker_init():
+    """
+    Runs in every plot export process. The plots are rendered with lower
+    priority, the running measurement goes first.
+    """
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):  # os.nice is not available on Windows
+        pass
+
+
+def _get_export_pool():
+    """
+    Returns the pool of plot export processes, which is started on the first call.
+    The number of processes is set by qkit.cfg['plot_export_processes'] (default: 2).
+    
+    The processes are always started with 'spawn': the measurement process runs
+    threads (info service, uploads, ...) and forking it could copy a lock held
+    by one of them into the child. Like any spawned process, the export processes
+    import a measurement script run as __main__ again, which therefore needs the
+    usual "if __name__ == '__main__':" guard. Notebooks are not affected.
+    """
+    global _export_pool
+    if _export_pool is None:
+        ctx = multiprocessing.get_context('spawn')
+        _export_pool = ctx.Pool(processes=qkit.cfg.get('plot_export_processes', 2),
+                                initializer=_export_worker_init,
+                                maxtasksperchild=50)  # matplotlib does not free all of its memory
+        atexit.register(_close_export_pool)
+    return _export_pool
+
+
+def _close_export_pool():
+    """
+    Waits until all submitted plots are saved and stops the export processes.
+    """
+    global _export_pool
+    if _export_pool is not None:
+        _export_pool.close()
+        _export_pool.join()
+        _export_pool = None
+
+
+"qkit.cfg entries of the measurement session that are passed on to the export processes"
+_EXPORT_CFG_KEYS = ('save_png', 'datadir')
+
+
+def _save_dataset_plots(h5_filepath, datasets, comment, save_pdf, cfg):
+    """
+    Export process job: plots the given datasets of the h5 file.
+    
+    Processes started with 'spawn' (Windows, macOS) import a fresh qkit without 
+    qkit.start(), the settings of the session are taken from cfg.
+    """
+    qkit.cfg.update(cfg)
+    h5plot(h5_filepath, comment=comment, save_pdf=save_pdf, datasets=datasets, force=True)
+
+
+def _export_failed(error):
+    "error callback of the export jobs, exceptions in the export processes are logged here"
+    logging.error("save_plots_async: saving plots failed: %r" % (error,))
+
+
+def save_plots_async(h5_filepath, comment='', save_pdf=False, force=False):
+    """
+    Saves plots of all datasets with default settings in separate processes.
+    
+    The datasets are distributed to a pool of worker processes and rendered in
+    parallel, the function returns immediately. Datasets whose images are newer
+    than the h5 file are skipped, unless force is set.
+    The h5 file has to be closed by the measurement before calling this function.
+    
+    Args:
+        h5_filepath: String, absolute filepath.
+        comment: Optional comment for the plots to be added to the filenames.
+            default : ''
+        save_pdf: Optional boolean setting for the output file type.
+            default: False
+        force: Optional boolean, render all plots even if they are up to date.
+            default: False
+    Return:
+        List of multiprocessing AsyncResult objects, one per submitted dataset.
+    """
+    if not qkit.cfg.get('save_png', True):
+        return []
+    h5_filepath = os.path.abspath(h5_filepath)
+    try:
+        with h5py.File(h5_filepath, 'r') as hf:
+            keys = _plot_dataset_keys(hf)
+    except (IOError, OSError) as e:
+        logging.error("save_plots_async: could not open '%s': %s" % (h5_filepath, e))
+        return []
+    if not force:
+        keys = [key for key in keys if not _plot_is_current(h5_filepath, key, comment, save_pdf)]
+    if not keys:
+        return []
+    # created once here, the export jobs of the datasets run concurrently
+    image_dir = os.path.dirname(_image_path(h5_filepath, keys[0]))
+    try:
+        if not os.path.isdir(image_dir):
+            os.mkdir(image_dir)
+    except OSError as e:
+        logging.error("save_plots_async: could not create image directory '%s': %s" % (image_dir, e))
+        return []
+    try:
+        pool = _get_export_pool()
+    except (OSError, ValueError) as e:
+        logging.warning("save_plots_async: no plot export processes (%s), saving plots in a thread." % e)
+        t = threading.Thread(target=h5plot, args=[h5_filepath], kwargs=dict(comment=comment, save_pdf=save_pdf, datasets=keys, force=True))
+        t.start()
+        return []
+    cfg = dict((k, qkit.cfg[k]) for k in _EXPORT_CFG_KEYS if k in qkit.cfg)
+    return [pool.apply_async(_save_dataset_plots, (h5_filepath, [key], comment, save_pdf, cfg),
+                             error_callback=_export_failed) for key in keys]
+
+
+def _plot_dataset_keys(hf):
+    """
+    Returns the urls of all datasets in the h5py file hf which are plotted by h5plot.
+    """
+    keys = []
+    for pentry in hf['/entry'].keys():
+        group = hf['/entry/' + pentry]
+        if not isinstance(group, h5py.Group):
+            continue
+        for centry in group.keys():
+            ds = group[centry]
+            if ds.attrs.get('save_plot', True) and ds.attrs.get('ds_type', None) in \
+                    (ds_types['vector'], ds_types['matrix'], ds_types['box'], ds_types['view']):
+                keys.append('/entry/' + pentry + '/' + centry)
+    return keys
+
+
+def _image_path(h5_filepath, key, comment=''):
+    """
+    Returns the path of the image of dataset key without file extension.
+    """
+    filedir = os.path.dirname(os.path.abspath(h5_filepath))
+    save_name = str(os.path.basename(filedir))[0:6] + '_' + key.replace('/entry/', '').replace('/', '_')
+    if comment:
+        save_name = save_name + '_' + comment
+    return str(os.path.join(filedir, 'images', save_name))
+
+
+def _plot_is_current(h5_filepath, key, comment='', save_pdf=False):
+    """
+    Checks if the images of dataset key exist and are newer than the h5 file.
+    """
+    image_path = _image_path(h5_filepath, key, comment)
+    try:
+        h5_mtime = os.path.getmtime(h5_filepath)
+        return all(os.path.getmtime(image_path + ext) >= h5_mtime for ext in (['.png', '.pdf'] if save_pdf else ['.png']))
+    except OSError:
+        return False
+
+
 class h5plot(object):
     """
     h5plot class plots and saves all dataset in the h5 file.
@@ -112,11 +283,16 @@ class h5plot(object):
     """
     y_data = None  # type: ndarray
 
-    def __init__(self,h5_filepath, comment='', save_pdf=False):
+    def __init__(self,h5_filepath, comment='', save_pdf=False, datasets=None, force=True):
         """Inits h5plot with a h5_filepath (string, absolute path), optional 
         comment string, and optional save_pdf boolean.
+        Only the dataset urls in the optional datasets list are plotted, if 
+        given. With force=False, datasets with images newer than the file
+        are skipped.
         """
-        if not plot_enable or not qkit.module_available("matplotlib"):
+        # qkit.module_available only exists after qkit.start(), not in spawned export processes
+        module_available = getattr(qkit, 'module_available', None)
+        if not plot_enable or (module_available is not None and not module_available("matplotlib")):
             logging.warning("matplotlib not installed. I can not save your measurement files as png. I will disable this function.")
             qkit.cfg['save_png'] = False
         if not qkit.cfg.get('save_png',True):
@@ -129,14 +305,19 @@ class h5plot(object):
         self.filedir  = os.path.dirname(filepath)   #return directory component of the given pathname, here filepath
 
         self.image_dir = os.path.join(self.filedir,'images')
-        try:
-            os.mkdir(self.image_dir)
-        except OSError:
-            logging.warning('Error creating image directory.')
-            pass
+        if not os.path.isdir(self.image_dir):
+            try:
+                os.mkdir(self.image_dir)
+            except OSError:
+                logging.warning('Error creating image directory.')
+                pass
 
-        # open the h5 file and get the hdf_lib object
-        self.hf = store.Data(self.path)
+        # open the h5 file (read-only) and get the hdf_lib object
+        try:
+            self.hf = store.Data(self.path, mode='r')
+        except ValueError:
+            # files of older qkit versions lack groups, which are only created in 'r+' mode
+            self.hf = store.Data(self.path)
 
         # check for datasets
         for i, pentry in enumerate(self.hf['/entry'].keys()):
@@ -144,6 +325,10 @@ class h5plot(object):
             for j, centry in enumerate(self.hf[key].keys()):
                 try:
                     self.key='/entry/'+pentry+"/"+centry
+                    if datasets is not None and self.key not in datasets:
+                        continue
+                    if not force and _plot_is_current(self.path, self.key, comment, save_pdf):
+                        continue
                     self.ds = self.hf[self.key]
                     if self.ds.attrs.get('save_plot', True):
                         self.plt() # this is the plot function
@@ -153,7 +338,8 @@ class h5plot(object):
                     print(e)
         #close hf file
         self.hf.close()
-        print('Plots saved in ' + self.image_dir)
+        if datasets is None:  # not for the single dataset jobs of save_plots_async
+            print('Plots saved in ' + self.image_dir)
 
     def plt(self):
         """
@@ -178,6 +364,8 @@ class h5plot(object):
 
         self._unit_prefixes = {24: 'Y', 21: 'Z', 18: 'E', 15: 'P', 12: 'T', 9: 'G', 6: 'M', 3: 'k', 0: '', -3: 'm', -6: u'µ', -9: 'n', -12: 'p', -15: 'f', -18: 'a', -21: 'z', -24: 'y'}
         self.plot_styles = {0:'-', 1:'.-', 2:'.'}
+        # pixels of the saved figure (x, y), data beyond this resolution is reduced before plotting
+        self.image_pixels = (2000, 1000)
 
         if self.ds_type == ds_types['coordinate']:
             #self.plt_coord()
@@ -208,10 +396,7 @@ class h5plot(object):
         for i in self.ax.get_yticklabels():
             i.set_fontsize(16)
 
-        save_name = str(os.path.basename(self.filedir))[0:6] + '_' + self.key.replace('/entry/','').replace('/','_')
-        if self.comment:
-            save_name = save_name+'_'+self.comment
-        image_path = str(os.path.join(self.image_dir,save_name))
+        image_path = _image_path(self.path, self.key, self.comment)
 
         if self.save_pdf:
             self.canvas.print_figure(image_path+'.pdf')
@@ -234,16 +419,18 @@ class h5plot(object):
             objects.
         """
         self.ax.set_title(self.hf._filename[:-3]+" "+self.ds.attrs.get('name','_name_').decode())
-        self.y_data = np.array(self.ds)
-        self.y_exp = self._get_exp(self.y_data)
-        self.y_label = self.ds.attrs.get('name','_name_').decode() + ' (' + self._unit_prefixes[self.y_exp] + self.ds.attrs.get('unit','_unit_').decode() + ')'
+        # the trace is read chunk by chunk and reduced to the min/max of each pixel column
         try:
-            self.x_data = self.hf[self.x_ds_url]
-            self.x_exp = self._get_exp(np.array(self.x_data))
-            self.x_label = self.x_data.attrs.get('name','_xname_').decode() + ' (' + self._unit_prefixes[self.x_exp] + self.x_data.attrs.get('unit','_xunit_').decode() + ')'
+            x_ds = self.hf[self.x_ds_url]
+            self.x_data, self.y_data = decimate_minmax_chunked(self.ds, self.image_pixels[0], x_ds)
+            self.x_exp = self._get_exp(self.x_data)
+            self.x_label = x_ds.attrs.get('name','_xname_').decode() + ' (' + self._unit_prefixes[self.x_exp] + x_ds.attrs.get('unit','_xunit_').decode() + ')'
         except Exception:
-            self.x_data = np.arange(len(self.y_data))
+            self.x_data, self.y_data = decimate_minmax_chunked(self.ds, self.image_pixels[0])
+            self.x_exp = 0
             self.x_label = '_none_ / _none_'
+        self.y_exp = self._get_exp(self.y_data)
+        self.y_label = self.ds.attrs.get('name','_name_').decode() + ' (' + self._unit_prefixes[self.y_exp] + self.ds.attrs.get('unit','_unit_').decode() + ')'
         plot_style = self.plot_styles[int(not (len(self.y_data) - 1)) * 2] # default is 'x' for one point and '-' for lines
         #if len(self.y_data) == 1: #only one entry, print as cross
         #    plot_style = 'x'
@@ -271,7 +458,7 @@ class h5plot(object):
         self.y_ds = self.hf[self.y_ds_url]
         self.y_exp = self._get_exp(np.array(self.y_ds))
         self.y_label = self.y_ds.attrs.get('name', '_yname_').decode() + ' (' + self._unit_prefixes[self.y_exp] + self.y_ds.attrs.get('unit', '_yunit_').decode() + ')'
-        self.ds_data = np.array(self.ds).T #transpose matrix to get x/y axis correct
+        self.ds_data = self._read_image().T #transpose matrix to get x/y axis correct
         self.ds_exp = self._get_exp(self.ds_data)
         self.ds_data *= 10.**-self.ds_exp
         self.ds_label = self.ds.attrs.get('name', '_name_').decode() + ' (' + self._unit_prefixes[self.ds_exp] + self.ds.attrs.get('unit', '_unit_').decode() + ')'
@@ -327,7 +514,7 @@ class h5plot(object):
         self.z_ds = self.hf[self.z_ds_url]
         self.z_exp = self._get_exp(np.array(self.z_ds))
         self.z_label = self.z_ds.attrs.get('name', '_zname_').decode() + ' (' + self._unit_prefixes[self.z_exp] + self.z_ds.attrs.get('unit', '_zunit_').decode() + ')'
-        self.ds_data = np.array(self.ds)[:, :, self.ds.shape[2] // 2].T  # transpose matrix to get x/y axis correct
+        self.ds_data = self._read_image((slice(None), self.ds.shape[2] // 2)).T  # transpose matrix to get x/y axis correct
         self.ds_exp = self._get_exp(self.ds_data)
         self.ds_data *= 10.**-self.ds_exp
         self.ds_label = self.ds.attrs.get('name', '_name_').decode() + ' (' + self._unit_prefixes[self.ds_exp] + self.ds.attrs.get('unit', '_unit_').decode() + ')'
@@ -461,6 +648,14 @@ class h5plot(object):
                 x_data = np.array(x_ds[-1,-1,:])
                 y_data = np.array(y_ds[-1,-1,:])
 
+            # IQ plots (x_ds matrix or box) are scatter plots and are not reduced
+            if x_ds.attrs.get('ds_type',0) in (ds_types['coordinate'], ds_types['vector']):
+                n = min(len(x_data), len(y_data))
+                if err_ds:
+                    idx = minmax_indices(y_data[:n], self.image_pixels[0])
+                    x_data, y_data, err_data = x_data[:n][idx], y_data[:n][idx], err_data[:n][idx]
+                else:
+                    x_data, y_data = decimate_minmax(x_data[:n], y_data[:n], self.image_pixels[0])
             plot_style = self.plot_styles[view_params.get('plot_style', int(not (len(y_data) - 1)) * 2)] # default is 'x' for one point and '-' for lines
             if err_ds:
                 self.ax.errorbar(x_data, y_data[0:len(x_data)], yerr=err_data[0:len(x_data)], label=y_ds.name.split('/')[-1])
@@ -485,6 +680,14 @@ class h5plot(object):
             self.y_label += ' (' + self._unit_prefixes[y_exp] + self.y_unit.decode() + ')'
         self.ax.legend()
 
+    def _read_image(self, index=()):
+        """
+        Reads the 2d selection (first axis, index) of the dataset chunk by chunk. Images larger
+        than the figure are block averaged, the png has at most 2000x1000 pixels.
+        """
+        return block_reduce_chunked(self.ds, lod_factor(self.ds.shape[0], self.image_pixels[0]),
+                                    lod_factor(self.ds.shape[1], self.image_pixels[1]), index)
+
     def _get_exp(self, data):
         """
         This function calculates the order of magnitude (exponent in steps of 3) to use for unit-prefix.
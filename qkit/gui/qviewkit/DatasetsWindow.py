@@ -6,6 +6,8 @@
 """
 
 import sys,os
+import json
+import time
 import qkit
 # support both PyQt4 and 5
 in_pyqt5 = False
@@ -64,6 +66,15 @@ class DatasetsWindow(QMainWindow, Ui_MainWindow):
         self.refreshTime_value = 2000
         self.tree_refresh  = True
         self._force_live_plot = False
+        
+        # The file handle is only kept open for finished files (not 'updating').
+        # _file_state (mtime, size) and _data_signature detect changes of the file.
+        self.h5file = None
+        self._h5file_path = None
+        self._file_state = None
+        self._data_signature = None
+        # time of the last 'dataset-grown' message, polling pauses while messages arrive
+        self._last_info_message = 0
         self._setup_signal_slots()        
         self.setup_timer()
         self.set_cmd_options()
@@ -71,7 +82,7 @@ class DatasetsWindow(QMainWindow, Ui_MainWindow):
         
     def setup_timer(self):
         self.timer = QTimer()
-        self.timer.timeout.connect(self.update_file)
+        self.timer.timeout.connect(self.refresh_file)
         self.timer.timeout.connect(self.live_update_onoff)
             
     def set_cmd_options(self):
@@ -108,12 +119,14 @@ class DatasetsWindow(QMainWindow, Ui_MainWindow):
         self.FileButton.clicked.connect(self.open_file)
         self.liveCheckBox.clicked.connect(self.live_update_onoff)
         self.pw_refresh_signal.connect(self.update_file)
+        self.DATA.dataset_grown.connect(self._dataset_grown)
 
     def closeEvent(self, event):
         widgetList = QApplication.topLevelWidgets()
 
         self.DATA._remove_plot_widgets( closeAll = True)
         self.DATA.set_info_thread_continue(False)
+        self._close_file(keep_finished=False)
         event.accept()
     
     @pyqtSlot()
@@ -231,16 +244,142 @@ class DatasetsWindow(QMainWindow, Ui_MainWindow):
             self.Dataset_properties.clear()
             self.Dataset_properties.insertPlainText(self.DATA.dataset_info[ds])
  
-            
+    
+    def _get_file_state(self):
+        "returns (mtime, size) of the data file, which change when the file is written"
+        stat = os.stat(str(self.DATA.DataFilePath))
+        return (stat.st_mtime, stat.st_size)
+    
+    def _get_data_signature(self):
+        """Returns a tuple that changes when data is written to the file: the
+        generation counter and the updating flag of the writer as well as the
+        shape and fill attribute of every dataset (for files written without
+        a generation counter).
+        """
+        entry = self.h5file['entry']
+        signature = [entry.attrs.get('generation', None), entry.attrs.get('updating', None)]
+        
+        def add_dataset(name, obj):
+            if isinstance(obj, h5py.Dataset):
+                signature.append((name, obj.shape, tuple(obj.attrs.get('fill', ()))))
+        self.h5file.visititems(add_dataset)
+        return tuple(signature)
+    
+    def _open_file(self):
+        "opens the data file read-only, a handle kept open for the same finished file is reused"
+        if self.h5file and self._h5file_path == self.DATA.DataFilePath:
+            return
+        self._close_file(keep_finished=False)
+        try:
+            # do not lock the file, the measurement may still want to open it for writing
+            self.h5file = h5py.File(str(self.DATA.DataFilePath), mode='r', locking=False)
+        except TypeError:  # h5py < 3.5 does not know the locking argument
+            self.h5file = h5py.File(str(self.DATA.DataFilePath), mode='r')
+        self._h5file_path = self.DATA.DataFilePath
+    
+    def _close_file(self, keep_finished=True):
+        """Closes the data file. Files which are still written ('updating')
+        are always closed, the writer's changes are only seen after reopening.
+        A finished file stays open if keep_finished is set.
+        """
+        if not self.h5file:
+            return
+        if keep_finished:
+            try:
+                if not self.h5file['entry'].attrs.get('updating', True):
+                    return
+            except (KeyError, ValueError):
+                pass
+        self.h5file.close()
+    
+    def refresh_file(self):
+        """refresh_file is called by the live update timer. The file is only
+        opened if it was written since the last update, the tree and the plots
+        are only updated if data was added.
+        """
+        try:
+            file_state = self._get_file_state()
+        except OSError as e:
+            print(e)
+            return
+        if file_state == self._file_state and self._h5file_path == self.DATA.DataFilePath:
+            return
+        if time.time() - self._last_info_message < 2e-3 * self.refreshTime_value:
+            # the writer publishes its changes, see _dataset_grown()
+            return
+        self._close_file(keep_finished=False)  # the kept handle would not see the changes
+        try:
+            self._open_file()
+            data_signature = self._get_data_signature()
+        except (IOError, KeyError) as e:
+            print(e)
+            self._close_file(keep_finished=False)
+            return
+        if data_signature == self._data_signature:
+            self._file_state = file_state
+            self._disable_live_update()
+            self._close_file()
+            return
+        self.update_file()
+    
+    def _plot_urls(self, ds_url):
+        "returns the ds_url and the urls of all datasets the plot of ds_url depends on"
+        urls = set([ds_url])
+        if ds_url not in self.h5file:
+            return urls
+        attrs = self.h5file[ds_url].attrs
+        for key in attrs.keys():
+            if key in ('x_ds_url', 'y_ds_url', 'z_ds_url'):
+                urls.add(str3(attrs[key]))
+            elif key.startswith('xy_') and not key.endswith('_error'):
+                # views: xy_i = "x_url:y_url"
+                urls.update(str3(attrs[key]).split(':'))
+        return urls
+    
+    @pyqtSlot(str)
+    def _dataset_grown(self, message):
+        """Handles the 'dataset-grown' messages of the info service: only the
+        plots of the changed datasets of the displayed file are updated.
+        
+        The message is a json dict {"file": filepath, "datasets": {ds_url: shape}}.
+        """
+        try:
+            info = json.loads(str(message))
+            changed = set(info['datasets'])
+            filepath = os.path.abspath(info['file'])
+        except (ValueError, KeyError, TypeError) as e:
+            print("invalid dataset-grown message:", e)
+            return
+        if not self.liveCheckBox.isChecked() or not self.DATA.DataFilePath:
+            return
+        if filepath != os.path.abspath(str(self.DATA.DataFilePath)):
+            return
+        self._last_info_message = time.time()
+        try:
+            self._file_state = self._get_file_state()
+            self._close_file(keep_finished=False)
+            self._open_file()
+            self._data_signature = self._get_data_signature()
+            self.populate_data_list()
+            for window in list(self.DATA.open_plots.values()):
+                if changed & self._plot_urls(window.dataset_url):
+                    window.update_plots()
+            self._disable_live_update()
+            self._close_file()
+        except (IOError, KeyError) as e:
+            print(e)
+    
     def update_file(self):
-        "update_file is regularly called when _something_ has to be updated. open-> do something->close"
+        "update_file is called when _something_ has to be updated. open-> do something->close"
         try:
-            self.h5file= h5py.File(str(self.DATA.DataFilePath),mode='r')
+            self._file_state = self._get_file_state()
+            self._open_file()
+            self._data_signature = self._get_data_signature()
             self.DATA.filename = self.h5file.filename.split(os.path.sep)[-1]
             self.populate_data_list()
             self.update_plots()
             self._disable_live_update()
-            self.h5file.close()
+            self._close_file()
             
             s = (self.DATA.DataFilePath.split(os.path.sep)[-5:])
             self.statusBar().showMessage((os.path.sep).join(s for s in s))
@@ -258,10 +397,12 @@ class DatasetsWindow(QMainWindow, Ui_MainWindow):
             
         if _DataFilePath:
             self.DATA.DataFilePath = _DataFilePath
-            self.h5file= h5py.File(self.DATA.DataFilePath,mode='r')
+            self._file_state = self._get_file_state()
+            self._open_file()
+            self._data_signature = self._get_data_signature()
             self.DATA.filename = self.h5file.filename.split(os.path.sep)[-1]
             self.populate_data_list()
-            self.h5file.close()
+            self._close_file()
             
             s = (self.DATA.DataFilePath.split(os.path.sep)[-5:])
             self.statusBar().showMessage((os.path.sep).join(s for s in s))
@@ -69,6 +69,11 @@ class PlotWindow(QWidget,Ui_Form):
 
         "This variable controlles if a window is new, see update_plots()."
         self._windowJustCreated = True
+        "Data read by PlotWindow_lib._read_appended, only new rows are read on the next update."
+        self._ds_cache = {}
+        "Level of detail: reduce data larger than the screen, see lod.py. _lod_pyramid keeps the reduced matrix images."
+        self.lod = True
+        self._lod_pyramid = None
         "connect update_plots to the DatasetWindow"
         self.obj_parent.refresh_signal.connect(self.update_plots)
 
@@ -610,6 +615,13 @@ class PlotWindow(QWidget,Ui_Form):
         
         self.qvkMenu.addSeparator()
         
+        full_resolution = QAction('full resolution', self.qvkMenu, checkable=True)
+        full_resolution.setChecked(not self.lod)
+        self.qvkMenu.addAction(full_resolution)
+        full_resolution.triggered.connect(self.setFullResolution)
+        
+        self.qvkMenu.addSeparator()
+        
         notefont = QFont("Helvetica",7,12)
         note = QAction("Manipulations are executed in the order shown here.",self.qvkMenu,enabled=False,font=notefont)
         self.qvkMenu.addAction(note)
@@ -682,6 +694,12 @@ class PlotWindow(QWidget,Ui_Form):
         if not self._windowJustCreated:
             self.obj_parent.pw_refresh_signal.emit()
 
+    @pyqtSlot()
+    def setFullResolution(self):
+        self.lod = not self.lod
+        if not self._windowJustCreated:
+            self.obj_parent.pw_refresh_signal.emit()
+
 
 from collections import OrderedDict
 
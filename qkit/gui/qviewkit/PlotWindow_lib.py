@@ -34,6 +34,7 @@ import json
 import pyqtgraph as pg
 import qkit
 from qkit.storage.hdf_constants import ds_types
+from qkit.gui.qviewkit.lod import lod_points, lod_factor, minmax_indices, block_reduce, ImagePyramid
 import pprint
 
 
@@ -85,10 +86,10 @@ def _display_1D_view(self, graphicsView):
                     self.VTraceXSelector.setEnabled(False)
                     self.VTraceYSelector.setEnabled(False)
                     
-                    x_data = dss[0][()]
-                    y_data = dss[1][()]
+                    x_data = _read_appended(self, dss[0])
+                    y_data = _read_appended(self, dss[1])
                     if err_url:
-                        err_data = dss[2][()]
+                        err_data = _read_appended(self, dss[2])
                     
                     # prevent a crash when the two datasets have a different length
                     # solution: truncate the longer dataset to the length of the shorter
@@ -111,10 +112,10 @@ def _display_1D_view(self, graphicsView):
                             self.VTraceYSelector.setValue(view_params.get('default_trace',range_max //2))
                         self.VTraceYSelector.setRange(-1 * range_max, range_max - 1)
                         self.VTraceYValue.setText(self._getYValueFromTraceNum(dss[1], self.VTraceYNum))
-                        x_data = dss[0][()]
-                        y_data = dss[1][:,self.VTraceYNum]
+                        x_data = _read_appended(self, dss[0])
+                        y_data = _read_slice(dss[1], slice(None), self.VTraceYNum)
                         if err_url:
-                            err_data = dss[2][:,self.VTraceYNum]
+                            err_data = _read_slice(dss[2], slice(None), self.VTraceYNum)
                     else:
                         self.VTraceXSelector.setEnabled(True)
                         range_max = dss[1].shape[0]
@@ -122,10 +123,10 @@ def _display_1D_view(self, graphicsView):
                         self.VTraceXValue.setText(self._getXValueFromTraceNum(dss[1], self.VTraceXNum))
                         self.VTraceYSelector.setEnabled(False)
                         
-                        x_data = dss[0][()]
-                        y_data = dss[1][()][self.VTraceXNum]
+                        x_data = _read_appended(self, dss[0])
+                        y_data = _read_slice(dss[1], self.VTraceXNum)
                         if err_url:
-                            err_data = dss[2][()][self.VTraceXNum]
+                            err_data = _read_slice(dss[2], self.VTraceXNum)
                     x_data_len = len(x_data)
                     y_data_len = len(y_data)
                     if x_data_len != y_data_len:
@@ -144,10 +145,10 @@ def _display_1D_view(self, graphicsView):
                     self.VTraceYSelector.setRange(-1 * range_maxY, range_maxY - 1)
                     self.VTraceYValue.setText(self._getYValueFromTraceNum(dss[1], self.VTraceYNum))
                     
-                    x_data = dss[0][()]
-                    y_data = dss[1][()][self.VTraceXNum, self.VTraceYNum, :]
+                    x_data = _read_appended(self, dss[0])
+                    y_data = _read_slice(dss[1], self.VTraceXNum, self.VTraceYNum, slice(None))
                     if err_url:
-                        err_data = dss[2][()][self.VTraceXNum, self.VTraceYNum, :]
+                        err_data = _read_slice(dss[2], self.VTraceXNum, self.VTraceYNum, slice(None))
             
             ## This is in our case used so far only for IQ plots. The
             ## functionality derives from this application.
@@ -158,8 +159,8 @@ def _display_1D_view(self, graphicsView):
                 self.VTraceXValue.setText(self._getXValueFromTraceNum(dss[1], self.VTraceXNum))
                 self.VTraceYSelector.setEnabled(False)
                 
-                x_data = dss[0][()][self.VTraceXNum]
-                y_data = dss[1][()][self.VTraceXNum]
+                x_data = _read_slice(dss[0], self.VTraceXNum)
+                y_data = _read_slice(dss[1], self.VTraceXNum)
             
             elif x_ds_type == ds_types['box']:
                 self.VTraceXSelector.setEnabled(True)
@@ -171,14 +172,21 @@ def _display_1D_view(self, graphicsView):
                 self.VTraceYSelector.setRange(-1 * range_maxY, range_maxY - 1)
                 self.VTraceYValue.setText(self._getYValueFromTraceNum(dss[1], self.VTraceYNum))
                 
-                x_data = dss[0][()][self.VTraceXNum, self.VTraceYNum, :]
-                y_data = dss[1][()][self.VTraceXNum, self.VTraceYNum, :]
+                x_data = _read_slice(dss[0], self.VTraceXNum, self.VTraceYNum, slice(None))
+                y_data = _read_slice(dss[1], self.VTraceXNum, self.VTraceYNum, slice(None))
             
             else:
                 return
             
             ## Any data manipulation (dB <-> lin scale, etc) is done here
             x_data, y_data, names[0], names[1], units[0], units[1] = _do_data_manipulation(x_data, y_data, names[0], names[1], units[0], units[1], ds_types['vector'], self.manipulation, self.manipulations)
+            
+            ## IQ plots (x_ds matrix or box) are scatter plots and are shown completely
+            if x_ds_type == ds_types['coordinate'] or x_ds_type == ds_types['vector']:
+                if err_url:
+                    y_data, x_data, err_data = _lod_trace(self, graphicsView, y_data, x_data, err_data)
+                else:
+                    y_data, x_data = _lod_trace(self, graphicsView, y_data, x_data)
 
             _axis_timestamp_formatting(graphicsView, x_data, units[0], names[0], "bottom")
             _axis_timestamp_formatting(graphicsView, y_data, units[1],names[1], "left")
@@ -274,12 +282,12 @@ def _display_1D_data(self, graphicsView):
         # timestamps do (not?) have a x_ds_url in the 1d case. This is more a bug to be fixed in the
         # timstamp_ds part of qkit the resulting error is fixed here for now.
         try:
-            x_data = dss[0][()][:dss[1].shape[-1]]  # x_data gets truncated to y_data shape if necessarry
+            x_data = _read_appended(self, dss[0])[:dss[1].shape[-1]]  # x_data gets truncated to y_data shape if necessarry
         except:
             x_data = [i for i in range(dss[1].shape[-1])]
             units[0] = "#"
             names[0] = "data point number"
-        y_data = dss[1][()]
+        y_data = _read_appended(self, dss[1])
     
     elif self.ds_type == ds_types['coordinate']:
         ## a coordinate does not have any coordinate. it gets plotted against the entry index.
@@ -292,7 +300,7 @@ def _display_1D_data(self, graphicsView):
         # timestamps do (not?) have a x_ds_url in the 1d case. This is more a bug to be fixed in the
         # timstamp_ds part of qkit the resulting error is fixed here for now.
         x_data = [i for i in range(dss[0].shape[-1])]
-        y_data = dss[0][()]
+        y_data = _read_appended(self, dss[0])
     
     elif self.ds_type == ds_types['matrix'] or (self.ds_type == -1 and len(self.ds.shape) == 2):  # last expresson is for old hdf-files
         """
@@ -313,8 +321,8 @@ def _display_1D_data(self, graphicsView):
                 self.TraceXSelector.setValue(self.TraceXNum)
                 self.TraceXValueChanged = False
             
-            y_data = dss[1][()][self.TraceXNum]
-            x_data = dss[0][()][:dss[1].shape[-1]]  # x_data gets truncated to y_data shape if neccessary
+            y_data = _read_slice(dss[1], self.TraceXNum)
+            x_data = _read_appended(self, dss[0])[:dss[1].shape[-1]]  # x_data gets truncated to y_data shape if neccessary
         
         if self.PlotTypeSelector.currentIndex() == 2:  # x_ds on x-axis
             dss, names, units, scales = _get_all_ds_names_units_scales(self.ds, ['x_ds_url'])
@@ -332,8 +340,8 @@ def _display_1D_data(self, graphicsView):
                 self.TraceYSelector.setValue(self.TraceYNum)
                 self.TraceYValueChanged = False
             
-            y_data = dss[1][()][:, self.TraceYNum]
-            x_data = dss[0][()][:dss[1].shape[0]]  # x_data gets truncated to y_data shape if neccessary
+            y_data = _read_slice(dss[1], slice(None), self.TraceYNum)
+            x_data = _read_appended(self, dss[0])[:dss[1].shape[0]]  # x_data gets truncated to y_data shape if neccessary
         
         self.TraceXValue.setText(self._getXValueFromTraceNum(self.ds, self.TraceXNum))
         self.TraceYValue.setText(self._getYValueFromTraceNum(self.ds, self.TraceYNum))
@@ -373,8 +381,8 @@ def _display_1D_data(self, graphicsView):
         self.TraceXValue.setText(self._getXValueFromTraceNum(self.ds, self.TraceXNum))
         self.TraceYValue.setText(self._getYValueFromTraceNum(self.ds, self.TraceYNum))
         
-        x_data = dss[0][()][:dss[1].shape[-1]]  # x_data gets truncated to y_data shape if neccessary
-        y_data = dss[1][()][self.TraceXNum, self.TraceYNum, :]
+        x_data = _read_appended(self, dss[0])[:dss[1].shape[-1]]  # x_data gets truncated to y_data shape if neccessary
+        y_data = _read_slice(dss[1], self.TraceXNum, self.TraceYNum, slice(None))
     
     ## Any data manipulation (dB <-> lin scale, etc) is done here
     x_data, y_data, names[0], names[1], units[0], units[1] = _do_data_manipulation(x_data, y_data, names[0], names[1], units[0], units[1], ds_types['vector'], self.manipulation, self.manipulations)
@@ -391,6 +399,9 @@ def _display_1D_data(self, graphicsView):
         self.linestyle_selector.point.setChecked(True)
     else:
         self.linestyle_selector.line.setChecked(True)
+    
+    if not (self.manipulation & self.manipulations['histogram']):
+        y_data, x_data = _lod_trace(self, graphicsView, y_data, x_data)
 
     if self.plot_style == self.plot_styles['line']:
         graphicsView.plot(y=y_data, x=x_data, clear=True, pen=(200, 200, 100), connect='finite')
@@ -457,11 +468,14 @@ def _display_2D_data(self, graphicsView):
         """
         dss, names, units, scales = _get_all_ds_names_units_scales(self.ds, ['x_ds_url', 'y_ds_url'])
         try:
-          data = dss[2][()]
+          data, start = _read_appended(self, dss[2], return_start=True)
         except IOError as e:
               print("Could not open data file")
               print(e)
               return
+        if self._lod_pyramid is None:
+            self._lod_pyramid = ImagePyramid()
+        self._lod_pyramid.update(data, start)
         
         fill_x = dss[2].shape[0]
         fill_y = dss[2].shape[1]
@@ -484,7 +498,7 @@ def _display_2D_data(self, graphicsView):
             
             dss, names, units, scales = _get_all_ds_names_units_scales(self.ds, ['y_ds_url', 'z_ds_url'])
             try:
-              data = dss[2][()][self.TraceXNum, :, :]
+              data = _read_slice(dss[2], self.TraceXNum, slice(None), slice(None))
             except IOError as e:
               print("Could not open data file")
               print(e)
@@ -503,7 +517,7 @@ def _display_2D_data(self, graphicsView):
             
             dss, names, units, scales = _get_all_ds_names_units_scales(self.ds, ['x_ds_url', 'z_ds_url'])
             try:
-              data = dss[2][()][:, self.TraceYNum, :]
+              data = _read_slice(dss[2], slice(None), self.TraceYNum, slice(None))
             except IOError as e:
               print("Could not open data file")
               print(e)
@@ -522,7 +536,7 @@ def _display_2D_data(self, graphicsView):
             
             dss, names, units, scales = _get_all_ds_names_units_scales(self.ds, ['x_ds_url', 'y_ds_url'])
             try:
-              data = dss[2][()][:, :, self.TraceZNum]
+              data = _read_slice(dss[2], slice(None), slice(None), self.TraceZNum)
             except IOError as e:
               print("Could not open data file")
               print(e)
@@ -535,6 +549,16 @@ def _display_2D_data(self, graphicsView):
         self.TraceYValue.setText(self._getYValueFromTraceNum(self.ds, self.TraceYNum))
         self.TraceZValue.setText(self._getZValueFromTraceNum(self.ds, self.TraceZNum))
 
+    ## Level of detail: images larger than the widget are shown block averaged
+    lod_x = lod_y = 1
+    if self.lod:
+        lod_x = lod_factor(data.shape[0], lod_points(graphicsView, 0))
+        lod_y = lod_factor(data.shape[1], lod_points(graphicsView, 1))
+        if self.ds_type == ds_types['matrix']:
+            data = self._lod_pyramid.level(lod_x, lod_y)
+        else:
+            data = block_reduce(data, lod_x, lod_y)
+
     _, data, _, _, _, units[2] = _do_data_manipulation(None, data, None, None, None, units[2], ds_types['vector'], self.manipulation, self.manipulations, colorplot=True)
 
     graphicsView.clear()
@@ -547,9 +571,10 @@ def _display_2D_data(self, graphicsView):
     # scale is responsible for the "accidential" correct display of the axis
     # for downsweeps scale has negative values and extends the axis from the min values into the correct direction
     if np.all(np.isnan(data)):
+        data = np.array(data)
         data[(0,) * len(data.shape)] = 0
         print("Your Data array is all NaN. I set the first value to not blow up graphics window.")
-    graphicsView.setImage(data, pos=(scales[0][0] - scales[0][1] / 2., scales[1][0] - scales[1][1] / 2.), scale=(scales[0][1], scales[1][1]))
+    graphicsView.setImage(data, pos=(scales[0][0] - scales[0][1] / 2., scales[1][0] - scales[1][1] / 2.), scale=(lod_x * scales[0][1], lod_y * scales[1][1]))
     graphicsView.show()
     
     # Fixme roi ...
@@ -572,12 +597,12 @@ def _display_2D_data(self, graphicsView):
                 x_index = int(mousePoint.x())
                 y_index = int(mousePoint.y())
                 if x_index >= 0 and y_index >= 0:
-                    if x_index < fill_x and y_index < fill_y:
+                    if x_index < data.shape[0] and y_index < data.shape[1]:
                         # Check this for < or <=
                         # Also the x0s and dxs
                         
-                        xval = scales[0][0] + x_index * scales[0][1]
-                        yval = scales[1][0] + y_index * scales[1][1]
+                        xval = scales[0][0] + x_index * lod_x * scales[0][1]
+                        yval = scales[1][0] + y_index * lod_y * scales[1][1]
                         zval = data[x_index][y_index]
                         self.PointX.setText("X: %.6e %s" % (xval, units[0]))
                         self.PointY.setText("Y: %.6e %s" % (yval, units[1]))
@@ -670,6 +695,93 @@ def _display_string(ds):
     return txt
 
 
+""" Partial reads of the displayed data """
+
+
+def _read_slice(ds, *index):
+    """Reads only the selected hyperslab of dataset ds from the file.
+
+    Integer indices select a single trace and may be negative (counted from
+    the end, like the trace selectors), slices are passed on unchanged.
+    
+    Args:
+        ds: hdf_dataset.
+        index: integers or slices, one for each axis of ds.
+
+    Returns:
+        numpy array of the selected data.
+    """
+    index = tuple(i % ds.shape[axis] if isinstance(i, (int, np.integer)) and i < 0 else i
+                  for axis, i in enumerate(index))
+    return ds[index]
+
+
+def _read_appended(self, ds, return_start=False):
+    """Returns the complete data of ds, reading only the rows (first axis)
+    which were added or not yet completely written since the last call.
+    
+    The data read is cached in the PlotWindow object. Rows that still contain
+    the NaN fill value and the last row are read again on the next call, since
+    they may be filled or reset in the meantime. If the dataset shrank, changed
+    its trace length or its first entry, the cache is discarded. The same holds
+    for datasets rewritten in place, which is detected by a change of their
+    'iteration' (averaged data) or 'rewrites' (hdf_dataset.write_at) attribute.
+    Vectors are always read completely, append(reset=True) overwrites them.
+    
+    Args:
+        self: Object of the PlotWindow class.
+        ds: hdf_dataset.
+        return_start: additionally return the first row that was read.
+
+    Returns:
+        numpy array with the data of ds (and the first row read).
+    """
+    if len(ds.shape) == 0 or (len(ds.shape) == 1 and ds.attrs.get('ds_type', -1) != ds_types['coordinate']):
+        return (ds[()], 0) if return_start else ds[()]
+    cached = self._ds_cache.get(ds.name)
+    signature = (ds.attrs.get('iteration', None), ds.attrs.get('rewrites', None))
+    if (cached is None or cached[2] != signature
+            or cached[0].shape[1:] != ds.shape[1:] or cached[0].shape[0] > ds.shape[0]
+            or (cached[0].shape[0] > 0 and not np.allclose(cached[0][0], ds[0], rtol=0, atol=0, equal_nan=True))):
+        data, start = ds[()], 0
+    else:
+        data, start = cached[:2]
+        data = np.concatenate((data[:start], ds[start:]))
+    read_start = start
+    # the first row which might still change
+    if data.dtype.kind in 'fc' and data.shape[0] > start:
+        incomplete = np.isnan(data[start:].reshape(data.shape[0] - start, -1)).any(axis=1)
+        start = start + int(np.argmax(incomplete)) if incomplete.any() else data.shape[0]
+    else:
+        start = data.shape[0]
+    start = max(0, min(start, data.shape[0] - 1))
+    self._ds_cache[ds.name] = (data, start, signature)
+    if return_start:
+        return data, read_start
+    return data
+
+
+def _lod_trace(self, graphicsView, y_data, *other):
+    """Decimates a trace for display, keeping the minimum and maximum of
+    y_data for every two pixels of graphicsView (see lod.minmax_indices).
+    
+    Args:
+        self: Object of the PlotWindow class.
+        graphicsView: Object of pyqtgraph's PlotWidget class.
+        y_data: 1d array of the displayed values.
+        other: further arrays of the same length (x_data, err_data), which are
+            reduced to the same points.
+
+    Returns:
+        List of the reduced y_data and other arrays.
+    """
+    y_data = np.asarray(y_data)
+    if not self.lod or y_data.ndim != 1:
+        return [y_data] + list(other)
+    idx = minmax_indices(y_data, lod_points(graphicsView) // 2)
+    return [y_data[idx]] + [np.asarray(o)[idx] if o is not None else None for o in other]
+
+
 """ A few handy methods for label and scale """
 
 
@@ -833,6 +945,7 @@ def _do_data_manipulation(x_data, y_data, x_name, y_name, x_unit, y_unit, ds_typ
     
     # unwrap the phase
     if manipulation & manipulations['wrap']:
+        y_data = np.array(y_data)  # the data may be cached for the next update, do not change it in place
         y_data[~np.isnan(y_data)] = np.unwrap(y_data[~np.isnan(y_data)])
     
     if manipulation & manipulations['linear']:
@@ -16,7 +16,7 @@ class info_thread(Thread):
    def __init__(self, data):
       Thread.__init__(self)
       self.data = data
-      self.ifc = info_client()
+      self.ifc = info_client(port = getattr(data.args, 'info_port', None))
       self.ifc.listen_to_all()
       self.data.set_info_thread_continue(True)
       
@@ -25,6 +25,10 @@ class info_thread(Thread):
         socks = dict(self.ifc.poller.poll(1000))# wait 1s
         if self.ifc.socket in socks and socks[self.ifc.socket] == zmq.POLLIN:
             tid, message = self.ifc.get_message()
+            if int(tid) == SIGNALS.get('dataset-grown'):
+                # handled in the Qt main thread by the DatasetsWindow
+                self.data.dataset_grown.emit(message)
+                continue
             print(message,tid)
             if int(tid)  == SIGNALS.get('close-gui'):
                 print("received close gui signal")
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+@license: GPL
+
+Level of detail (LOD) reduction of the data displayed by qviewkit.
+
+Screens show a few thousand pixels, datasets can have millions of points.
+Long 1D traces are decimated by keeping the minimum and the maximum of
+every bucket of points, so peaks and dips survive the reduction. 2D images
+are reduced by averaging blocks of fx*fy pixels. ImagePyramid keeps the
+reduced images of a growing matrix and only reduces rows that changed since
+the last update.
+"""
+import warnings
+
+import numpy as np
+
+"Number of points/pixels kept at least, independent of the widget size."
+LOD_MIN_POINTS = 512
+"Approximate size of the blocks read by the chunked reductions of datasets in the file."
+LOD_CHUNK_BYTES = 32 * 2 ** 20
+
+
+def lod_points(widget, axis=0):
+    """Returns the number of points to be kept along axis (0: horizontal,
+    1: vertical) of a Qt widget, two per pixel.
+
+    Args:
+        widget: Qt widget displaying the data.
+        axis: 0 for the width, 1 for the height of the widget.
+
+    Returns:
+        Integer number of points.
+    """
+    try:
+        pixels = widget.width() if axis == 0 else widget.height()
+    except AttributeError:
+        pixels = 0
+    return max(LOD_MIN_POINTS, 2 * int(pixels))
+
+
+def minmax_indices(y, buckets):
+    """Returns the indices of the minimum and maximum of y in each of the
+    given number of buckets, sorted in ascending order.
+
+    NaN values are ignored, a bucket of only NaNs keeps its first point.
+    If y has not more than 2*buckets points, all indices are returned.
+
+    Args:
+        y: 1d array of data.
+        buckets: number of buckets the data is split into.
+
+    Returns:
+        1d integer array of indices into y.
+    """
+    y = np.asarray(y)
+    n = len(y)
+    if n <= 2 * buckets:
+        return np.arange(n)
+    size = -(-n // buckets)
+    padded = np.full(size * (-(-n // size)), np.nan)
+    padded[:n] = y.real if np.iscomplexobj(y) else y
+    padded = padded.reshape(-1, size)
+    nans = np.isnan(padded)
+    i_min = np.argmin(np.where(nans, np.inf, padded), axis=1)
+    i_max = np.argmax(np.where(nans, -np.inf, padded), axis=1)
+    offsets = np.arange(padded.shape[0]) * size
+    idx = np.sort(np.stack((i_min, i_max), axis=1), axis=1) + offsets[:, None]
+    return np.unique(idx.ravel())
+
+
+def decimate_minmax(x, y, buckets):
+    """Reduces the trace y(x) to the minimum and maximum of y in each bucket.
+
+    Args:
+        x: 1d array of x values.
+        y: 1d array of y values, same length as x.
+        buckets: number of buckets the data is split into.
+
+    Returns:
+        The reduced x and y arrays.
+    """
+    idx = minmax_indices(y, buckets)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
+
+
+def lod_factor(length, points):
+    """Returns the largest power of two f for which length/f still has at
+    least the given number of points. Powers of two keep the factor stable
+    while a dataset grows.
+    """
+    f = 1
+    while length >= 2 * f * points:
+        f *= 2
+    return f
+
+
+def block_reduce(data, fx, fy):
+    """Averages blocks of fx*fy pixels of the 2d array data, ignoring NaN.
+
+    An incomplete block at the end of an axis is averaged over the available
+    pixels. Blocks of only NaNs stay NaN.
+
+    Args:
+        data: 2d array.
+        fx, fy: block size along the first and second axis.
+
+    Returns:
+        2d array of shape (ceil(nx/fx), ceil(ny/fy)).
+    """
+    data = np.asarray(data)
+    if fx == 1 and fy == 1:
+        return data
+    nx, ny = data.shape
+    padded = np.full((-(-nx // fx) * fx, -(-ny // fy) * fy), np.nan, dtype=np.result_type(data.dtype, np.float64))
+    padded[:nx, :ny] = data
+    padded = padded.reshape(padded.shape[0] // fx, fx, padded.shape[1] // fy, fy)
+    with warnings.catch_warnings():
+        # blocks without any data are expected while a measurement is running
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        return np.nanmean(padded, axis=(1, 3))
+
+
+def _chunk_rows(row_bytes, factor):
+    "returns a number of rows of about LOD_CHUNK_BYTES, which is a multiple of factor"
+    rows = max(1, LOD_CHUNK_BYTES // max(1, int(row_bytes)))
+    return max(factor, rows // factor * factor)
+
+
+def block_reduce_chunked(ds, fx, fy, index=()):
+    """Block averages a 2d selection of an h5py dataset, see block_reduce().
+
+    The rows (first axis) are read chunk by chunk, so only about
+    LOD_CHUNK_BYTES and the reduced image are held in memory.
+
+    Args:
+        ds: h5py dataset.
+        fx, fy: block size along the first and second axis of the selection.
+        index: selection of the axes after the first, e.g. (slice(None), 5)
+            for the slice at index 5 of the third axis of a box.
+
+    Returns:
+        2d array of shape (ceil(nx/fx), ceil(ny/fy)).
+    """
+    rows = _chunk_rows(ds.dtype.itemsize * ds.shape[1], fx)
+    blocks = [block_reduce(ds[(slice(start, start + rows),) + tuple(index)], fx, fy)
+              for start in range(0, ds.shape[0], rows)]
+    if not blocks:
+        return block_reduce(ds[(slice(None),) + tuple(index)], fx, fy)
+    return np.concatenate(blocks)
+
+
+def decimate_minmax_chunked(y_ds, buckets, x_ds=None):
+    """Min/max decimation (see minmax_indices) of a trace stored in the
+    1d h5py dataset y_ds, reading chunks of about LOD_CHUNK_BYTES.
+
+    Args:
+        y_ds: 1d h5py dataset (or array) of y values.
+        buckets: number of buckets the data is split into.
+        x_ds: optional 1d dataset of x values. If it is shorter than y_ds,
+            y_ds is truncated. Without x_ds the point indices are returned.
+
+    Returns:
+        The reduced x and y arrays.
+    """
+    n = y_ds.shape[0] if x_ds is None else min(y_ds.shape[0], x_ds.shape[0])
+    size = max(1, -(-n // buckets))
+    rows = _chunk_rows(y_ds.dtype.itemsize, size)
+    xs, ys = [], []
+    for start in range(0, n, rows):
+        y = np.asarray(y_ds[start:min(start + rows, n)])
+        idx = minmax_indices(y, -(-len(y) // size))
+        ys.append(y[idx])
+        xs.append(np.asarray(x_ds[start:min(start + rows, n)])[idx] if x_ds is not None else idx + start)
+    if not ys:
+        return np.zeros(0), np.zeros(0)
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+class ImagePyramid(object):
+    """Block reduced images of a 2d dataset growing along its first axis.
+
+    Every reduction level (fx, fy) that has been requested is kept. On an
+    update only the blocks containing changed rows are reduced again, so the
+    cost of a live update is proportional to the appended data.
+    """
+
+    def __init__(self):
+        self._levels = {}
+        self._shape = None
+
+    def update(self, data, start=0):
+        """Updates all levels with data, in which rows from start on changed.
+
+        Args:
+            data: the complete 2d array.
+            start: first row of data which changed since the last update.
+        """
+        if self._shape is None or self._shape[1:] != data.shape[1:] or self._shape[0] > data.shape[0]:
+            self._levels = {}
+        else:
+            for (fx, fy), level in list(self._levels.items()):
+                first = min(start, self._shape[0]) // fx
+                self._levels[(fx, fy)] = np.concatenate((level[:first], block_reduce(data[first * fx:], fx, fy)))
+        self._shape = data.shape
+        self._data = data
+
+    def level(self, fx, fy):
+        """Returns the image reduced by fx along the first and fy along the
+        second axis. Levels are computed once and updated incrementally.
+        """
+        if (fx, fy) not in self._levels:
+            self._levels[(fx, fy)] = block_reduce(self._data, fx, fy)
+        return self._levels[(fx, fy)]
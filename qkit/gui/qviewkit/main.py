@@ -18,7 +18,7 @@ import sys
 in_pyqt5 = False
 in_pyqt4 = False
 try:
-    from PyQt5.QtCore import Qt, QObject
+    from PyQt5.QtCore import Qt, QObject, pyqtSignal
     from PyQt5.QtWidgets import QApplication
     in_pyqt5 = True
 except ImportError as e:
@@ -26,7 +26,7 @@ except ImportError as e:
 
 if not in_pyqt5:
     try:
-        from PyQt4.QtCore import Qt, QObject
+        from PyQt4.QtCore import Qt, QObject, pyqtSignal
         from PyQt4.QtGui import QApplication
         in_pyqt4 = True
     except ImportError:
@@ -54,6 +54,8 @@ class DATA(QObject):
     toBe_deleted = []
     lock = Lock()
     info_thread_continue = True
+    "emitted by the info thread with the message of a 'dataset-grown' signal"
+    dataset_grown = pyqtSignal(str)
     "a set of housekeeping functions..."
 
     def append_plot(self,parent,window_id,ds):
@@ -137,6 +139,7 @@ def main(argv):
         '-sp','--save_plot',  default=False,action='store_true', help='(optional) save default plots'
         '-live','--live_plot',default=False,action='store_true', help='(optional) if set, plots are reloaded'
         '-qinfo','--qkit_info',default=False,action='store_true', help='(optional) if set, listen to qkit infos'
+        '-ip','--info_port', type=int, help='(optional) port of the qkit info service'
     """
     # some configuration boilerplate
     data = DATA()
@@ -152,6 +155,7 @@ def main(argv):
     parser.add_argument('-sp','--save_plot',  default=False,action='store_true', help='(optional) save default plots')
     parser.add_argument('-live','--live_plot',default=False,action='store_true', help='(optional) if set, plots are reloaded')
     parser.add_argument('-qinfo','--qkit_info',default=False,action='store_true', help='(optional) if set, listen to qkit infos')
+    parser.add_argument('-ip','--info_port', type=int, help='(optional) port of the qkit info service')
     args=parser.parse_args()
     data.args = args
 
@@ -252,10 +252,9 @@ class TdChannel(object):
         seq_list = []
         ro_inds = []
         for i in range(len(self._sequences)):
-            for time in self._times[i]:
-                seq, ro_ind = self._sequences[i](time, IQ_mixing = IQ_mixing)
-                seq_list.append(seq)
-                ro_inds.append(ro_ind)
+            seqs, ro_ind = self._sequences[i].render(self._times[i], IQ_mixing = IQ_mixing)
+            seq_list += seqs
+            ro_inds += ro_ind
         if not seq_list:
             logging.warning("No sequence stored in channel " + self.name)
             return [np.zeros(1)], [0]
@@ -501,34 +500,41 @@ class VirtualAWG(object):
         # find maximum readout indices
         lens = [len(ro_ind) for ro_ind in ro_inds]
         readout_indices = np.zeros(max(lens))
-        for i in range(0, len(lens)):
-            for j in range(lens[i]):
-                readout_indices[j] = max(readout_indices[j], ro_inds[i][j])
+        for ro_ind in ro_inds:
+            readout_indices[:len(ro_ind)] = np.maximum(readout_indices[:len(ro_ind)], ro_ind)
         
-        ind = 0
+        # prepend zeros to align the readouts, channels with fewer sequences are filled up with empty sequences
         sequences = []
-        sequences.extend([] for seq in seqs)
-        while any(seqs):
-            for i, seq in enumerate(seqs):
-                if seq:
-                    s = seq.pop(0)
-                    temp = np.zeros(int(max(0, readout_indices[ind] - ro_inds[i][ind])))
-                    s = np.append(temp, s)
+        for seq, ro_ind in zip(seqs, ro_inds):
+            synced = []
+            for ind in range(len(readout_indices)):
+                if ind < len(seq):
+                    pad = int(max(0, readout_indices[ind] - ro_ind[ind]))
+                    s = np.zeros(pad + len(seq[ind]), dtype = np.result_type(float, seq[ind]))
+                    s[pad:] = seq[ind]
                 else:
                     s = np.zeros(0)
-                sequences[i].append(s)
-            ind += 1
+                synced.append(s)
+            sequences.append(synced)
         return sequences, readout_indices
     
-    def load(self, show_progress_bar=True):
+    def load(self, show_progress_bar=True, delta=True, compress=False):
         """
         Load the sequences stored in the channels of the virtual AWG to your physical device (awg, fpga).
         Currently only enabled for the tabor awg.
+
+        Args:
+            show_progress_bar: show a progress bar while loading
+            delta:             only upload the segments that changed since the last load.
+                               Set to False to clear the device and upload everything.
+            compress:          play long waits as loops of a short zero segment in the sequencer of the device
+                               and upload identical pulses only once (recommended for long delays, e.g. T1).
         """
         # Case descrimination:
         if self._sample.awg.get_name() is "tawg":
             sequences, readout_inds = self._sync()
-            load_tawg.load_tabor(sequences, readout_inds, self._sample, show_progress_bar=show_progress_bar)
+            load_tawg.load_tabor(sequences, readout_inds, self._sample, show_progress_bar=show_progress_bar,
+                                 delta=delta, compress=compress)
         else:
             print("Unknown device type! Unable to load sequences.")
         return True
\ No newline at end of file
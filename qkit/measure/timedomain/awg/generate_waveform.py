@@ -33,6 +33,27 @@ if qkit.module_available("scipy"):
 
 dtype = np.float16 #you can change this via gwf.dtype to anything you want
 
+'''
+The pulse and sequence functions (erf, square, gauss, drag, t1, ramsey, spinecho, udd) accept arrays for their
+timing parameters (e.g. delay, pulse or position). In this case the waveforms of the whole sweep are calculated
+at once on a shared sample grid and returned as 2D array (n_times x n_samples), row i belonging to the i-th time.
+'''
+
+def _sweep(*values):
+    '''
+    broadcasts the (scalar or array valued) sample indices of a waveform against each other.
+    Returns them as column vectors (n_times x 1) and a flag if any of them was swept (i.e. an array).
+    '''
+    swept = any(np.ndim(v) > 0 for v in values)
+    values = np.broadcast_arrays(*[np.atleast_1d(v).ravel() for v in values])
+    return [v.reshape(-1, 1) for v in values], swept
+
+def _unsweep(wfm, swept):
+    '''
+    returns the 2D array of a sweep, or its single row if no parameter was swept
+    '''
+    return wfm if swept else wfm[0]
+
 def compensate(wfm, gamma, sample):
     '''
     Function that translates a given (analog) waveform wfm into a waveform wfc that needs to be programmed to the AWG
@@ -68,19 +89,19 @@ def erf(pulse, attack, decay, sample, length=None, position = None, low=0, high=
         raise ImportError('scipy not available. scipy is needed for erf.')
     if(clock == None): clock = sample.clock
     if(length == None): length = sample.exc_T
-    if position == None:   #automatically correct overlap only when position argument not explicitly given
+    if position is None:   #automatically correct overlap only when position argument not explicitly given
         position = length
         if hasattr(sample, 'overlap'):   #if overlap exists in sample object
             position -= sample.overlap
         else:
             logging.warning('overlap attribute not found in sample object')
-    if(pulse>position):
+    if np.any(pulse>position):
         logging.error(__name__ + ' : pulse does not fit into waveform')
         
-    sample_start = int(clock*(position-pulse))
-    sample_end = int(clock*position)
+    (sample_start, sample_end), swept = _sweep(np.trunc(clock*(position-pulse)), np.trunc(clock*position))
     sample_length = int(np.round(length*clock))
-    wfm = low * np.ones(sample_length,dtype=dtype)
+    samples = np.arange(sample_length)
+    wfm = low * np.ones((len(sample_start), sample_length))
     
     if attack != 0:
         if attack < 2./clock:
@@ -88,7 +109,9 @@ def erf(pulse, attack, decay, sample, length=None, position = None, low=0, high=
             attack = 2./clock
         nAttack = int(clock*attack)
         sAttack = 0.5*(1+scipy.special.erf(np.linspace(-2, 2, nAttack)))
-        wfm[sample_start:sample_start+nAttack] += sAttack * (high-low)
+        i = (samples - sample_start).astype(int)
+        rising = (i >= 0) & (i < nAttack)
+        wfm[rising] += sAttack[i[rising]] * (high-low)
     else:
         nAttack = 0
     if decay != 0:
@@ -97,18 +120,20 @@ def erf(pulse, attack, decay, sample, length=None, position = None, low=0, high=
             decay = 2./clock
         nDecay = int(clock*decay)
         sDecay = 0.5*(1+scipy.special.erf(np.linspace(2, -2, nDecay)))
-        wfm[sample_end-nDecay:sample_end] += sDecay * (high-low)
+        i = (samples - (sample_end-nDecay)).astype(int)
+        falling = (i >= 0) & (i < nDecay)
+        wfm[falling] += sDecay[i[falling]] * (high-low)
     else:
         nDecay = 0
-    wfm[sample_start+nAttack:sample_end-nDecay] = high
-    return wfm
+    wfm[(samples >= sample_start+nAttack) & (samples < sample_end-nDecay)] = high
+    return _unsweep(wfm.astype(dtype), swept)
     
 def exp(pulse, decay, sample, position = None, low=0, high=1, clock = None):
     '''
     create and exponential decaying waveform
     '''
     if(clock == None): clock = sample.clock
-    if position == None:   #automatically correct overlap only when position argument not explicitly given
+    if position is None:   #automatically correct overlap only when position argument not explicitly given
         position = length
         if hasattr(sample, 'overlap'):   #if overlap exists in sample object
             position -= sample.overlap
@@ -133,7 +158,7 @@ def triangle(attack, decay, sample, length = None, position = None, low=0, high=
     '''
     if(clock == None): clock = sample.clock
     if(length == None): length = sample.exc_T
-    if position == None:   #automatically correct overlap only when position argument not explicitly given
+    if position is None:   #automatically correct overlap only when position argument not explicitly given
         position = length
         if hasattr(sample, 'overlap'):   #if overlap exists in sample object
             position -= sample.overlap
@@ -166,25 +191,22 @@ def square(pulse, sample, length = None,position = None, low = 0, high = 1, cloc
     '''
     if(clock == None): clock= sample.clock
     if(length == None): length= sample.exc_T
-    if position == None:   #automatically correct overlap only when position argument not explicitly given
+    if position is None:   #automatically correct overlap only when position argument not explicitly given
         position = length
         if hasattr(sample, 'overlap'):   #if overlap exists in sample object
             position -= sample.overlap
         else:
             logging.warning('overlap attribute not found in sample object')
-    if(pulse>position): logging.error(__name__ + ' : pulse does not fit into waveform')
-    sample_start = int(clock*(position-pulse-adddelay))
-    sample_end = int(clock*(position-adddelay))
+    if np.any(pulse>position): logging.error(__name__ + ' : pulse does not fit into waveform')
+    # start and end are whole samples
+    (sample_start, sample_end), swept = _sweep(np.trunc(clock*(position-pulse-adddelay)), np.trunc(clock*(position-adddelay)))
     sample_length = int(np.round(length*clock)/4)*4 #Ensures that the number of samples is divisible by 4 @andre20150615
     #sample_length = int(np.ceil(length*clock)) #old definition
-    wfm = low*np.ones(sample_length,dtype=dtype)
-    if(sample_start < sample_end): wfm[int(sample_start)] = high + (low-high)*(sample_start-int(sample_start))
-    if freq==None: wfm[int(np.ceil(sample_start)):int(sample_end)] = high
-    else:
-        for i in range(int(sample_end)-int(np.ceil(sample_start))):
-            wfm[i+int(np.ceil(sample_start))] = high*np.sin(2*np.pi*freq/clock*(i))
-    if(np.ceil(sample_end) != np.floor(sample_end)): wfm[int(sample_end)] = low + (high-low)*(sample_end-int(sample_end))
-    return wfm
+    samples = np.arange(sample_length)
+    on = (samples >= sample_start) & (samples < sample_end)
+    if freq==None: wfm = np.where(on, high, low)
+    else: wfm = np.where(on, high*np.sin(2*np.pi*freq/clock*(samples - sample_start)), low)
+    return _unsweep(wfm.astype(dtype), swept)
     
     
 def gauss(pulse, sample, length = None,position = None, low = 0, high = 1, clock = None):
@@ -207,24 +229,21 @@ def gauss(pulse, sample, length = None,position = None, low = 0, high = 1, clock
         sample_length = int(np.round(length*clock)/4)*4
     else:
         sample_length = int(length*clock)
-    if position == None:   #automatically correct overlap only when position argument not explicitly given
+    if position is None:   #automatically correct overlap only when position argument not explicitly given
         position = length
         if hasattr(sample, 'overlap'):   #if overlap exists in sample object
             position -= sample.overlap
         else:
             logging.warning('overlap attribute not found in sample object')
-    if(pulse>position): logging.error(__name__ + ' : pulse does not fit into waveform')
-    sample_start = int(clock*(position-pulse))
-    sample_end = int(clock*position)
+    if np.any(pulse>position): logging.error(__name__ + ' : pulse does not fit into waveform')
+    (sample_start, sample_end), swept = _sweep(np.trunc(clock*(position-pulse)), np.trunc(clock*position))
     
-    wfm = low*np.ones(sample_length,dtype=dtype)
-    if(sample_start < sample_end): wfm[int(sample_start)] = 0.#high + (low-high)*(sample_start-int(sample_start))
-    #wfm[int(np.ceil(sample_start)):int(sample_end)] = high
-    pulsesamples = int(int(sample_end)-int(sample_start))
-    for i in range(pulsesamples):
-        wfm[int(np.ceil(sample_start)+i)] = high*np.exp(-(i-pulsesamples/2.)**2/(2.*(pulsesamples/5.)**2))
-    if(np.ceil(sample_end) != np.floor(sample_end)): wfm[int(sample_end)] = low + (high-low)*(sample_end-int(sample_end))
-    return wfm
+    pulsesamples = sample_end - sample_start
+    i = np.arange(sample_length) - sample_start   # sample index within the pulse
+    on = (i >= 0) & (i < pulsesamples)
+    width = np.where(pulsesamples > 0, pulsesamples/5., 1.)
+    wfm = np.where(on, high*np.exp(-(i-pulsesamples/2.)**2/(2.*width**2)), low)
+    return _unsweep(wfm.astype(dtype), swept)
 
 def arb_function(function, pulse, length = None,position = None, clock = None):
     '''
@@ -241,7 +260,7 @@ def arb_function(function, pulse, length = None,position = None, clock = None):
     '''
     if(clock == None): clock= sample.clock
     if(length == None): length= sample.exc_T
-    if position == None:   #automatically correct overlap only when position argument not explicitly given
+    if position is None:   #automatically correct overlap only when position argument not explicitly given
         position = length
         if hasattr(sample, 'overlap'):   #if overlap exists in sample object
             position -= sample.overlap
@@ -273,11 +292,11 @@ def t1(delay, sample, length = None, low = 0, high = 1, clock = None, DRAG_ampli
     if(length == None): length = sample.exc_T
 
     if hasattr(sample, 'overlap'):   #if overlap exists in sample object
-        delay += sample.overlap
+        delay = delay + sample.overlap   # no in-place addition, delay may be the array of a sweep
     else:
         logging.warning('overlap attribute not found in sample object')
 
-    if(delay+sample.tpi > length): logging.error(__name__ + ' : pulse does not fit into waveform')
+    if np.any(delay+sample.tpi > length): logging.error(__name__ + ' : pulse does not fit into waveform')
     
     if DRAG_amplitude == None:
         wfm = square(sample.tpi, sample, length, length-delay, clock = clock)
@@ -300,7 +319,7 @@ def ramsey(delay, sample, pi2_pulse = None, length = None,position = None, low =
     '''
     if(clock == None): clock = sample.clock
     if(length == None): length = sample.exc_T
-    if position == None:   #automatically correct overlap only when position argument not explicitly given
+    if position is None:   #automatically correct overlap only when position argument not explicitly given
         position = length
         if hasattr(sample, 'overlap'):   #if overlap exists in sample object
             position -= sample.overlap
@@ -308,15 +327,15 @@ def ramsey(delay, sample, pi2_pulse = None, length = None,position = None, low =
             logging.warning('overlap attribute not found in sample object')
     if DRAG_amplitude == None:
         if(pi2_pulse == None): pi2_pulse = sample.tpi2
-        if(delay+2*pi2_pulse>position): logging.error(__name__ + ' : ramsey pulses do not fit into waveform')
+        if np.any(delay+2*pi2_pulse>position): logging.error(__name__ + ' : ramsey pulses do not fit into waveform')
         wfm = square(pi2_pulse, sample, length, position, clock = clock)
-        wfm += square(pi2_pulse, sample,  length, position-delay-pi2_pulse, clock = clock)
+        wfm = wfm + square(pi2_pulse, sample,  length, position-delay-pi2_pulse, clock = clock)
     
     else:
         if(pi2_pulse == None): pi2_pulse = sample.tpi2
-        if(delay+2*pi2_pulse>position): logging.error(__name__ + ' : ramsey pulses do not fit into waveform')
+        if np.any(delay+2*pi2_pulse>position): logging.error(__name__ + ' : ramsey pulses do not fit into waveform')
         wfm = drag(pi2_pulse, sample, DRAG_amplitude, length, position, clock = clock)
-        wfm += drag(pi2_pulse, sample, DRAG_amplitude,  length, position-delay-pi2_pulse, clock = clock)
+        wfm = wfm + drag(pi2_pulse, sample, DRAG_amplitude,  length, position-delay-pi2_pulse, clock = clock)
     
     wfm = wfm * (high-low) + low
     return wfm
@@ -345,7 +364,7 @@ def spinecho(delay, sample, pi2_pulse = None, pi_pulse = None, length = None,pos
     
     if(clock == None): clock= sample.clock
     if(length == None): length= sample.exc_T
-    if position == None:   #automatically correct overlap only when position argument not explicitly given
+    if position is None:   #automatically correct overlap only when position argument not explicitly given
         position = length
         if hasattr(sample, 'overlap'):   #if overlap exists in sample object
             position -= sample.overlap
@@ -354,7 +373,7 @@ def spinecho(delay, sample, pi2_pulse = None, pi_pulse = None, length = None,pos
     if(pi2_pulse == None): pi2_pulse = sample.tpi2
     if(pi_pulse == None): pi_pulse = sample.tpi
   
-    if round(adddelay+delay+2*pi2_pulse+n*pi_pulse, 10) > round(position, 10): # round bc of floating points arethmetic
+    if np.any(np.round(adddelay+delay+2*pi2_pulse+n*pi_pulse, 10) > round(position, 10)): # round bc of floating points arethmetic
         logging.error(__name__ + ' : sequence does not fit into waveform. delay is the sum of the waiting times in between the pi pulses')
     
     if DRAG_amplitude == None:
@@ -363,8 +382,8 @@ def spinecho(delay, sample, pi2_pulse = None, pi_pulse = None, length = None,pos
         else:
             wfm = square(pi2_pulse, sample, length, position, low, low, clock,freq=freq)*np.exp(0j)   #create space (low) of the length of a pi/2 pulse
         for ni in range(n):   #add pi pulses
-            wfm += square(pi_pulse, sample, length, position - pi2_pulse - ni*pi_pulse - float(delay)/(2*n)-delay/n*ni - adddelay, clock = clock, freq=freq)*np.exp(phase*1j)
-        wfm += square(pi2_pulse, sample, length, position - pi2_pulse - n*pi_pulse - delay - adddelay, clock = clock, freq=freq)*np.exp(0j)   #pi/2 pulse
+            wfm = wfm + square(pi_pulse, sample, length, position - pi2_pulse - ni*pi_pulse - delay/(2.*n)-delay/float(n)*ni - adddelay, clock = clock, freq=freq)*np.exp(phase*1j)
+        wfm = wfm + square(pi2_pulse, sample, length, position - pi2_pulse - n*pi_pulse - delay - adddelay, clock = clock, freq=freq)*np.exp(0j)   #pi/2 pulse
         wfm = wfm * (high-low) + complex(low,low)   #adjust offset
         if phase == 0: wfm = wfm.real # to avoid conversion error messages
         
@@ -374,8 +393,8 @@ def spinecho(delay, sample, pi2_pulse = None, pi_pulse = None, length = None,pos
         else:
             wfm = square(pi2_pulse, sample, length, position, low, low, clock,freq=freq)*np.exp(0j)   #create space (low) of the length of a pi/2 pulse
         for ni in range(n):   #add pi pulses
-            wfm += drag(pi_pulse, sample, DRAG_amplitude, length, position - pi2_pulse - ni*pi_pulse - float(delay)/(2*n)-delay/n*ni - adddelay, clock = clock)*np.exp(phase*1j)
-        wfm += drag(pi2_pulse, sample, DRAG_amplitude, length, position - pi2_pulse - n*pi_pulse - delay - adddelay, clock = clock)*np.exp(0j)   #pi/2 pulse
+            wfm = wfm + drag(pi_pulse, sample, DRAG_amplitude, length, position - pi2_pulse - ni*pi_pulse - delay/(2.*n)-delay/float(n)*ni - adddelay, clock = clock)*np.exp(phase*1j)
+        wfm = wfm + drag(pi2_pulse, sample, DRAG_amplitude, length, position - pi2_pulse - n*pi_pulse - delay - adddelay, clock = clock)*np.exp(0j)   #pi/2 pulse
         wfm = wfm * (high-low) + complex(low,low)   #adjust offset
     
     return wfm
@@ -397,7 +416,7 @@ def udd(delay, sample, pi2_pulse = None, pi_pulse = None, length = None,position
     
     if(clock == None): clock= sample.clock
     if(length == None): length= sample.exc_T
-    if position == None:   #automatically correct overlap only when position argument not explicitly given
+    if position is None:   #automatically correct overlap only when position argument not explicitly given
         position = length
         if hasattr(sample, 'overlap'):   #if overlap exists in sample object
             position -= sample.overlap
@@ -406,7 +425,7 @@ def udd(delay, sample, pi2_pulse = None, pi_pulse = None, length = None,position
     if(pi2_pulse == None): pi2_pulse = sample.tpi2
     if(pi_pulse == None): pi_pulse = sample.tpi   
     
-    if round(adddelay+delay+2*pi2_pulse+n*pi_pulse, 10) > round(position, 10):
+    if np.any(np.round(adddelay+delay+2*pi2_pulse+n*pi_pulse, 10) > round(position, 10)):
         logging.error(__name__ + ' : sequence does not fit into waveform. delay is the sum of the waiting times in between the pi pulses')
     if DRAG_amplitude == None:
         if readoutpulse:   #last pi/2 pulse
@@ -414,8 +433,8 @@ def udd(delay, sample, pi2_pulse = None, pi_pulse = None, length = None,position
         else:
             wfm = square(pi2_pulse, sample, length, position, low, low, clock,freq=freq)*np.exp(0j)   #create space (low) of the length of a pi/2 pulse
         for ni in range(n):   #add pi pulses
-            wfm += square(pi_pulse, sample, length, position - (delay+n*pi_pulse)*(np.sin((np.pi*(ni+1))/(2*n+2)))**2 - adddelay, clock = clock, freq=freq)*np.exp(phase*1j) # no pi2_pulse subtracted because equation yields position of center
-        wfm += square(pi2_pulse, sample, length, position - pi2_pulse - n*pi_pulse - delay - adddelay, clock = clock, freq=freq)*np.exp(0j)   #pi/2 pulse
+            wfm = wfm + square(pi_pulse, sample, length, position - (delay+n*pi_pulse)*(np.sin((np.pi*(ni+1))/(2*n+2)))**2 - adddelay, clock = clock, freq=freq)*np.exp(phase*1j) # no pi2_pulse subtracted because equation yields position of center
+        wfm = wfm + square(pi2_pulse, sample, length, position - pi2_pulse - n*pi_pulse - delay - adddelay, clock = clock, freq=freq)*np.exp(0j)   #pi/2 pulse
         wfm = wfm * (high-low) + complex(low,low)   #adjust offset
         if phase == 0: wfm = wfm.real # to avoid conversion error messages
     
@@ -425,8 +444,8 @@ def udd(delay, sample, pi2_pulse = None, pi_pulse = None, length = None,position
         else:
             wfm = square(pi2_pulse, sample, length, position, low, low, clock,freq=freq)*np.exp(0j)   #create space (low) of the length of a pi/2 pulse
         for ni in range(n):   #add pi pulses
-            wfm += drag(pi_pulse, sample, DRAG_amplitude, length, position - (delay+n*pi_pulse)*(np.sin((np.pi*(ni+1))/(2*n+2)))**2 - adddelay, clock = clock)*np.exp(phase*1j)
-        wfm += drag(pi2_pulse, sample, DRAG_amplitude, length, position - pi2_pulse - n*pi_pulse - delay - adddelay, clock = clock)*np.exp(0j)   #pi/2 pulse
+            wfm = wfm + drag(pi_pulse, sample, DRAG_amplitude, length, position - (delay+n*pi_pulse)*(np.sin((np.pi*(ni+1))/(2*n+2)))**2 - adddelay, clock = clock)*np.exp(phase*1j)
+        wfm = wfm + drag(pi2_pulse, sample, DRAG_amplitude, length, position - pi2_pulse - n*pi_pulse - delay - adddelay, clock = clock)*np.exp(0j)   #pi/2 pulse
         wfm = wfm * (high-low) + complex(low,low)   #adjust offset
     return wfm
 
@@ -445,14 +464,17 @@ def drag(pulse, sample, amplitude, length = None, position=None, clock = None):
 
     if(clock == None): clock = sample.clock
     if(length == None): length = sample.exc_T
-    if position == None:   #automatically correct overlap only when position argument not explicitly given
+    if position is None:   #automatically correct overlap only when position argument not explicitly given
         position = length
         if hasattr(sample, 'overlap'):   #if overlap exists in sample object
             position -= sample.overlap
         else:
             logging.warning('overlap attribute not found in sample object')
-    wfm = gauss(pulse, sample, length=np.ceil(length*1e9)/1e9, position=position) + 1j * np.concatenate([np.diff(gauss(pulse, sample,length=np.ceil(length*1e9)/1e9, position=position)*amplitude),[0]]) # actual pulse
-    wfm[int((position-pulse)*clock-1):int((position-pulse)*clock+1)]=wfm.real[int((position-pulse)*clock-1):int((position-pulse)*clock+1)] # for smooth derivative
-    wfm[int(position*clock-1):int(position*clock+1)]= wfm.real[int(position*clock-1):int(position*clock+1)] 
-    
-    return wfm
+    envelope = gauss(pulse, sample, length=np.ceil(length*1e9)/1e9, position=position)
+    derivative = np.diff(envelope*amplitude, axis=-1)
+    wfm = envelope + 1j * np.concatenate([derivative, np.zeros(derivative.shape[:-1] + (1,))], axis=-1) # actual pulse
+    (start, end), swept = _sweep((position-pulse)*clock, position*clock)
+    samples = np.arange(wfm.shape[-1])
+    edges = ((samples >= np.trunc(start-1)) & (samples < np.trunc(start+1))) | ((samples >= np.trunc(end-1)) & (samples < np.trunc(end+1)))
+    wfm = np.where(edges, wfm.real, wfm) # for smooth derivative
+    return _unsweep(wfm, swept)
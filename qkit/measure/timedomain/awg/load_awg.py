@@ -19,11 +19,11 @@
 import qkit
 import numpy as np
 import logging
-from qkit.gui.notebook.Progress_Bar import Progress_Bar
+from qkit.measure.timedomain.awg.upload_scheduler import UploadScheduler
 import gc
 
 
-def update_sequence(ts, wfm_func, sample, iq = None, loop = False, drive = 'c:', path = '\\waveforms', reset = True, marker=None, markerfunc=None, ch2_amp = 2,chpair=1,awg= None, show_progress_bar = True):
+def update_sequence(ts, wfm_func, sample, iq = None, loop = False, drive = 'c:', path = '\\waveforms', reset = True, marker=None, markerfunc=None, ch2_amp = 2,chpair=1,awg= None, show_progress_bar = True, scheduler = None):
     '''
         set awg to sequence mode and push a number of waveforms into the sequencer
         
@@ -31,6 +31,8 @@ def update_sequence(ts, wfm_func, sample, iq = None, loop = False, drive = 'c:',
         
         ts: array of times, len(ts) = #sequenzes
         wfm_func: waveform function usually generated via generate_waveform using ts[i]; this can be a tuple of arrays (for channels 0,1, heterodyne mode) or a single array (homodyne mode)
+                  Alternatively, the waveforms of the whole sweep can be passed directly as 2D array (len(ts) x samples),
+                  e.g. gwf.spinecho(ts, sample), or as a tuple of two such arrays for channels 0,1.
         sample: sample object
         
         iq: Reference to iq mixer instrument. If None (default), the wfm will not be changed. Otherwise, the wfm will be converted via iq.convert()
@@ -42,14 +44,25 @@ def update_sequence(ts, wfm_func, sample, iq = None, loop = False, drive = 'c:',
         for the 1.2GS/s AWG, it must be divisible by 4
         
         chpair: if you use the 4ch Tabor AWG as a single 2ch instrument, you can chose to take the second channel pair here (this can be either 1 or 2).
+        
+        scheduler: UploadScheduler shared with other devices. The uploads are only submitted and executed by scheduler.run(),
+            so several AWGs can be loaded at the same time (call update_sequence for each of them first). Returns None in this case.
+            Without scheduler the waveforms of the next sequences are calculated while the current one is uploaded.
     '''
     qkit.flow.start()
     if awg==None:
         awg = sample.awg
     clock = sample.clock
-    wfm_func2 = wfm_func
-    if iq != None:
-        wfm_func2 = lambda t, sample: iq.convert(wfm_func(t,sample))
+    def wfm_func2(ti, t):
+        if callable(wfm_func):
+            wfm_samples = wfm_func(t,sample)
+        elif isinstance(wfm_func, np.ndarray):   #precalculated waveforms of the whole sweep
+            wfm_samples = wfm_func[ti]
+        else:
+            wfm_samples = [wfm_func[0][ti], wfm_func[1][ti]]
+        if iq != None:
+            wfm_samples = iq.convert(wfm_samples)
+        return wfm_samples
     
     # create new sequence
     if reset:
@@ -68,18 +81,18 @@ def update_sequence(ts, wfm_func, sample, iq = None, loop = False, drive = 'c:',
         awg.set_ch2_amplitude(ch2_amp)
 
     #generate empty tuples
-    wfm_samples_prev = [None,None]
     wfm_fn = [None,None]
     wfm_pn = [None,None]
-    if show_progress_bar: p = Progress_Bar(len(ts)*(2 if "Tektronix" in awg.get_type() else 1),'Load AWG')   #init progress bar
     
-    #update all channels and times
-    for ti, t in enumerate(ts):   #run through all sequences
-        qkit.flow.sleep()
-        wfm_samples = wfm_func2(t,sample)   #generate waveform
+    def prepare(ti, t):
+        '''
+        calculates waveform and markers of sequence ti (runs on the preparation threads of the scheduler)
+        '''
+        wfm_samples = wfm_func2(ti,t)   #generate waveform
         if not isinstance(wfm_samples[0],(list, tuple, np.ndarray)):   #homodyne
             wfm_samples = [wfm_samples,np.zeros_like(wfm_samples, dtype=np.int8)]
         
+        markers = []
         for chan in [0,1]:
             if markerfunc != None:   #use markerfunc
                 try:
@@ -104,7 +117,16 @@ def update_sequence(ts, wfm_func, sample, iq = None, loop = False, drive = 'c:',
                 c_marker1, c_marker2 = marker[chan]
                 marker1 = c_marker1[ti]
                 marker2 = c_marker2[ti]
-            
+            markers.append((marker1, marker2))
+        return wfm_samples, markers
+    
+    def send(data, ti):
+        '''
+        uploads waveform and markers of sequence ti (runs in the device thread of the scheduler)
+        '''
+        wfm_samples, markers = data
+        for chan in [0,1]:
+            marker1, marker2 = markers[chan]
             if "Tektronix" in awg.get_type():
                 wfm_fn[chan] = 'ch%d_t%05d'%(chan+1, ti) # filename is kept until changed
                 if len(wfm_samples) == 1 and chan == 1:
@@ -126,24 +148,36 @@ def update_sequence(ts, wfm_func, sample, iq = None, loop = False, drive = 'c:',
                 else: continue
             else:
                 raise ValueError("AWG type not known")
-            if show_progress_bar: p.iterate()
-
-        gc.collect()
-
-    if reset and "Tektronix" in awg.get_type():
-        # enable channels
-        awg.set_ch1_status(True)
-        awg.set_ch2_status(True)
-        awg.set_seq_goto(len(ts), 1)
-        awg.run()
-        awg.wait(10,False)
-    elif reset and "Tabor" in awg.get_type():
-        # enable channels
-        #awg.preset()
-        awg.set_ch1_status(True)
-        awg.set_ch2_status(True)
+    
+    def finish():
+        if reset and "Tektronix" in awg.get_type():
+            # enable channels
+            awg.set_ch1_status(True)
+            awg.set_ch2_status(True)
+            awg.set_seq_goto(len(ts), 1)
+            awg.run()
+            awg.wait(10,False)
+        elif reset and "Tabor" in awg.get_type():
+            # enable channels
+            #awg.preset()
+            awg.set_ch1_status(True)
+            awg.set_ch2_status(True)
+        if sample.__dict__.has_key('mspec'):
+            sample.mspec.spec_stop()
+            sample.mspec.set_segments(len(ts))
+    
+    #update all channels and times
+    run_scheduler = scheduler is None
+    if run_scheduler:
+        scheduler = UploadScheduler('Load AWG', show_progress_bar=show_progress_bar)
+    for ti, t in enumerate(ts):   #run through all sequences
+        qkit.flow.sleep()
+        scheduler.submit(awg, send, ti, prepare=lambda ti=ti, t=t: prepare(ti, t), description='sequence %i'%(ti+1))
+    scheduler.submit(awg, finish)
+    if not run_scheduler:
+        qkit.flow.end()
+        return None
+    scheduler.run()
+    gc.collect()
     qkit.flow.end()
-    if sample.__dict__.has_key('mspec'):
-        sample.mspec.spec_stop()
-        sample.mspec.set_segments(len(ts))
     return np.all([awg.get('ch%i_status'%i) for i in [1,2]])
\ No newline at end of file
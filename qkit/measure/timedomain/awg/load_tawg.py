@@ -18,14 +18,118 @@
 # import qkit  # ToDO: flow comments?
 import numpy as np
 import logging
-from qkit.gui.notebook.Progress_Bar import Progress_Bar
+import hashlib
+from qkit.measure.timedomain.awg.upload_scheduler import UploadScheduler
 import gc
 
 
-def _adjust_wfs_for_tabor(wf1, wf2, ro_index, chpair, segment, sample):
+class _TaborSequencer(object):
+    """
+    Compiles the waveforms of one channel pair into segments and a sequence table of the Tabor awg.
+    Every waveform is cut into blocks of block_length points. Runs of at least min_zero_blocks blocks without
+    any signal are played as loops of a single zero segment, the remaining parts are uploaded as segments.
+    Segments with identical content (e.g. the same pi-pulse in every sequence) are only uploaded once.
+    """
+    def __init__(self, awg, chpair, block_length=192, min_zero_blocks=2, only_changed=True):
+        self.awg = awg
+        self.chpair = chpair
+        self.block_length = block_length  # multiple of 16 and >= 192 (minimum segment length)
+        self.min_zero_blocks = min_zero_blocks
+        self.only_changed = only_changed
+        self.segments = []
+        self.loops = []
+        self._segment_numbers = {}  # content digest -> segment number on the awg
+
+    def _segment(self, wf1, wf2, marker):
+        digest = hashlib.sha1(np.concatenate((wf1, wf2, marker)).astype(float).tobytes()).hexdigest()
+        if digest not in self._segment_numbers:
+            self._segment_numbers[digest] = len(self._segment_numbers) + 1
+            self.awg.wfm_send2(wf1, wf2, marker, marker, self.chpair * 2 - 1, self._segment_numbers[digest],
+                               only_changed=self.only_changed)
+        return self._segment_numbers[digest]
+
+    def _append(self, segment, loops):
+        if self.segments and self.segments[-1] == segment:
+            self.loops[-1] += loops
+        else:
+            self.segments.append(segment)
+            self.loops.append(loops)
+
+    def add(self, wf1, wf2, marker):
+        """
+        Appends a waveform (length divisible by 16) to the sequence table.
+        The waveform is padded with zeros at the end to full blocks, like short segments are padded to 192
+        points by the awg driver. Pulses and readout keep their timing, only the idle time after the readout
+        grows by less than one block.
+        """
+        pad = -len(wf1) % self.block_length
+        if pad:
+            wf1, wf2, marker = [np.append(w, np.zeros(pad)) for w in (wf1, wf2, marker)]
+        blocks = len(wf1) // self.block_length
+        signal = (wf1 != 0) | (wf2 != 0) | (marker != 0)
+        is_zero = ~signal.reshape((blocks, self.block_length)).any(axis=1)
+        # boundaries of runs of equal is_zero values
+        edges = np.concatenate(([0], np.flatnonzero(np.diff(is_zero)) + 1, [blocks]))
+        start = 0  # first block which is not yet in the sequence table
+        for run_start, run_end in zip(edges[:-1], edges[1:]):
+            if is_zero[run_start] and run_end - run_start >= self.min_zero_blocks:
+                if run_start > start:
+                    sl = slice(start * self.block_length, run_start * self.block_length)
+                    self._append(self._segment(wf1[sl], wf2[sl], marker[sl]), 1)
+                zeros = np.zeros(self.block_length)
+                self._append(self._segment(zeros, zeros, zeros), int(run_end - run_start))
+                start = run_end
+        if blocks > start:
+            sl = slice(start * self.block_length, None)
+            self._append(self._segment(wf1[sl], wf2[sl], marker[sl]), 1)
+
+    def load(self):
+        """
+        Writes the sequence table to the awg.
+        The sequence table needs at least 3 entries. Shorter tables are filled up by splitting looped entries,
+        which plays the same waveform. Only if that is not possible, the table is repeated like in
+        define_sequence of the awg driver.
+        """
+        segments, loops = list(self.segments), list(self.loops)
+        while len(segments) < 3 and max(loops) > 1:
+            i = int(np.argmax(loops))
+            segments[i:i + 1] = [segments[i], segments[i]]
+            loops[i:i + 1] = [loops[i] - loops[i] // 2, loops[i] // 2]
+        table = segments, loops
+        while len(segments) < 3:
+            segments, loops = segments + table[0], loops + table[1]
+        logging.info('Channel pair %i: %i sequence entries using %i segments'
+                     % (self.chpair, len(segments), len(self._segment_numbers)))
+        self.awg.define_sequence(self.chpair * 2 - 1, segments, loops, np.zeros(len(segments)))
+
+
+def _adjust_wfs_for_tabor(wf1, wf2, ro_index, chpair, segment, sample, only_changed=False, sequencers=None):
     """
     This function simply adjust the waveforms, coming from the virtual awg, to fit the requirements of the
     Tabor awg
+    If only_changed is set, the upload is skipped if the segment on the awg already holds the same data.
+    If sequencers (dict chpair -> _TaborSequencer) is given, the waveforms are compressed into the sequence table
+    of the channel pair instead of being uploaded to segment + 1.
+    Returns True if the waveforms were uploaded.
+    """
+    return _send_to_tabor(_tabor_waveforms(wf1, wf2, ro_index, segment, sample), chpair, segment, sample,
+                          only_changed, sequencers)
+
+
+def _submit_to_tabor(scheduler, wf1, wf2, ro_index, chpair, segment, sample, only_changed=False, sequencers=None):
+    """
+    Same as _adjust_wfs_for_tabor, but the upload is submitted to scheduler.
+    The waveforms are adjusted on the preparation threads of the scheduler.
+    """
+    scheduler.submit(sample.awg, _send_to_tabor, chpair, segment, sample, only_changed, sequencers,
+                     prepare=lambda: _tabor_waveforms(wf1, wf2, ro_index, segment, sample),
+                     description='segment %i of channel pair %i' % (segment + 1, chpair))
+
+
+def _tabor_waveforms(wf1, wf2, ro_index, segment, sample):
+    """
+    Pads the waveforms of one segment and creates the readout marker.
+    Returns wf1, wf2, marker1 with a length divisible by 16.
     """
     divisor = 16
     readout_ind = int(ro_index[segment] + int(sample.clock * sample.readout_delay))
@@ -61,10 +165,23 @@ def _adjust_wfs_for_tabor(wf1, wf2, ro_index, chpair, segment, sample):
         wf1 = np.append(np.zeros(divisor - end_zeros), wf1)
         wf2 = np.append(np.zeros(divisor - end_zeros), wf2)
         marker1 = np.append(np.zeros(divisor - end_zeros), marker1)
-    sample.awg.wfm_send2(wf1, wf2, marker1, marker1, chpair * 2 - 1, segment + 1)
+    return wf1, wf2, marker1
 
 
-def load_tabor(channel_sequences, ro_index, sample, reset=True, show_progress_bar=True):
+def _send_to_tabor(wfs, chpair, segment, sample, only_changed=False, sequencers=None):
+    """
+    Uploads the waveforms wf1, wf2, marker1 (see _tabor_waveforms) to segment + 1 of the channel pair,
+    or adds them to the sequencer of the channel pair.
+    """
+    wf1, wf2, marker1 = wfs
+    if sequencers is not None:
+        sequencers[chpair].add(wf1, wf2, marker1)
+        return True
+    return sample.awg.wfm_send2(wf1, wf2, marker1, marker1, chpair * 2 - 1, segment + 1, only_changed=only_changed)
+
+
+def load_tabor(channel_sequences, ro_index, sample, reset=True, show_progress_bar=True, delta=True, compress=False,
+               scheduler=None):
     """
     This function takes the data, coming from virtual awg, and loads them into the awg
     :param channel_sequences: This must be a list of list, i.e., a list of channels each containing the sequences
@@ -73,10 +190,19 @@ def load_tabor(channel_sequences, ro_index, sample, reset=True, show_progress_ba
     :param sample: you should know this
     :param reset: simply sets the awg_channel active, probably not needed
     :param show_progress_bar: enables the progress bar
-    :return:
+    :param delta: only upload segments whose content differs from what the awg driver uploaded before.
+                  If False, all waveforms are cleared and uploaded again.
+    :param compress: play long idle times as loops of a short zero segment and upload identical parts of the
+                     sequences only once, instead of uploading every sequence as one segment.
+                     Reduces memory and upload time for experiments with long delays (e.g. T1, Ramsey).
+    :param scheduler: UploadScheduler shared with the uploads to other devices. The uploads are only submitted
+                      and executed by scheduler.run(), which allows to load several awgs at the same time.
+                      In this case the function returns None.
+    :return: True if all channels of the awg are on
     """
     awg = sample.awg
-    awg.clear_waveforms()
+    if not delta:
+        awg.clear_waveforms()
     number_of_channels = 0
     complex_channel = []
     for chan in channel_sequences:
@@ -100,68 +226,62 @@ def load_tabor(channel_sequences, ro_index, sample, reset=True, show_progress_ba
     if reset:
         _reset(awg, number_of_channels, ro_index)
     # Loading the waveforms into the AWG, differentiating between all cases
-    if show_progress_bar:
-        p = Progress_Bar(len(ro_index), 'Load AWG')
+    if compress:
+        sequencers = dict((chpair, _TaborSequencer(awg, chpair, only_changed=delta))
+                          for chpair in range(1, (number_of_channels + 1) // 2 + 1))
+    else:
+        sequencers = None
+    run_scheduler = scheduler is None
+    if run_scheduler:
+        scheduler = UploadScheduler('Load AWG', show_progress_bar=show_progress_bar)
 
     if number_of_channels == 1:
         for j, seq in enumerate(channel_sequences[0]):
-            _adjust_wfs_for_tabor(seq, [0], ro_index, 1, j, sample)
-            if show_progress_bar:
-                p.iterate()
+            _submit_to_tabor(scheduler, seq, [0], ro_index, 1, j, sample, delta, sequencers)
 
     elif number_of_channels == 2:
         if complex_channel[0]:
             for j, seq in enumerate(channel_sequences[0]):
-                _adjust_wfs_for_tabor(seq.real, seq.imag, ro_index, 1, j, sample)
-                if show_progress_bar:
-                    p.iterate()
+                _submit_to_tabor(scheduler, seq.real, seq.imag, ro_index, 1, j, sample, delta, sequencers)
         else:
             for j, seq in enumerate(zip(channel_sequences[0], channel_sequences[1])):
-                _adjust_wfs_for_tabor(seq[0], seq[1], ro_index, 1, j, sample)
-                if show_progress_bar:
-                    p.iterate()
+                _submit_to_tabor(scheduler, seq[0], seq[1], ro_index, 1, j, sample, delta, sequencers)
 
     elif number_of_channels == 3:
         if complex_channel[0]:
             for j, seq in enumerate(zip(channel_sequences[0], channel_sequences[1])):
-                _adjust_wfs_for_tabor(seq[0].real, seq[0].imag, ro_index, 1, j, sample)
-                _adjust_wfs_for_tabor(seq[1], [0], ro_index, 2, j, sample)
-                if show_progress_bar:
-                    p.iterate()
+                _submit_to_tabor(scheduler, seq[0].real, seq[0].imag, ro_index, 1, j, sample, delta, sequencers)
+                _submit_to_tabor(scheduler, seq[1], [0], ro_index, 2, j, sample, delta, sequencers)
         else:
             for j, seq in enumerate(zip(channel_sequences[0], channel_sequences[1], channel_sequences[2])):
-                _adjust_wfs_for_tabor(seq[0], seq[1], ro_index, 1, j, sample)
-                _adjust_wfs_for_tabor(seq[2], [0], ro_index, 2, j, sample)
-                if show_progress_bar:
-                    p.iterate()
+                _submit_to_tabor(scheduler, seq[0], seq[1], ro_index, 1, j, sample, delta, sequencers)
+                _submit_to_tabor(scheduler, seq[2], [0], ro_index, 2, j, sample, delta, sequencers)
 
     else:  # 4 channels
         if complex_channel == [True, True]:
             for j, seq in enumerate(zip(channel_sequences[0], channel_sequences[1])):
-                _adjust_wfs_for_tabor(seq[0].real, seq[0].imag, ro_index, 1, j, sample)
-                _adjust_wfs_for_tabor(seq[1].real, seq[1].imag, ro_index, 2, j, sample)
-                if show_progress_bar:
-                    p.iterate()
+                _submit_to_tabor(scheduler, seq[0].real, seq[0].imag, ro_index, 1, j, sample, delta, sequencers)
+                _submit_to_tabor(scheduler, seq[1].real, seq[1].imag, ro_index, 2, j, sample, delta, sequencers)
         elif complex_channel == [True, False, False]:
             for j, seq in enumerate(zip(channel_sequences[0], channel_sequences[1], channel_sequences[2])):
-                _adjust_wfs_for_tabor(seq[0].real, seq[0].imag, ro_index, 1, j, sample)
-                _adjust_wfs_for_tabor(seq[1], seq[2], ro_index, 2, j, sample)
-                if show_progress_bar:
-                    p.iterate()
+                _submit_to_tabor(scheduler, seq[0].real, seq[0].imag, ro_index, 1, j, sample, delta, sequencers)
+                _submit_to_tabor(scheduler, seq[1], seq[2], ro_index, 2, j, sample, delta, sequencers)
         elif complex_channel == [False, False, True]:
             for j, seq in enumerate(zip(channel_sequences[0], channel_sequences[1], channel_sequences[2])):
-                _adjust_wfs_for_tabor(seq[0], seq[1], ro_index, 1, j, sample)
-                _adjust_wfs_for_tabor(seq[2].real, seq[2].imag, ro_index, 2, j, sample)
-                if show_progress_bar:
-                    p.iterate()
+                _submit_to_tabor(scheduler, seq[0], seq[1], ro_index, 1, j, sample, delta, sequencers)
+                _submit_to_tabor(scheduler, seq[2].real, seq[2].imag, ro_index, 2, j, sample, delta, sequencers)
         else:
             for j, seq in enumerate(zip(channel_sequences[0], channel_sequences[1],
                                         channel_sequences[2], channel_sequences[3])):
-                _adjust_wfs_for_tabor(seq[0], seq[1], ro_index, 1, j, sample)
-                _adjust_wfs_for_tabor(seq[2], seq[3], ro_index, 2, j, sample)
-                if show_progress_bar:
-                    p.iterate()
+                _submit_to_tabor(scheduler, seq[0], seq[1], ro_index, 1, j, sample, delta, sequencers)
+                _submit_to_tabor(scheduler, seq[2], seq[3], ro_index, 2, j, sample, delta, sequencers)
 
+    if compress:
+        for chpair in sorted(sequencers):
+            scheduler.submit(awg, sequencers[chpair].load, description='sequence table of channel pair %i' % chpair)
+    if not run_scheduler:
+        return None
+    scheduler.run()
     gc.collect()
 
     if number_of_channels <= 2:
@@ -0,0 +1,178 @@
+# upload_scheduler.py
+# concurrent upload of waveforms to several AWGs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Scheduler to upload waveforms to several devices at the same time.
+
+Uploads are submitted as jobs for a device (usually an AWG instrument). Every device gets a worker thread which
+executes its jobs one after another in the order they were submitted, so the communication with one instrument
+is never interleaved. Different devices are served concurrently, the total upload time is set by the slowest device.
+The preparation of a job (e.g. calculating and encoding a waveform) can run on a shared thread pool ahead of the
+upload, so it overlaps with the transfer of the previous jobs.
+
+use:
+    scheduler = UploadScheduler('Load AWG')
+    scheduler.submit(awg1, lambda wfm: awg1.wfm_send2(*wfm), prepare=lambda: make_wfm(1))
+    scheduler.submit(awg2, awg2.set_ch1_status, True)
+    scheduler.run()   # raises UploadError after all devices finished, if any job failed
+"""
+
+import logging
+import threading
+from multiprocessing.pool import ThreadPool
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from qkit.gui.notebook.Progress_Bar import Progress_Bar
+
+
+class UploadError(RuntimeError):
+    """
+    Raised by UploadScheduler.run if uploads failed.
+    errors is a list of (device name, job description, exception), one entry for each failed device.
+    """
+    def __init__(self, errors):
+        self.errors = errors
+        RuntimeError.__init__(self, "Upload failed on %i device(s):\n" % len(errors) +
+                              "\n".join("%s (%s): %r" % error for error in errors))
+
+
+class UploadScheduler(object):
+    """
+    Collects upload jobs for several devices and executes them with one worker thread per device.
+    """
+
+    def __init__(self, name='Load AWG', show_progress_bar=True, prepare_threads=2, lookahead=2):
+        """
+        Inits the scheduler:
+            name:              name of the progress bar
+            show_progress_bar: show the progress of all jobs in a Progress_Bar
+            prepare_threads:   number of threads running the preparation of jobs (0 to prepare in the device thread)
+            lookahead:         number of jobs per device that are prepared ahead of the current upload
+        """
+        self.name = name
+        self.show_progress_bar = show_progress_bar
+        self.prepare_threads = prepare_threads
+        self.lookahead = lookahead
+        self._jobs = []  # list of (device, list of jobs), in order of the first submission to a device
+
+    def _device_jobs(self, device):
+        for dev, jobs in self._jobs:
+            if dev is device:
+                return jobs
+        jobs = []
+        self._jobs.append((device, jobs))
+        return jobs
+
+    def submit(self, device, func, *args, **kwargs):
+        """
+        Adds the job func(*args, **kwargs) for device.
+        Jobs of the same device are executed in the order of submission.
+
+        Args:
+            device:      instrument the job communicates with (jobs are serialized per device object)
+            func:        function executing the upload
+            prepare:     (keyword only) function without arguments which is evaluated on the thread pool ahead of time.
+                         Its return value is passed to func as first argument.
+            description: (keyword only) text identifying the job in error messages
+        """
+        prepare = kwargs.pop('prepare', None)
+        description = kwargs.pop('description', None)
+        if description is None:
+            description = getattr(func, '__name__', repr(func))
+        self._device_jobs(device).append((func, args, kwargs, prepare, description))
+
+    def __len__(self):
+        return sum(len(jobs) for device, jobs in self._jobs)
+
+    @staticmethod
+    def _device_name(device):
+        try:
+            return device.get_name()
+        except Exception:
+            return str(device)
+
+    def _worker(self, device, jobs, pool, done):
+        """
+        Executes the jobs of one device in order. After the first error the remaining jobs of the device are skipped.
+        """
+        name = self._device_name(device)
+        prepared = []  # AsyncResults of the prepared jobs, released after their upload
+        failed = False
+        for i, (func, args, kwargs, prepare, description) in enumerate(jobs):
+            if failed:
+                done.put((name, description, None, False))
+                continue
+            try:
+                # keep the preparation of the next jobs running while this one is uploaded
+                while pool is not None and len(prepared) < min(len(jobs), i + 1 + self.lookahead):
+                    next_prepare = jobs[len(prepared)][3]
+                    prepared.append(pool.apply_async(next_prepare) if next_prepare is not None else None)
+                if prepare is not None:
+                    if pool is not None:
+                        data, prepared[i] = prepared[i].get(), None
+                    else:
+                        data = prepare()
+                    func(data, *args, **kwargs)
+                    del data
+                else:
+                    func(*args, **kwargs)
+                done.put((name, description, None, True))
+            except Exception as e:
+                failed = True
+                prepared = [None] * len(prepared)
+                logging.error(__name__ + ': upload to %s failed in %s: %r' % (name, description, e))
+                done.put((name, description, e, False))
+
+    def run(self):
+        """
+        Executes all submitted jobs and waits until every device is finished.
+        Raises UploadError if any job failed. The scheduler is empty afterwards.
+        """
+        jobs, self._jobs = self._jobs, []
+        total = sum(len(j) for d, j in jobs)
+        if total == 0:
+            return True
+        if self.show_progress_bar:
+            p = Progress_Bar(total, self.name)
+        pool = ThreadPool(self.prepare_threads) if self.prepare_threads else None
+        done = queue.Queue()
+        threads = [threading.Thread(target=self._worker, args=(device, device_jobs, pool, done))
+                   for device, device_jobs in jobs]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        errors = []
+        try:
+            # progress bar widgets are only updated from the calling thread
+            for i in range(total):
+                name, description, error, success = done.get()
+                if error is not None:
+                    errors.append((name, description, error))
+                if self.show_progress_bar:
+                    p.iterate()
+            for thread in threads:
+                thread.join()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        if errors:
+            raise UploadError(errors)
+        return True
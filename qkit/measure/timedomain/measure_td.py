@@ -4,7 +4,6 @@
 
 import numpy as np
 import logging
-import threading
 
 import qkit
 from qkit.gui.notebook.Progress_Bar import Progress_Bar
@@ -58,6 +57,7 @@ class Measure_td(object):
         
         self.open_qviewkit = True
         self.create_averaged_data = False
+        self._average_iterations = False
         
         self.qviewkit_singleInstance = True
         self._qvk_process = False
@@ -171,22 +171,12 @@ class Measure_td(object):
             self.z_set_obj = lambda z: True
             self.z_unit = ''
             
-            self.measure_3D_AWG()
-            
-            # For 3D measurements with iterations, averages are only created at the end to get a consistent averaging base.
-            hdf_file = hdf.Data(self._hdf.get_filepath())
-            for j in range(self.ndev):
-                amp = np.array(hdf_file["/entry/data0/amplitude_%i" % j])
-                pha = np.array(hdf_file["/entry/data0/phase_%i" % j])
-                amp_avg = sum(amp[i] for i in range(iterations)) / iterations
-                pha_avg = sum(pha[i] for i in range(iterations)) / iterations
-                hdf_amp_avg = hdf_file.add_value_matrix('amplitude_avg_%i' % i, x=self._hdf_y, y=self._hdf_x, unit='a.u.')
-                hdf_pha_avg = hdf_file.add_value_matrix('phase_avg_%i' % i, x=self._hdf_y, y=self._hdf_x, unit='rad')
-                
-                for i in range(len(self.y_vec)):
-                    hdf_amp_avg.append(amp_avg[i])
-                    hdf_pha_avg.append(pha_avg[i])
-            hdf_file.close_file()
+            # the averages over the iterations are updated in the file after every measured trace
+            self._average_iterations = True
+            try:
+                self.measure_3D_AWG()
+            finally:
+                self._average_iterations = False
         
         else:
             self.mode = 3  # 1: 1D, 2: 2D, 3:1D_AWG/2D_AWG, 4:3D_AWG
@@ -220,13 +210,13 @@ class Measure_td(object):
         if self.show_progress_bar: p = Progress_Bar(len(self.y_vec) * len(self.z_vec), name=self.dirname)
         try:
             # measurement loop
-            for z in self.z_vec:
+            for iz, z in enumerate(self.z_vec):
                 self.z_set_obj(z)
-                for y in self.y_vec:
+                for iy, y in enumerate(self.y_vec):
                     qkit.flow.sleep()
                     self.y_set_obj(y)
                     qkit.flow.sleep()
-                    self._append_data()
+                    self._append_data(iteration=iz, y_index=iy)
                     if self.show_progress_bar: p.iterate()
                 for i in range(self.ndev):
                     self._hdf_amp[i].next_matrix()
@@ -240,9 +230,7 @@ class Measure_td(object):
         in your network by performing a digital down conversion
         :return: None
         """
-        time_end = float(self.sample.mspec.get_samples()) / self.sample.mspec.get_samplerate()
-        time_array = np.linspace(0, time_end, self.sample.mspec.get_samples())
-        self.set_x_parameters(time_array, 'time', True, 'sec')
+        self.set_x_parameters(self._ddc_time_array(), 'time', True, 'sec')
         self.mode = 1  # 1: 1D, 2: 2D, 3:1D_AWG/2D_AWG
         self._prepare_measurement_file()
         try:
@@ -259,9 +247,7 @@ class Measure_td(object):
         """
         if self.y_set_obj is None:
             raise ValueError('y-axes parameters not properly set')
-        time_end = float(self.sample.mspec.get_samples()) / self.sample.mspec.get_samplerate()
-        time_array = np.linspace(0, time_end, self.sample.mspec.get_samples())
-        self.set_x_parameters(time_array, 'time', True, 'sec')
+        self.set_x_parameters(self._ddc_time_array(), 'time', True, 'sec')
         
         self.mode = 2  # 1: 1D, 2: 2D, 3:1D_AWG/2D_AWG
         self._prepare_measurement_file()
@@ -288,9 +274,7 @@ class Measure_td(object):
         """
         if self.y_vec is None:
             raise ValueError('y-axes parameters not properly set')
-        time_end = float(self.sample.mspec.get_samples()) / self.sample.mspec.get_samplerate()
-        time_array = np.linspace(0, time_end, self.sample.mspec.get_samples())
-        self.set_x_parameters(time_array, 'time', True, 'sec')
+        self.set_x_parameters(self._ddc_time_array(), 'time', True, 'sec')
         
         self.mode = 2  # 1: 1D, 2: 2D, 3:1D_AWG/2D_AWG
         self._prepare_measurement_file()
@@ -310,9 +294,7 @@ class Measure_td(object):
         """
         if (self.y_vec is None) or (self.z_set_obj is None):
             raise ValueError('Axes parameters not properly set')
-        time_end = float(self.sample.mspec.get_samples()) / self.sample.mspec.get_samplerate()
-        time_array = np.linspace(0, time_end, self.sample.mspec.get_samples())
-        self.set_x_parameters(time_array, 'time', True, 'sec')
+        self.set_x_parameters(self._ddc_time_array(), 'time', True, 'sec')
         self.mode = 4
         self._prepare_measurement_file()
         try:
@@ -329,6 +311,14 @@ class Measure_td(object):
         finally:
             self._end_measurement()
     
+    def _ddc_time_array(self):
+        """
+        time axis of the down converted traces, taking the decimation of the readout into account
+        """
+        time_end = float(self.sample.mspec.get_samples()) / self.sample.mspec.get_samplerate()
+        time_array = np.linspace(0, time_end, self.sample.mspec.get_samples())
+        return time_array[::getattr(self.readout, 'ddc_decimation', 1)]
+    
     def _prepare_measurement_file(self):
         qkit.flow.start()
         if self.dirname is None:
@@ -421,6 +411,16 @@ class Measure_td(object):
                 self._hdf_amp_avg.append(self._hdf.add_value_vector('amplitude_avg_%i' % i, x=self._hdf_x, unit='a.u.'))
                 self._hdf_pha_avg.append(self._hdf.add_value_vector('phase_avg_%i' % i, x=self._hdf_x, unit='rad'))
         
+        if self._average_iterations:  # 2D_AWG with iterations, averaged over z
+            self._hdf_amp_avg = []
+            self._hdf_pha_avg = []
+            for i in range(self.ndev):
+                self._hdf_amp_avg.append(self._hdf.add_value_matrix('amplitude_avg_%i' % i,
+                                                                    x=self._hdf_y, y=self._hdf_x, unit='a.u.'))
+                self._hdf_pha_avg.append(self._hdf.add_value_matrix('phase_avg_%i' % i,
+                                                                    x=self._hdf_y, y=self._hdf_x, unit='rad'))
+            self.avg_complex_sum = None
+        
         if self.comment:
             self._hdf.add_comment(self.comment)
         self._hdf.hf.hf.attrs['default_ds'] = ['data0/amplitude_%i' % i for i in range(min(5,self.ndev))] +\
@@ -437,7 +437,7 @@ class Measure_td(object):
         except AttributeError:
             pass
     
-    def _append_data(self, iteration=0, ddc=None):
+    def _append_data(self, iteration=0, ddc=None, y_index=0):
         if self.ReadoutTrace:
             ampliData, phaseData, Is, Qs = self.readout.readout(timeTrace=True, ddc=ddc)
         else:
@@ -478,20 +478,45 @@ class Measure_td(object):
                 amp_avg = np.abs(self.avg_complex_sum / (iteration + 1))
                 pha_avg = np.angle(self.avg_complex_sum / (iteration + 1))
                 for i in range(self.ndev):
-                    self._hdf_amp_avg[i].ds.write_direct(np.ascontiguousarray(np.atleast_1d(amp_avg.T[i])))
-                    self._hdf_pha_avg[i].ds.write_direct(np.ascontiguousarray(np.atleast_1d(pha_avg.T[i])))
                     self._hdf_pha_avg[i].ds.attrs['iteration'] = iteration + 1
                     self._hdf_amp_avg[i].ds.attrs['iteration'] = iteration + 1
+                    # write_at marks the change, it is published with the flush below and qviewkit refreshes the averaged plots
+                    self._hdf_amp_avg[i].write_at(Ellipsis, np.atleast_1d(amp_avg.T[i]), flush=False)
+                    self._hdf_pha_avg[i].write_at(Ellipsis, np.atleast_1d(pha_avg.T[i]), flush=False)
                 self._hdf.flush()
+        
+        if self._average_iterations:
+            self._append_iteration_average(ampliData * np.exp(1j * phaseData), iteration, y_index)
+    
+    def _append_iteration_average(self, complex_data, iteration, y_index):
+        '''
+        Updates line y_index of the averaged datasets with the complex mean over all iterations measured so far.
+        Only the running sum of the current iterations is kept in memory.
+        '''
+        if self.avg_complex_sum is None:
+            self.avg_complex_sum = np.zeros((len(self.y_vec),) + complex_data.shape, dtype=complex)
+        self.avg_complex_sum[y_index] += complex_data
+        avg = self.avg_complex_sum[y_index] / (iteration + 1)
+        for i in range(self.ndev):
+            amp_avg = np.atleast_1d(np.abs(avg).T[i])
+            pha_avg = np.atleast_1d(np.angle(avg).T[i])
+            if iteration == 0:
+                self._hdf_amp_avg[i].append(amp_avg, flush=False)
+                self._hdf_pha_avg[i].append(pha_avg, flush=False)
+            self._hdf_amp_avg[i].ds.attrs['iteration'] = iteration + 1
+            self._hdf_pha_avg[i].ds.attrs['iteration'] = iteration + 1
+            if iteration > 0:
+                self._hdf_amp_avg[i].write_at(y_index, amp_avg, flush=False)
+                self._hdf_pha_avg[i].write_at(y_index, pha_avg, flush=False)
+        self._hdf.flush()
     
     def _end_measurement(self):
         try:
             self.readout.cleanup()
         except AttributeError:
             pass
-        t = threading.Thread(target=qviewkit.save_plots, args=[self._hdf.get_filepath(), self._plot_comment])
-        t.start()
         self._hdf.close_file()
+        qviewkit.save_plots_async(self._hdf.get_filepath(), comment=self._plot_comment)
         waf.close_log_file(self._log)
         qkit.flow.end()
     
@@ -17,17 +17,47 @@ from inspect import getargspec as getargspec
 from inspect import getsourcelines as getsourcelines
 import logging
 
-class Shape(np.vectorize):
+class Shape(object):
     """
-    A vectorized function describing a possible shape
+    A function describing a possible shape
     defined on the standardized interval [0,1).
+
+    The function is called with the whole array of time fractions and should
+    return an array of the same shape, i.e. be written with numpy operations.
+    Functions that only work on scalars (e.g. using 'and' or 'if') are detected
+    on the first call with more than one sample and evaluated element-wise via
+    np.vectorize instead. Set vectorize = True to skip the detection for such
+    functions, vectorize = False to always pass the whole array.
     """
-    def __init__(self, name, func, *args, **kwargs):
+    def __init__(self, name, func, vectorize = None):
         self.name = name
-        super(Shape, self).__init__(func, *args, **kwargs)
+        self.pyfunc = func
+        self._vectorize = vectorize
+        self._vfunc = None
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype = float)
+        if not self._vectorize:
+            try:
+                y = np.asarray(self.pyfunc(x))
+            except (ValueError, TypeError):
+                if self._vectorize is False:
+                    raise
+                logging.info("Shape {:} does not accept arrays, falling back to element-wise evaluation.".format(self.name))
+                self._vectorize = True
+            else:
+                # a single sample does not tell whether pyfunc handles arrays
+                if self._vectorize is None and x.size > 1:
+                    self._vectorize = False
+                return np.broadcast_to(y, x.shape) if y.shape != x.shape else y
+        if self._vfunc is None:
+            self._vfunc = np.vectorize(self.pyfunc, otypes = [float])
+        return self._vfunc(x)
 
     def __mul__(self, other):
-        return Shape(self.name, lambda x: self.pyfunc(x) * other.pyfunc(x))
+        if isinstance(other, Shape):
+            return Shape(self.name, lambda x: self(x) * other(x), vectorize = False)
+        return Shape(self.name, lambda x: self(x) * other, vectorize = False)
 
 
 class ShapeLib(object):
@@ -37,7 +67,7 @@ class ShapeLib(object):
     """
 
     def __init__(self):
-        self.rect = Shape("rect", lambda x: np.where(x >= 0 and x < 1, 1, 0))
+        self.rect = Shape("rect", lambda x: np.where((x >= 0) & (x < 1), 1., 0.))
         self.gauss = Shape("gauss", lambda x: np.exp(-0.5 * np.power((x - 0.5) / 0.166, 2.0))) * self.rect
         self.ramp = Shape("ramp", lambda x: x) * self.rect
         self.sqrfct = Shape("sqrfct", lambda x: x**2) * self.rect
@@ -177,6 +207,7 @@ class PulseSequence(object):
             *args:    function arguments for time dependent pulse lengths/wait times
             **kwargs:
                 IQ_mixing - returns complex valued sequence if IQ_mixing is True (real part encodes I, imaginary part encodes Q)
+                envelope_cache - dictionary in which pulse envelopes are memoized between calls (see render)
 
         Returns:
             waveform:      numpy array of the squence envelope, if IQ_mixing is True real part is I, imaginary part is Q
@@ -199,6 +230,7 @@ class PulseSequence(object):
             IQ_mixing = kwargs["IQ_mixing"]
         else:
             IQ_mixing = False
+        cache = kwargs.get("envelope_cache", None)
 
         # find readout
         pulse_names = [p["name"] for p in self._pulses]
@@ -210,12 +242,13 @@ class PulseSequence(object):
             logging.warning("No readout in sequence! Adding readout at the end of the sequence.")
             self.add_readout()
         
-        # build waveforms for each pulse
-        # if iq-mixing is enabled 
-        wfms = [np.zeros(0)] * num_pulses # list of waveforms for each pulse
+        # determine sample length and start index of each pulse
+        # (pulses are placed after all previous pulses which are not skipped)
         timestep = 1.0 / self.samplerate # minimum time step
         length = 0 #length of current pulse
         readout_index = -1 # index of the readout in the waveform of the whole sequence
+        offset = 0 # start index of the current pulse
+        layout = [] # (start index, number of samples, length) of each pulse
         for i in range(num_pulses):
             pulse_dict = self._pulses[i]
 
@@ -227,62 +260,108 @@ class PulseSequence(object):
             elif pulse_dict["length"] is None:
                 length = 0
                 logging.warning("Pulse number {:d} (name = {:}) has no length! Setting length to 0.".format(i, pulse_dict["name"]))
-            if (pulse_dict["name"] is "readout") and (i is num_pulses - 1):
+            if (pulse_dict["name"] == "readout") and (i == num_pulses - 1):
                 length = timestep # if readout is last, omit the wfm (apart from a single digit)
             # Warning if pulse is shorter than smallest possible step
             if (length < 0.5*timestep) and (length != 0):
                 logging.warning("{:}-pulse is shorter than {:.2f} nanoseconds and thus is omitted.".format(pulse_dict["name"], 0.5*timestep*1e9))
-            
-            # create waveform array of the current pulse
-            if pulse_dict["name"] is "wait":
-                wfm = np.zeros(int(round(length * self.samplerate)))
-            elif pulse_dict["name"] is "readout":
-                wfm = np.zeros(int(round(length * self.samplerate)))
+
+            # number of samples of the current pulse
+            if pulse_dict["name"] in ["wait", "readout"]:
+                samples = int(round(length * self.samplerate))
+            elif length > 0.5*timestep:
+                samples = int(np.ceil(length / timestep)) # = len(np.arange(0, length, timestep))
             else:
-                if length > 0.5*timestep:
-                    wfm = pulse_dict["pulse"](np.arange(0, length, timestep) / length)
-                else:
-                    wfm = np.zeros(0)
+                samples = 0
             # if current pulse is readout set readout_index
-            if (pulse_dict["name"] is "readout") and (readout_index == -1):
-                readout_index = len(wfms[i])
-            #append in current wfm
-            wfms[i] = np.append(wfms[i], wfm)
-            # append zeros in wfms if skip is False
+            if (pulse_dict["name"] == "readout") and (readout_index == -1):
+                readout_index = offset
+            layout.append((offset, samples, length))
+            # the next pulse starts after the current one if skip is False
             if not pulse_dict["skip"]:
-                for j in range(i + 1, num_pulses): # only necessary for pulses after the current pulse
-                    wfms[j] = np.append(wfms[j], np.zeros_like(wfm))
-        
+                offset += samples
+
         # Create waveform of the sequence
-        max_len = max([len(w) for w in wfms]) # length of the longest waveform
+        # one leading and one trailing 0 make sure first and last point of the waveform go to 0
+        max_len = max([0] + [start + samples for start, samples, length in layout]) # length of the sequence
+        waveform = np.zeros(max_len + 2)
         for i in range(num_pulses):
-            wfms[i] = np.append(wfms[i], np.zeros(max_len - len(wfms[i])))
-            if not any(wfms[i]):
+            pulse_dict = self._pulses[i]
+            start, samples, length = layout[i]
+            if pulse_dict["name"] in ["wait", "readout"] or samples == 0:
                 continue
-            # Encode I and Q in real/imaginary part of the sequence
-            if IQ_mixing:
-                pulse = self._pulses[i]["pulse"]
-                iq_freq = pulse.iq_frequency
-                if iq_freq == 0: # homodyne pulses are not mixed
-                    continue
-                # calculate I and Q
-                time = np.arange(0, max_len, 1) * timestep - readout_index * timestep # adjust global phase relative to the readout
-                iq_phase = np.exp(1.j *(2 * np.pi * iq_freq * time - np.pi/180 * pulse.phase))
-                wfms[i] = wfms[i] * iq_phase
-                # account for mixer calibration i.e. dc offset and phase != 90deg between I and Q
-                if pulse.iq_angle != 90 or pulse.q_rel != 1.:
-                    I = np.real(wfms[i])
-                    Q = np.imag(wfms[i] * np.exp(1.j * np.pi /180 * (90 - pulse.iq_angle)))
-                    wfms[i] = I + 1.j * pulse.q_rel * Q
-                wfms[i][wfms[i] != 0] += pulse.iq_dc_offset
-            
-        # generate full waveform from wfms
-        waveform = np.sum(np.array(wfms), axis = 0) + self.dc_corr
-        # make sure first and last point of the waveform go to 0
-        waveform = np.append(0, waveform)
-        waveform = np.append(waveform, 0)
+            pulse = pulse_dict["pulse"]
+            mixed = IQ_mixing and pulse.iq_frequency != 0 # homodyne pulses are not mixed
+            # the waveform of a pulse only depends on its parameters and, if mixed, on its distance to the readout
+            key = (pulse.shape, pulse.amplitude, float(length), samples, timestep)
+            if mixed:
+                key += (pulse.iq_frequency, pulse.phase, pulse.iq_angle, pulse.q_rel, pulse.iq_dc_offset, start - readout_index)
+            if cache is not None and key in cache:
+                wfm = cache[key]
+            else:
+                wfm = self._pulse_waveform(pulse, samples, length, start - readout_index, mixed)
+                if cache is not None:
+                    cache[key] = wfm
+            if wfm is None:
+                continue
+            if np.iscomplexobj(wfm) and not np.iscomplexobj(waveform):
+                waveform = waveform.astype(complex)
+            waveform[start + 1 : start + 1 + samples] += wfm # +1 due to leading 0
+        if np.iscomplexobj(self.dc_corr) and not np.iscomplexobj(waveform):
+            waveform = waveform.astype(complex)
+        waveform[1:-1] += self.dc_corr
         return waveform, readout_index + 1 # +1 due to leading 0
 
+    def _pulse_waveform(self, pulse, samples, length, readout_distance, mixed):
+        """
+        Returns the waveform of a single pulse or None if it vanishes.
+
+        Args:
+            pulse:            pulse object
+            samples:          number of samples of the pulse
+            length:           length of the pulse
+            readout_distance: start index of the pulse relative to the readout (sets the global phase of the IQ mixing)
+            mixed:            if True the pulse is mixed with its IQ frequency (complex waveform)
+        """
+        timestep = 1.0 / self.samplerate
+        wfm = pulse(np.arange(samples) * timestep / length)
+        if not np.any(wfm):
+            return None
+        # Encode I and Q in real/imaginary part of the sequence
+        if mixed:
+            # calculate I and Q
+            time = (np.arange(samples) + readout_distance) * timestep # adjust global phase relative to the readout
+            wfm = wfm * np.exp(1.j *(2 * np.pi * pulse.iq_frequency * time - np.pi/180 * pulse.phase))
+            # account for mixer calibration i.e. dc offset and phase != 90deg between I and Q
+            if pulse.iq_angle != 90 or pulse.q_rel != 1.:
+                I = np.real(wfm)
+                Q = np.imag(wfm * np.exp(1.j * np.pi /180 * (90 - pulse.iq_angle)))
+                wfm = I + 1.j * pulse.q_rel * Q
+            wfm[wfm != 0] += pulse.iq_dc_offset
+        return wfm
+
+    def render(self, times, IQ_mixing = False):
+        """
+        Returns the envelopes of the pulse sequence for a whole sweep of input times.
+        Pulses which are identical in several sequences (e.g. a pi-pulse of fixed length) are only calculated once.
+
+        Args:
+            times:     iterable of function arguments, the sequence is called once for each element
+            IQ_mixing: returns complex valued sequences if IQ_mixing is True (real part encodes I, imaginary part encodes Q)
+
+        Returns:
+            waveforms:       list of numpy arrays of the sequence envelopes
+            readout_indices: list of the indices of the readout tone
+        """
+        envelope_cache = {}
+        waveforms = []
+        readout_indices = []
+        for time in times:
+            waveform, readout_index = self(time, IQ_mixing = IQ_mixing, envelope_cache = envelope_cache)
+            waveforms.append(waveform)
+            readout_indices.append(readout_index)
+        return waveforms, readout_indices
+
     def add(self, pulse, skip = False):
         """
         Append a pulse to the sequence.
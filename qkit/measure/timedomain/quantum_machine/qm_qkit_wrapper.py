@@ -3,9 +3,12 @@
 
 
 import inspect
+import logging
 import time
 import threading
 
+import numpy as np
+
 import qkit
 from qkit.storage import store as hdf
 from qkit.measure.measurement_class import Measurement
@@ -31,6 +34,29 @@ class QmQkitWrapper:
         self.coords = {}
         self.values = {}
 
+        # streaming
+        self._stream = False  # set by the measure decorator (stream=True), experiments check it
+        self._stream_ds = None  # datasets of the open stream
+
+
+    def _file_name_from_exp_name(self):
+        if self.dirname:
+            file_name = 'QM_experiment_' + self.exp_name + '_' + self.dirname
+        else:
+            file_name = 'QM_experiment_' + self.exp_name
+        return file_name.replace(' ', '').replace(',', '_')
+
+    def _source_string(self, func, args, kwargs):
+        astring = ""
+        for value in args:
+            astring += "{}, ".format(value)
+
+        kstring = ""
+        for key, value in kwargs.items():
+            kstring += "{} = {}, ".format(key, value)
+
+        return astring + kstring + "\n\n\n" + inspect.getsource(func)
+
 
     # Decorator to start qkit
     def measure(func):
@@ -40,29 +66,38 @@ class QmQkitWrapper:
             if 'save' in kwargs:
                 save = kwargs['save']
                 kwargs.pop('save', None)
+            # stream=True: experiments supporting it write their data to the file while they run (see start_stream)
+            stream = kwargs.pop('stream', False)
+            save = save or stream
 
             if save:
                 qkit.flow.start()
 
-            output = func(self, *args, **kwargs)
+            self._stream = stream
+            completed = False
+            try:
+                output = func(self, *args, **kwargs)
+                completed = True
+            finally:
+                self._stream = False
+                if self._stream_ds is not None:
+                    # also reached on errors, the data streamed so far stays in the file
+                    self._stream_ds = None
+                    self.sourcecode = self._source_string(func, args, kwargs)
+                    self._store_metadata()
+                    qkit.flow.end()
+                    self.close_files()
+                    if completed:
+                        print('Measurement complete: {:s}'.format(self._data_file.get_filepath()))
+                    else:
+                        logging.warning('Measurement aborted, partial data in {:s}'.format(self._data_file.get_filepath()))
+                    save = None  # already saved
 
             if save:
-                if self.dirname:
-                    self._file_name = 'QM_experiment_' + self.exp_name + '_' + self.dirname
-                else:
-                    self._file_name = 'QM_experiment_' + self.exp_name
-                self._file_name = self._file_name.replace(' ', '').replace(',', '_')
+                self._file_name = self._file_name_from_exp_name()
 
                 # Save function arguments and qm program
-                astring = ""
-                for value in args:
-                    astring += "{}, ".format(value)
-
-                kstring = ""
-                for key, value in kwargs.items():
-                    kstring += "{} = {}, ".format(key, value)
-
-                self.sourcecode = astring + kstring + "\n\n\n" + inspect.getsource(func)
+                self.sourcecode = self._source_string(func, args, kwargs)
 
                 self._prepare_measurement_file()
                 self.store_data()
@@ -73,7 +108,7 @@ class QmQkitWrapper:
 
                 print('Measurement complete: {:s}'.format(self._data_file.get_filepath()))
 
-            else:
+            elif save is not None:
                 print('Measurement complete')
 
             return output
@@ -131,6 +166,8 @@ class QmQkitWrapper:
             coords_file.add(coord_vec)
             coord_dic[key] = coords_file
 
+        self._store_metadata()
+
         for key in self.values:
             values = self.values[key][0]
             coord_key_list = self.values[key][1]
@@ -152,8 +189,9 @@ class QmQkitWrapper:
                 value_file.append(values[0, 0, :])
 
             value_file.ds.resize(values.shape)
-            value_file.ds[:] = values
+            value_file.write_at(Ellipsis, values)
 
+    def _store_metadata(self):
         # source code
         sourcecode_file = self._data_file.add_textlist('sourcecode')
         sourcecode_file.append(self.sourcecode)
@@ -162,5 +200,100 @@ class QmQkitWrapper:
         if self.comment:
             self._data_file.add_comment(self.comment)
 
+    def start_stream(self, coords, values):
+        """
+        Creates the file and the datasets of an experiment before it runs (streaming mode, measure(..., stream=True)).
+        Data is then added in chunks with stream_append, so the experiment does not have to keep it in memory
+        and the data measured so far is kept if the run is interrupted.
+        self.exp_name must be set before.
+
+        Args:
+            coords: {name: [vector, unit]} like self.coords. Use None as vector for coordinates which are streamed
+                    as well (e.g. timestamps).
+            values: {name: [list of coordinate names, unit]} like self.values, without the data.
+        """
+        self._file_name = self._file_name_from_exp_name()
+        self._prepare_measurement_file()
+
+        coord_dic = {}
+        for key in coords:
+            coord_vec, unit = coords[key]
+            coord_dic[key] = self._data_file.add_coordinate(key, unit=unit)
+            if coord_vec is not None:
+                coord_dic[key].add(coord_vec)
+
+        self._stream_ds = {}
+        for key in coords:
+            if coords[key][0] is None:
+                self._stream_ds[key] = coord_dic[key]
+        for key in values:
+            coord_key_list, unit = values[key]
+            if len(coord_key_list) == 1:
+                value_file = self._data_file.add_value_vector(key, x=coord_dic[coord_key_list[0]], unit=unit)
+            elif len(coord_key_list) == 2:
+                value_file = self._data_file.add_value_matrix(key, x=coord_dic[coord_key_list[0]],
+                                                              y=coord_dic[coord_key_list[1]], unit=unit)
+            else:
+                value_file = self._data_file.add_value_box(key, x=coord_dic[coord_key_list[0]],
+                                                           y=coord_dic[coord_key_list[1]],
+                                                           z=coord_dic[coord_key_list[2]], unit=unit)
+            self._stream_ds[key] = value_file
+        self._data_file.flush()
+
+    def stream_append(self, chunks):
+        """
+        Appends chunks of data along the first axis of streamed datasets (n new points of a vector, n lines of a
+        matrix or n matrices of a box) and flushes the file once.
+
+        Args:
+            chunks: {name: chunk} with the new data of the datasets which grow together.
+        """
+        for key, chunk in chunks.items():
+            value_file = self._stream_ds[key]
+            chunk = np.asarray(chunk)
+            if len(chunk) == 0:
+                continue
+            if chunk.ndim == 1:
+                value_file.append(chunk, flush=False)
+            elif chunk.ndim == 2:
+                for line in chunk:
+                    value_file.append(line, flush=False)
+            else:
+                for matrix in chunk:
+                    for line in matrix:
+                        value_file.append(line, flush=False)
+                    value_file.next_matrix()
+        self._data_file.flush()
+
+    def stream_add_coordinate(self, key, coord_vec, unit):
+        """
+        Adds a coordinate which is only known at the end of a streamed experiment (e.g. histogram bins).
+        """
+        coords_file = self._data_file.add_coordinate(key, unit=unit)
+        coords_file.add(coord_vec)
+
+    def fetch_job_chunks(self, job, names, poll_interval=1.0):
+        """
+        Generator fetching the saved results of a running QM job in chunks.
+        Yields {name: structured array with fields 'value' and 'timestamp'} with the new entries of every name.
+        All names are fetched up to the same count, so datasets filled from them grow together.
+
+        Args:
+            job:           running QM job
+            names:         names of the saved QUA variables
+            poll_interval: time in s between two fetches
+        """
+        handles = job.result_handles
+        fetched = 0
+        while True:
+            processing = handles.is_processing()
+            count = min(handles.get(name).count_so_far() for name in names)
+            if count > fetched:
+                yield dict((name, handles.get(name).fetch(slice(fetched, count))) for name in names)
+                fetched = count
+            if not processing:
+                return
+            qkit.flow.sleep(poll_interval)
+
 
 
@@ -412,29 +412,56 @@ class QuantumJumpMonitoring(QmQkitWrapper):
 
         self.program = quantumJumps
         job = self.qm_config.qm.execute(self.program, duration_limit=0, data_limit=0)
-        job.wait_for_all_results()
-        res = job.get_results()
+        self.exp_name = "quantum_jump_hist_{}us".format(4 * t_wait / 1000).replace('.', 'p')
 
-        self.I = res.variable_results.I.values
-        self.Q = res.variable_results.Q.values
-        self.state = res.variable_results.state.values
-        self.t = res.variable_results.state.ts_nsec
-        hist_up = res.variable_results.hist_up.values
-        hist_down = res.variable_results.hist_down.values
+        if self._stream:
+            # write the time traces to the file while the job runs, only the last chunk is kept for the plot
+            self.start_stream(coords={"t": [None, "us"]},
+                              values={"state": [["t"], "state"], "I": [["t"], "V"], "Q": [["t"], "V"]})
+            t_rep = None
+            t_last = np.zeros(0)  # last timestamp of the previous chunk, chunks may hold a single sample
+            for chunk in self.fetch_job_chunks(job, ["I", "Q", "state"]):
+                self.I = chunk["I"]["value"]
+                self.Q = chunk["Q"]["value"]
+                self.state = chunk["state"]["value"]
+                self.t = chunk["state"]["timestamp"]
+                if t_rep is None:
+                    ts = np.concatenate((t_last, self.t))
+                    if ts.size > 1:
+                        t_rep = np.median(ts[1:] - ts[:-1]) / 1000
+                    t_last = ts[-1:]
+                self.stream_append({"t": self.t / 1000, "state": self.state, "I": self.I, "Q": self.Q})
+            hist_up = job.result_handles.get("hist_up").fetch_all()["value"]
+            hist_down = job.result_handles.get("hist_down").fetch_all()["value"]
+            if t_rep is None:
+                raise ValueError("Quantum jumps: less than two samples measured, the repetition time is unknown.")
+        else:
+            job.wait_for_all_results()
+            res = job.get_results()
+
+            self.I = res.variable_results.I.values
+            self.Q = res.variable_results.Q.values
+            self.state = res.variable_results.state.values
+            self.t = res.variable_results.state.ts_nsec
+            t_rep = np.median(self.t[1:] - self.t[:-1]) / 1000
+            hist_up = res.variable_results.hist_up.values
+            hist_down = res.variable_results.hist_down.values
 
         hist_up, _ = np.histogram(hist_up[:-1], bins=np.arange(hist_up.max() + 1) + 0.5)
         hist_down, _ = np.histogram(hist_down[:-1], bins=np.arange(hist_down.max() + 1) + 0.5)
 
         # qkit data storage
-        self.exp_name = "quantum_jump_hist_{}us".format(4 * t_wait / 1000).replace('.', 'p')
-        self.coords = {"t": [self.t / 1000, "us"],
-                       "hist_up": [hist_up, "1"],
-                       "hist_down": [hist_down, "1"]}   # "hist_down_range": [np.arange(hist_down.size) + 1, "1"]
-        self.values = {"state": [self.state, ["t"], "state"],
-                       "I": [self.I, ["t"], "V"], "Q": [self.Q, ["t"], "V"]}
+        if self._stream:
+            self.stream_add_coordinate("hist_up", hist_up, "1")
+            self.stream_add_coordinate("hist_down", hist_down, "1")
+        else:
+            self.coords = {"t": [self.t / 1000, "us"],
+                           "hist_up": [hist_up, "1"],
+                           "hist_down": [hist_down, "1"]}   # "hist_down_range": [np.arange(hist_down.size) + 1, "1"]
+            self.values = {"state": [self.state, ["t"], "state"],
+                           "I": [self.I, ["t"], "V"], "Q": [self.Q, ["t"], "V"]}
 
         if plot:
-            t_rep = np.median(self.t[1:] - self.t[:-1]) / 1000
 
             self.fig.clear()
             grid = self.fig.add_gridspec(ncols=1, nrows=3, height_ratios=[2, 1, 1])
@@ -22,7 +22,6 @@ from scipy import signal
 import logging
 import time
 import sys
-import threading
 
 import qkit
 from qkit.storage import store as hdf
@@ -113,6 +112,8 @@ class transport(object):
         self._numder_args = ()  # arguments for derivation function
         self._numder_kwargs = {'window_length': 15, 'polyorder': 3, 'deriv': 1}  # keyword arguments for derivation function
         self._average = None  # trace averaging
+        self._average_std_err = False  # adds standard error of averaged traces as data series
+        self._sweep_program = False  # takes all sweeps as one sweep program of the IVD
         self._view_xy = False
         # x and y data
         self._hdf_x = None
@@ -924,7 +925,7 @@ class transport(object):
         self._comment = None
         return
     
-    def set_average(self, avg):
+    def set_average(self, avg, std_err=False):
         """
         Sets trace average parameter.
         
@@ -932,12 +933,15 @@ class transport(object):
         ----------
         avg: int
             Number of averages of whole traces. Must be None (off) or natural numbers.
+        std_err: bool
+            Adds the standard error of the mean of averaged currents and voltages as data series in the analysis folder. Default is False.
         
         Returns
         -------
         None
         """
         self._average = avg
+        self._average_std_err = std_err
         return
     
     def get_average(self):
@@ -955,6 +959,41 @@ class transport(object):
         """
         return self._average
     
+    def set_sweep_program(self, status):
+        """
+        Sets the usage of sweep programs. If True, all sweeps of the sweep class are uploaded to the IV-device at once and taken as one hardware-timed program with a single data readout, instead of one sweep after another.
+        This needs an IV-device driver providing take_IV_program and is not used for landscape scans. The sleep values of the sweeps are ignored.
+        Whether the IV-device supports the sweeps in its sweep mode is checked when the measurement starts, before the data file is created.
+        
+        Parameters
+        ----------
+        status: bool
+            Status of sweep programs.
+        
+        Returns
+        -------
+        None
+        """
+        if status and not hasattr(self._IVD, 'take_IV_program'):
+            raise AttributeError('{:s}: {!s} does not support sweep programs'.format(__name__, self._IVD))
+        self._sweep_program = status
+        return
+    
+    def get_sweep_program(self):
+        """
+        Gets the usage of sweep programs.
+        
+        Parameters
+        ----------
+        None
+        
+        Returns
+        -------
+        status: bool
+            Status of sweep programs.
+        """
+        return self._sweep_program
+    
     def set_view_xy(self, view):
         """
         Sets views that combine different data series of xy-measurement.
@@ -1129,15 +1168,13 @@ class transport(object):
                         self._pb.iterate()
                     time.sleep(self._x_dt)
             elif self._scan_dim in [1, 2, 3]:  # IV curve
-                _rst_log_hdf_appnd = False  # variable to save points of log-function in 2D-matrix
-                self._rst_fit_hdf_appnd = False
                 for self.ix, (x, x_func) in enumerate([(None, _pass)] if self._scan_dim < 2 else [(x, self._x_set_obj) for x in self._x_vec]):  # loop: x_obj with parameters from x_vec if 2D or 3D else pass(None)
                     x_func(x)
                     time.sleep(self._x_dt)
                     for self.iy, (y, y_func) in enumerate([(None, _pass)] if self._scan_dim < 3 else [(y, self._y_set_obj) for y in self._y_vec]):  # loop: y_obj with parameters from y_vec if 3D else pass(None)
                         y_func(y)
                         time.sleep(self._tdy)
-                        # log function
+                        # log function, the file is flushed with the sweep data
                         if self.log_function != [None]:
                             for j, f in enumerate(self.log_function):
                                 if self._scan_dim == 1:
@@ -1145,24 +1182,22 @@ class transport(object):
                                     self._hdf_log[j].append(self._data_log[j])
                                 elif self._scan_dim == 2:
                                     self._data_log[j][self.ix] = float(f())
-                                    self._hdf_log[j].append(self._data_log[j], reset=True)
+                                    self._hdf_log[j].write_at(self.ix, self._data_log[j][self.ix], shape=self._data_log[j].shape, flush=False)
                                 elif self._scan_dim == 3:
                                     self._data_log[j][self.ix, self.iy] = float(f())
-                                    self._hdf_log[j].append(self._data_log[j][self.ix], reset=_rst_log_hdf_appnd)
-                                    _rst_log_hdf_appnd = not bool(self.iy+1 == len(self._y_vec))
+                                    self._hdf_log[j].write_at((self.ix, self.iy), self._data_log[j][self.ix, self.iy], shape=self._data_log[j].shape, flush=False)
                         # iterate sweeps and take data
                         self._get_sweepdata()
                     # filling of value-box by storing data in the next 2d structure after every y-loop
                     if self._scan_dim is 3:
-                        for lst in [val for k, val in enumerate([self._hdf_I, self._hdf_V, self._hdf_dVdI]) if k < 2+int(self._dVdI)]:
+                        for lst in [val for k, val in enumerate([self._hdf_I, self._hdf_V, self._hdf_dVdI]) if k < 2+int(self._dVdI)]+[lst for lst in [self._hdf_I_err, self._hdf_V_err] if lst]:
                             for val in range(self.sweeps.get_nos()):
                                 lst[val].next_matrix()
         finally:
             ''' end measurement '''
             qkit.flow.end()
-            t = threading.Thread(target=qviewkit.save_plots, args=[self._data_file.get_filepath(), self._plot_comment])
-            t.start()
             self._data_file.close_file()
+            qviewkit.save_plots_async(self._data_file.get_filepath(), comment=self._plot_comment)
             waf.close_log_file(self._log_file)
             self._set_IVD_status(False)
             print('Measurement complete: {:s}'.format(self._data_file.get_filepath()))
@@ -1182,6 +1217,9 @@ class transport(object):
         """
         self._sweep_mode = self._IVD.get_sweep_mode()  # 0 (VV-mode) | 1 (IV-mode) | 2 (VI-mode)
         self._bias = self._IVD.get_sweep_bias()  # 0 (current bias) | 1 (voltage bias)
+        if self._sweep_program and not self._landscape and hasattr(self._IVD, 'check_sweep_program'):
+            # fails here instead of in the middle of the measurement, e.g. for unsupported sweep modes or too many points
+            self._IVD.check_sweep_program(sweeps=self.sweeps.get_sweeps())
         self._IV_modes = {0: 'I', 1: 'V'}
         self._IV_units = {0: 'A', 1: 'V'}
         self._set_IVD_status(True)
@@ -1242,6 +1280,8 @@ class transport(object):
         self._hdf_I = []
         self._hdf_V = []
         self._hdf_dVdI = []
+        self._hdf_I_err = []
+        self._hdf_V_err = []
         self._hdf_fit = []
         self._data_fit = []
         if self._scan_dim == 0:
@@ -1389,11 +1429,44 @@ class transport(object):
             self._add_log_value_vector()
             # add views
             self._add_views()
+        if self._scan_dim in [1, 2, 3] and self._average is not None and self._average_std_err:
+            for i in range(self.sweeps.get_nos()):
+                self._hdf_I_err.append(self._add_std_err_value(self._hdf_I[i], i, 'A'))
+                self._hdf_V_err.append(self._add_std_err_value(self._hdf_V[i], i, 'V'))
         ''' add comment '''
         if self._comment:
             self._data_file.add_comment(self._comment)
         return
 
+    def _add_std_err_value(self, hdf_value, i, unit):
+        """
+        Adds a data series for the standard error of the mean of averaged data <hdf_value> of sweep <i> to the analysis folder.
+        
+        Parameters
+        ----------
+        hdf_value: qkit.storage.hdf_dataset.hdf_dataset
+            Averaged data series.
+        i: int
+            Number of sweep.
+        unit: str
+            Unit of the data series.
+        
+        Returns
+        -------
+        hdf_err: qkit.storage.hdf_dataset.hdf_dataset
+            Data series of the standard error.
+        """
+        kwargs = {'unit': unit,
+                  'save_timestamp': False,
+                  'folder': 'analysis',
+                  'comment': 'standard error of the mean of {:s}'.format(hdf_value.name)}
+        if self._scan_dim == 1:
+            return self._data_file.add_value_vector('{:s}_err'.format(hdf_value.name), x=self._hdf_bias[i], **kwargs)
+        elif self._scan_dim == 2:
+            return self._data_file.add_value_matrix('{:s}_err'.format(hdf_value.name), x=self._hdf_x, y=self._hdf_bias[i], **kwargs)
+        elif self._scan_dim == 3:
+            return self._data_file.add_value_box('{:s}_err'.format(hdf_value.name), x=self._hdf_x, y=self._hdf_y, z=self._hdf_bias[i], **kwargs)
+    
     def _prepare_progress_bar(self):
         """
         Creates a progress bar using ipywidgets to show the measurement progress.
@@ -1560,7 +1633,8 @@ class transport(object):
     def _get_sweepdata(self):
         """
         Iterates sweeps of sweep class and takes data for each sweep.
-        If average is set, traces are taken <average>-fold to average and saved after each iteration
+        If average is set, traces are taken <average>-fold to average and saved after each iteration.
+        The average is updated by a running mean and variance (Welford's algorithm), so that time and memory do not grow with previous iterations.
         
         Parameters
         ----------
@@ -1571,10 +1645,7 @@ class transport(object):
         None
         """
         if self._average is None:
-            self.sweeps.create_iterator()
-            for j in range(self.sweeps.get_nos()):
-                # take data
-                I_values, V_values = self.take_IV(sweep=self.sweeps.get_sweep())
+            for j, (I_values, V_values) in enumerate(self._take_sweeps()):
                 data = {self._hdf_I[j]:(I_values,),
                         self._hdf_V[j]:(V_values,)} # tuple in oder to use *args later
                 if self._dVdI:
@@ -1595,15 +1666,14 @@ class transport(object):
                                                                           data[self._hdf_V[j]][0],
                                                                           data[self._hdf_dVdI[j]][0],
                                                                           **self._fit_kwargs))
-                        data[self._hdf_fit[j]] = (self._data_fit[j], True)
+                        self._hdf_fit[j].write_at(self.ix, self._data_fit[j][self.ix], shape=self._data_fit[j].shape, flush=False)
                     elif self._scan_dim == 3:
                         self._data_fit[j][self.ix, self.iy] = float(self._fit_func(data[self._hdf_I[j]][0],
                                                                                    data[self._hdf_V[j]][0],
                                                                                    data[self._hdf_dVdI[j]][0],
                                                                                    **self._fit_kwargs))
-                        data[self._hdf_fit[j]] = (self._data_fit[j][self.ix], self._rst_fit_hdf_appnd)
-                        self._rst_fit_hdf_appnd = not bool(self.iy + 1 == len(self._y_vec))
-                # save data
+                        self._hdf_fit[j].write_at((self.ix, self.iy), self._data_fit[j][self.ix, self.iy], shape=self._data_fit[j].shape, flush=False)
+                # save data (and flush the fit values written above)
                 for key, val in data.items():
                     key.append(*val)
                 # iterate progress bar
@@ -1611,18 +1681,24 @@ class transport(object):
                     self._pb.iterate(addend=self._pb_addend[self.ix] if self._landscape else 1)
                 qkit.flow.sleep()
         else:
-            I_values, V_values = [], []
+            # running mean <mean> and sum of squared deviations <M2> of I and V for each sweep
+            mean, M2 = [], []
             for i in range(self._average):
-                I_values.append([])
-                V_values.append([])
-                self.sweeps.create_iterator()
-                for j in range(self.sweeps.get_nos()):
-                    # take data
-                    for val, lst in zip(self.take_IV(sweep=self.sweeps.get_sweep()), [I_values, V_values]):
-                        lst[i].append(list(val))  # append as list in order to later use zip
-                    I_values_avg, V_values_avg = np.mean(list(zip(*I_values))[j], axis=0), np.mean(list(zip(*V_values))[j], axis=0)  # use zip since np.mean cannot handle different shapes
+                for j, values in enumerate(self._take_sweeps()):
+                    values = np.array(values, dtype=float)
+                    if i == 0:
+                        mean.append(values)
+                        M2.append(np.zeros_like(values))
+                    else:
+                        delta = values - mean[j]
+                        mean[j] += delta/(i+1)
+                        M2[j] += delta*(values - mean[j])
+                    I_values_avg, V_values_avg = mean[j]
                     data = {self._hdf_I[j]:I_values_avg,
                             self._hdf_V[j]:V_values_avg}
+                    if self._hdf_I_err:
+                        std_err = np.sqrt(M2[j]/(i*(i+1))) if i else np.nan*M2[j]
+                        data[self._hdf_I_err[j]], data[self._hdf_V_err[j]] = std_err
                     if self._dVdI:
                         data[self._hdf_dVdI[j]] = self._numerical_derivative(I_values_avg, V_values_avg)
                     if self._fit_func:
@@ -1634,18 +1710,41 @@ class transport(object):
                     for key, val in data.items():
                         key.append(val, reset=bool(i))  # append data series or overwrite last iteration by new averaged data
                         key.ds.attrs['average'] = '({:d}/{:d})'.format(i+1, self._average)  # add (iteration/average) as attribute
-                        self._data_file.flush()
                     # iterate progress bar
                     if self.progress_bar:
                         self._pb.iterate(addend=self._pb_addend[self.ix] if self._landscape else 1)
+                self._data_file.flush()
             # set average attribute to number of averages
             for j in range(self.sweeps.get_nos()):
-                for lst in [val for k, val in enumerate([self._hdf_I, self._hdf_V, self._hdf_dVdI]) if k < 2+int(self._dVdI)]:
+                for lst in [val for k, val in enumerate([self._hdf_I, self._hdf_V, self._hdf_dVdI]) if k < 2+int(self._dVdI)]+[lst for lst in [self._hdf_I_err, self._hdf_V_err] if lst]:
                     lst[j].ds.attrs['average'] = self._average
             self._data_file.flush()
             qkit.flow.sleep()
         return
     
+    def _take_sweeps(self):
+        """
+        Iterates sweeps of sweep class and yields the data of each sweep.
+        If sweep programs are set, all sweeps are taken at once by the IVD at the first iteration.
+        
+        Parameters
+        ----------
+        None
+        
+        Returns
+        -------
+        generator of tuples of numpy.array(float)
+            Measured current and voltage values of each sweep.
+        """
+        if self._sweep_program and not self._landscape:
+            for data in self._IVD.take_IV_program(sweeps=self.sweeps.get_sweeps()):
+                yield data
+        else:
+            self.sweeps.create_iterator()
+            for j in range(self.sweeps.get_nos()):
+                # take data
+                yield self.take_IV(sweep=self.sweeps.get_sweep())
+    
     def take_IV(self, sweep):
         """
         Takes IV and considers if landscape is set.
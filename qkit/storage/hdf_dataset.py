@@ -96,7 +96,7 @@ class hdf_dataset(object):
         self._next_matrix = True
         self._y_pos = 0
         
-    def append(self,data, reset = False):
+    def append(self,data, reset = False, flush = True):
         """Function to save a growing measurement dataset to the hdf file.
         
         Data is added one datapoint (vector) or one dataline (matrix, box) at a
@@ -106,6 +106,8 @@ class hdf_dataset(object):
         Args:
             data; any data to be appended to the dataset
             reset (Boolean, optional); indicator for appending, or resetting the dataset
+            flush (Boolean, optional); flush the file after appending. Use False
+                to append to several datasets and flush once afterwards.
         """
         if self.ds_type == ds_types['txt']:
             try:
@@ -134,15 +136,59 @@ class hdf_dataset(object):
             if self._save_timestamp:
                 self._create_timestamp_ds()
 
-        self.hf.append(self.ds,data, next_matrix=self._next_matrix, reset = reset)
+        self.hf.append(self.ds,data, next_matrix=self._next_matrix, reset = reset, flush = flush)
         if self._next_matrix:
             self._next_matrix = False
         if self._save_timestamp:
-            self.hf.append(self.ds_ts, numpy.array([time.time()]), reset=reset)
+            self.hf.append(self.ds_ts, numpy.array([time.time()]), reset=reset, flush = flush)
 
-        self.hf.flush()
+        if flush:
+            self.hf.flush()
             
             
+    def write_at(self, index, data, shape=None, flush=True):
+        """Function to write single datapoints or slices of a dataset in place.
+        
+        In contrast to append(reset = True), only the given entries are 
+        written to the hdf file, so the cost does not grow with the size of 
+        the dataset. This is meant for datasets which are filled point by 
+        point in an outer loop, e.g. logged values of a 2D scan. 
+        The dataset is created with its final shape at the first call, 
+        unwritten entries keep the fill value (NaN).
+
+        Args:
+            index; index of the entries (int, tuple or slice)
+            data; data to be written at index
+            shape (tuple, optional); shape of the dataset, needed at the first call
+            flush (Boolean, optional); flush the file after writing. Use False
+                to write to several datasets and flush once afterwards.
+
+        Every call increments the 'rewrites' attribute of the dataset, which
+        tells readers (qviewkit) that already complete entries may have changed.
+        """
+        if self.first:
+            if shape is None:
+                logging.error("HDF_dataset: Please specify the shape of '%s' at the first write_at()" % (self.name))
+                raise ValueError
+            shape = tuple(numpy.atleast_1d(shape))
+            self.first = False
+            self.ds = self.hf.create_dataset(self.name, shape[-1],
+                                             folder=self.folder,
+                                             dim = len(shape),
+                                             ds_type = self.ds_type,
+                                             dtype = self.dtype)
+            self._setup_metadata()
+            self.ds.resize(shape)
+            if len(shape) > 1:
+                fill = self.ds.attrs.get('fill')
+                fill[:len(shape)] = shape
+                self.ds.attrs.modify('fill', fill)
+        self.ds[index] = data
+        self.ds.attrs['rewrites'] = int(self.ds.attrs.get('rewrites', 0)) + 1
+        self.hf.mark_changed(self.ds)
+        if flush:
+            self.hf.flush()
+
     def add(self,data):
         """Function to save a 1dim dataset once.
         
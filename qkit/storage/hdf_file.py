@@ -7,6 +7,9 @@ Created 2015
 
 """
 import logging
+import json
+import os
+import time
 import h5py
 import numpy as np
 import qkit
@@ -43,6 +46,10 @@ class H5_file(object):
             # set all standard attributes
             for k in kw:
                 self.grp.attrs[k] = kw[k]
+        self._generation = self.entry.attrs.get("generation", 0)
+        # datasets changed since the last 'dataset-grown' message of the info service
+        self._changed = {}
+        self._last_publish = 0
         
     def create_file(self,output_file, mode):
         self.hf = h5py.File(output_file, mode)
@@ -61,6 +68,8 @@ class H5_file(object):
         self.entry.attrs.create("data_latest",0)
         self.entry.attrs.create("analysis_latest",0)
         self.entry.attrs.create("updating",True)
+        # incremented on every flush, viewers (qviewkit) use it to detect new data
+        self.entry.attrs.create("generation",0)
         # create a nexus data group        
         self.dgrp = self.entry.require_group("data0")
         self.agrp = self.entry.require_group("analysis0")
@@ -167,7 +176,7 @@ class H5_file(object):
         self.flush()
         return ds
         
-    def append(self,ds,data, next_matrix=False, reset = False):
+    def append(self,ds,data, next_matrix=False, reset = False, flush = True):
         """Method for appending hdf5 data. 
         
         A simple append method for data traces.
@@ -179,6 +188,7 @@ class H5_file(object):
             hdf_dataset 'ds'
             numpy array 'data'
             boolean 'next_matrix'
+            boolean 'flush': flush the file, False if several appends are flushed together
             
         Returns:
             The function operates on the given variables.
@@ -273,15 +283,52 @@ class H5_file(object):
                 ds[fill[0]-1,fill[1]-1] = data
             ds.attrs.modify("fill", fill)
 
-        self.flush()
+        self.mark_changed(ds)
+        if flush:
+            self.flush()
+        
+    def mark_changed(self, ds):
+        """Remembers that data was written to the h5py dataset ds. 
+        
+        The changes are published with the next flush() as 'dataset-grown'
+        message of the info service, if it is running.
+        """
+        if hasattr(getattr(qkit, 'info', None), 'dist'):
+            self._changed[ds.name] = ds.shape
+    
+    def _publish_changes(self, force=False):
+        """Publishes the changed datasets and their shapes via the info service.
+        
+        Messages are sent at most every qkit.cfg['info_data_interval'] seconds
+        (default 0.5), changes in between are collected into the next message.
+        """
+        if not self._changed:
+            return
+        now = time.time()
+        if not force and now - self._last_publish < qkit.cfg.get('info_data_interval', 0.5):
+            return
+        message = json.dumps({'file': os.path.abspath(self.hf.filename),
+                              'datasets': dict((name, list(shape)) for name, shape in self._changed.items())})
+        self._changed = {}
+        self._last_publish = now
+        try:
+            qkit.info.dist('dataset-grown', message)
+        except Exception as e:
+            # a failing notification must not stop the measurement
+            logging.debug("H5_file: publishing dataset changes failed: %s" % e)
         
     def flush(self):
+        if self.hf.mode != 'r':
+            self._generation += 1
+            self.entry.attrs["generation"] = self._generation
         self.hf.flush()
+        self._publish_changes()
         
     def close_file(self):
         # delegate close
         if self.newfile:
             self.entry.attrs["updating"] = False
+        self._publish_changes(force=True)
         self.hf.close()
         
     def __getitem__(self,s):